@@ -1,57 +1,169 @@
 # Contenu COMPLET et PRÊT POUR DÉPLOIEMENT pour app.py
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
+import atexit
+import click
+import cProfile
+import pstats
+import random
+import multiprocessing
+import heapq
+import json
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+import weakref
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+from array import array
+from collections import OrderedDict, namedtuple
+from functools import partial
+from operator import itemgetter
+from urllib.parse import quote
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, send_file, jsonify, Response, stream_with_context
+from flask import g, has_request_context, abort, before_render_template, template_rendered, get_template_attribute
+from markupsafe import Markup
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, timedelta
 import math
-from fpdf import FPDF
-from io import BytesIO
+from io import BytesIO, StringIO
+import csv
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import func, cast, Date, exc # Imports for advanced queries
-from sqlalchemy.orm import aliased          # Imports for advanced queries
+from sqlalchemy import func, cast, Date, exc, insert, update, select, delete, bindparam # Imports for advanced queries
+from sqlalchemy import event, or_, and_, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.orm import aliased, joinedload, Session
+from sqlalchemy.orm.exc import StaleDataError # Imports for advanced queries
+from appariements import apparier, calendrier_berger
+from archives import Archive, compresser, decompresser, document_archive
+from series import RESOLUTIONS, debut_periode, periode_suivante, lttb
+from diffusion import Diffuseur
+from departages import calculer_departages, cle_classement, ORDRE_DEPARTAGES, ORDRE_DEPARTAGES_TOUTES_RONDES
+from metriques import Metriques
 
 # --- Configuration de l'Application ---
-app = Flask(__name__)
+# The Flask application is built by create_app() (end of this file). Importing this
+# module only defines the models, blueprints and helpers: no engine, no directory,
+# no thread. gunicorn --preload can then import it once in the master, and each
+# forked worker drops the inherited connection pool (see _apres_fork). The
+# module-level `app` of older deployments (`gunicorn app:app`) is still
+# available, built on first access (see __getattr__).
 basedir = os.path.abspath(os.path.dirname(__file__))
-
-# Détection du moteur de BDD pour requêtes compatibles
-DATABASE_URL = os.environ.get('DATABASE_URL')
-IS_POSTGRES = DATABASE_URL and DATABASE_URL.startswith("postgres")
-
-# Configuration de la BDD pour déploiement (Supabase/PostgreSQL) ou local (SQLite)
-if IS_POSTGRES:
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    print(f"INFO: Using PostgreSQL database: {app.config['SQLALCHEMY_DATABASE_URI'][:30]}...")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'instance', 'tournoi.db')
-    print("INFO: Using local SQLite database.")
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# IMPORTANT: Change this secret key for production! Use a long, random string.
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default-dev-secret-key-replace-in-prod')
-
-# Create instance folder if it doesn't exist (for local SQLite)
 instance_path = os.path.join(basedir, 'instance')
-if not os.path.exists(instance_path):
-    os.makedirs(instance_path)
 
-db = SQLAlchemy(app)
+def configurer(app, config=None):
+    """Fills app.config from the environment, then applies the config overrides."""
+    # Configuration de la BDD pour déploiement (Supabase/PostgreSQL) ou local (SQLite)
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url and database_url.startswith("postgres"):
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url.replace("postgres://", "postgresql://", 1)
+        print(f"INFO: Using PostgreSQL database: {app.config['SQLALCHEMY_DATABASE_URI'][:30]}...")
+    elif database_url: # Any other SQLAlchemy URL, e.g. a throwaway SQLite file for benchmarks
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+        print("INFO: Using database from DATABASE_URL.")
+    else:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(instance_path, 'tournoi.db')
+        print("INFO: Using local SQLite database.")
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # IMPORTANT: Change this secret key for production! Use a long, random string.
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default-dev-secret-key-replace-in-prod')
+
+    # Settings of the caches, metrics, jobs and event streams, described with their code
+    app.config.update(
+        ACCUEIL_CACHE_TTL=int(os.environ.get('ACCUEIL_CACHE_TTL', 10)),
+        IDENTITE_CACHE_TTL=int(os.environ.get('IDENTITE_CACHE_TTL', 60)),
+        IDENTITE_CACHE_MAX=10000,
+        METRICS_TOKEN=os.environ.get('METRICS_TOKEN'), # Bearer token for scrapers; admins always allowed
+        PROFILER_ACTIF=os.environ.get('PROFILER', '0') == '1',
+        PROFILER_SEUIL_MS=float(os.environ.get('PROFILER_SEUIL_MS', 500)),
+        PROFILER_ECHANTILLON=float(os.environ.get('PROFILER_ECHANTILLON', 0.1)),
+        PROFILER_DOSSIER=os.environ.get('PROFILER_DOSSIER', os.path.join(instance_path, 'profils')),
+        PROFILER_MAX_FICHIERS=50,
+        PDF_CACHE_MAX_OCTETS=int(os.environ.get('PDF_CACHE_MAX_OCTETS', 32 * 1024 * 1024)),
+        FRAGMENTS_CACHE_MAX_OCTETS=int(os.environ.get('FRAGMENTS_CACHE_MAX_OCTETS', 16 * 1024 * 1024)),
+        TACHES_MODE=os.environ.get('TACHES_MODE', 'processus'),
+        TACHES_INTERVALLE=float(os.environ.get('TACHES_INTERVALLE', 1.0)), # Seconds between polls
+        TACHES_NICE=int(os.environ.get('TACHES_NICE', 10)),
+        TACHES_RETENTION=timedelta(days=7), # Finished jobs and their files
+        SSE_HEARTBEAT=int(os.environ.get('SSE_HEARTBEAT', 15)),
+        SSE_POLL_INTERVAL=float(os.environ.get('SSE_POLL_INTERVAL', 1.0)),
+        SSE_FILE_MAX=8,
+        # Open streams per process (see gunicorn.conf.py); unset: no limit, 0: every page polls
+        SSE_MAX_FLUX=int(os.environ['SSE_MAX_FLUX']) if os.environ.get('SSE_MAX_FLUX') else None,
+        SSE_REPLI_INTERVALLE=int(os.environ.get('SSE_REPLI_INTERVALLE', 15)), # Seconds between polls of refused clients
+    )
+    app.config.update(config or {})
+
+    # Engine profiles. DB_PROFILE=production (default) tunes the pool or the SQLite
+    # pragmas below; DB_PROFILE=defaut keeps SQLAlchemy's and SQLite's own defaults.
+    app.config.setdefault('DB_PROFILE', os.environ.get('DB_PROFILE', 'production'))
+    app.config.setdefault('SQLITE_PRAGMAS', {})
+    if app.config['DB_PROFILE'] == 'production':
+        if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+            # Gunicorn workers each get their own pool; pre-ping and recycle avoid handing
+            # out connections the pooler (e.g. Supabase) has already closed.
+            options_moteur = {
+                'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+                'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+                'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+                'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+                'pool_pre_ping': True,
+            }
+            timeout_requete = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000)) # 0 disables it
+            if timeout_requete:
+                options_moteur['connect_args'] = {'options': f"-c statement_timeout={timeout_requete}"}
+            app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', options_moteur)
+        elif app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') and not app.config['SQLITE_PRAGMAS']:
+            # WAL lets readers run during a write; busy_timeout makes concurrent writers
+            # wait for the lock instead of failing with "database is locked".
+            app.config['SQLITE_PRAGMAS'] = {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000)),
+                'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            }
+
+def _appliquer_pragmas_sqlite(pragmas, connexion_dbapi, connection_record):
+    if not isinstance(connexion_dbapi, sqlite3.Connection):
+        return
+    curseur = connexion_dbapi.cursor()
+    for pragma, valeur in pragmas.items():
+        curseur.execute(f"PRAGMA {pragma}={valeur}")
+    curseur.close()
+
+db = SQLAlchemy()
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'comptes.login'
 login_manager.login_message = "Veuillez vous connecter pour accéder à cette page."
 login_manager.login_message_category = "danger"
 
+# Blueprints, registered by create_app
+bp_comptes = Blueprint('comptes', __name__)         # Accounts and profile
+bp_joueurs = Blueprint('joueurs', __name__)         # Player administration
+bp_tournois = Blueprint('tournois', __name__)       # Home page, tournaments and their exports
+bp_api = Blueprint('api', __name__)                 # Public JSON API and event streams
+bp_taches = Blueprint('taches', __name__)           # Background jobs
+bp_supervision = Blueprint('supervision', __name__) # Metrics and profiler
+bp_maintenance = Blueprint('maintenance', __name__, cli_group=None) # `flask <command>` maintenance commands
+
 # --- Modèles de la Base de Données ---
-# (Models: Joueur, EloHistory, Tournoi, Match, tournoi_joueurs table - unchanged)
 class Joueur(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(256))
     prenom = db.Column(db.String(80), nullable=False)
     nom = db.Column(db.String(80), nullable=False)
-    elo = db.Column(db.Integer, nullable=False, default=1500)
+    elo = db.Column(db.Integer, nullable=False, default=1500, index=True)
     is_admin = db.Column(db.Boolean, default=False)
     elo_history = db.relationship('EloHistory', backref='joueur', lazy=True, cascade="all, delete-orphan")
 
@@ -60,28 +172,86 @@ class Joueur(db.Model, UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+class Minuscules(FunctionElement):
+    """lower(colonne) compared in code point order: COLLATE "C" on PostgreSQL.
+
+    The prefix search scans a range of lowered names; with the database's
+    linguistic collation (en_US, fr_FR...) that range does not match the code
+    point bound computed in filtre_prefixe. SQLite always compares bytes.
+    """
+    type = db.String()
+    inherit_cache = True
+
+@compiles(Minuscules)
+def _minuscules(element, compiler, **kw):
+    return f"lower({compiler.process(element.clauses, **kw)})"
+
+@compiles(Minuscules, 'postgresql')
+def _minuscules_postgresql(element, compiler, **kw):
+    return f'lower({compiler.process(element.clauses, **kw)}) COLLATE "C"'
+
+# Case-insensitive prefix search of the registration picker (see rechercher_joueurs)
+db.Index('ix_joueur_nom_minuscules', Minuscules(Joueur.nom))
+db.Index('ix_joueur_prenom_minuscules', Minuscules(Joueur.prenom))
+db.Index('ix_joueur_username_minuscules', Minuscules(Joueur.username))
+
 class EloHistory(db.Model):
+    __table_args__ = (db.Index('ix_elo_history_joueur_date', 'joueur_id', 'date'),
+                      db.Index('ix_elo_history_tournoi_ronde', 'tournoi_id', 'ronde'))
     id = db.Column(db.Integer, primary_key=True)
     joueur_id = db.Column(db.Integer, db.ForeignKey('joueur.id'), nullable=False)
     elo = db.Column(db.Integer, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     note = db.Column(db.String(100), nullable=True)
+    # Round that produced the row (NULL for account creations and admin edits): the
+    # ELO replay keys on it, the note only labels the row (names can repeat)
+    tournoi_id = db.Column(db.Integer, db.ForeignKey('tournoi.id'), nullable=True)
+    ronde = db.Column(db.Integer, nullable=True)
+
+class EloSnapshot(db.Model):
+    # Last rating of a closed day/week/month per player, filled lazily by serie_elo
+    joueur_id = db.Column(db.Integer, db.ForeignKey('joueur.id', ondelete='CASCADE'), primary_key=True)
+    resolution = db.Column(db.String(8), primary_key=True)
+    periode = db.Column(db.Date, primary_key=True) # First day of the period
+    elo = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, nullable=False) # Date of the last EloHistory row of the period
+
+TYPES_TOURNOI = {
+    'suisse': 'Système suisse',
+    'berger': 'Toutes rondes (Berger)',
+    'berger_double': 'Toutes rondes aller-retour (Berger)',
+}
+TYPES_TOUTES_RONDES = ('berger', 'berger_double')
 
 class Tournoi(db.Model):
+    __table_args__ = (db.Index('ix_tournoi_termine_date', 'termine', 'date_creation'),)
     id = db.Column(db.Integer, primary_key=True)
     nom = db.Column(db.String(120), nullable=False)
     date_creation = db.Column(db.DateTime, default=datetime.utcnow)
-    nombre_rondes = db.Column(db.Integer, nullable=False)
+    type_tournoi = db.Column(db.String(20), nullable=False, default='suisse', server_default='suisse') # Key of TYPES_TOURNOI
+    nombre_rondes = db.Column(db.Integer, nullable=False) # Round-robins: set from the player count when round 1 is generated
     ronde_actuelle = db.Column(db.Integer, default=0)
     termine = db.Column(db.Boolean, default=False)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped on every change (see toucher_tournoi)
+    archive = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false()) # Games and standings live in TournoiArchive
     joueurs = db.relationship('Joueur', secondary='tournoi_joueurs', backref='tournois')
+    # Optimistic locking: UPDATEs carry "AND version = <version read>" and raise
+    # StaleDataError when another request changed the tournament in between.
+    __mapper_args__ = {'version_id_col': version, 'version_id_generator': False}
 
 tournoi_joueurs = db.Table('tournoi_joueurs',
     db.Column('joueur_id', db.ForeignKey('joueur.id'), primary_key=True),
-    db.Column('tournoi_id', db.ForeignKey('tournoi.id'), primary_key=True)
+    db.Column('tournoi_id', db.ForeignKey('tournoi.id'), primary_key=True),
+    db.Index('ix_tournoi_joueurs_tournoi', 'tournoi_id') # The primary key leads with joueur_id
 )
 
 class Match(db.Model):
+    # A player sits at most once per round on each side (also serves the (tournoi_id, ronde) lookups);
+    # PlaceRonde enforces once per round across both sides
+    __table_args__ = (db.Index('uq_match_tournoi_ronde_blancs', 'tournoi_id', 'ronde', 'joueur1_id', unique=True),
+                      db.Index('uq_match_tournoi_ronde_noirs', 'tournoi_id', 'ronde', 'joueur2_id', unique=True),
+                      db.Index('ix_match_joueur1_tournoi', 'joueur1_id', 'tournoi_id'),
+                      db.Index('ix_match_joueur2_tournoi', 'joueur2_id', 'tournoi_id'))
     id = db.Column(db.Integer, primary_key=True)
     tournoi_id = db.Column(db.Integer, db.ForeignKey('tournoi.id', ondelete='CASCADE'), nullable=False)
     ronde = db.Column(db.Integer, nullable=False)
@@ -94,24 +264,533 @@ class Match(db.Model):
     joueur1 = db.relationship('Joueur', foreign_keys=[joueur1_id])
     joueur2 = db.relationship('Joueur', foreign_keys=[joueur2_id])
 
+class TournoiArchive(db.Model):
+    # Compressed snapshot of an archived tournament (see archives.py), replacing its Match and Classement rows
+    tournoi_id = db.Column(db.Integer, db.ForeignKey('tournoi.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    matchs = db.Column(db.Integer, nullable=False) # Games in the snapshot
+    taille = db.Column(db.Integer, nullable=False) # Uncompressed size, in bytes
+    donnees = db.Column(db.LargeBinary, nullable=False)
+
+class PlaceRonde(db.Model):
+    # One row per player and round (the bye included), written in the same transaction as the
+    # round's games: the primary key refuses a player seated twice, whatever the colour
+    tournoi_id = db.Column(db.Integer, db.ForeignKey('tournoi.id', ondelete='CASCADE'), primary_key=True)
+    ronde = db.Column(db.Integer, primary_key=True)
+    joueur_id = db.Column(db.Integer, db.ForeignKey('joueur.id', ondelete='CASCADE'), primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('match.id', ondelete='CASCADE'), nullable=False, index=True)
+
+class JetonRequete(db.Model):
+    # Idempotency tokens of the mutating tournament forms, recorded in the same transaction as their effect
+    jeton = db.Column(db.String(64), primary_key=True)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class Tache(db.Model):
+    # Background job (PDF export, ELO recompute, player import), run by the job executor
+    __table_args__ = (db.Index('ix_tache_statut_id', 'statut', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(30), nullable=False)
+    cle = db.Column(db.String(120), index=True) # Identical jobs share a key and are only queued once
+    statut = db.Column(db.String(12), nullable=False, default='en_attente') # en_attente, en_cours, terminee, echouee
+    parametres = db.Column(db.Text, nullable=False, default='{}') # JSON
+    progression = db.Column(db.Integer, nullable=False, default=0) # Percent
+    message = db.Column(db.Text)
+    erreur = db.Column(db.Text)
+    fichier = db.Column(db.String(300)) # Result file, served by /taches/<id>/resultat
+    nom_fichier = db.Column(db.String(200))
+    mimetype = db.Column(db.String(100))
+    auteur_id = db.Column(db.Integer) # No foreign key: deleting a player keeps the job log
+    executeur = db.Column(db.String(100)) # host:pid of the process running it
+    date_creation = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    date_debut = db.Column(db.DateTime)
+    date_fin = db.Column(db.DateTime)
+
+class Classement(db.Model):
+    # Standings row per (tournoi, joueur), kept up to date by generer_ronde and sauver_resultats
+    tournoi_id = db.Column(db.Integer, db.ForeignKey('tournoi.id', ondelete='CASCADE'), primary_key=True)
+    joueur_id = db.Column(db.Integer, db.ForeignKey('joueur.id', ondelete='CASCADE'), primary_key=True)
+    points = db.Column(db.Float, nullable=False, default=0.0)
+    parties = db.Column(db.Integer, nullable=False, default=0)
+    couleurs = db.Column(db.Text, nullable=False, default='') # 'B'/'N' per round played (a round-robin may run past 64 rounds)
+    exempt = db.Column(db.Boolean, nullable=False, default=False)
+
 # --- Fonctions Utilitaires ---
-# (calculer_nouveau_elo - unchanged)
+# EloHistory note prefixes the ELO replay relies on
+NOTE_CREATION = "Création du compte"
+NOTE_MODIF_ADMIN = "Modif. Admin"
+
 def calculer_nouveau_elo(elo_joueur, elo_adversaire, resultat):
     K = 32
     probabilite_attendue = 1 / (1 + math.pow(10, (elo_adversaire - elo_joueur) / 400))
     nouveau_elo = elo_joueur + K * (resultat - probabilite_attendue)
     return round(nouveau_elo)
 
+def calculer_nouveaux_elos(elos_joueurs, elos_adversaires, resultats):
+    """Batch version of calculer_nouveau_elo over parallel sequences (same rounding)."""
+    K = 32
+    return [round(elo + K * (res - 1 / (1 + math.pow(10, (adv - elo) / 400))))
+            for elo, adv, res in zip(elos_joueurs, elos_adversaires, resultats)]
+
+POINTS_COURBE_ELO = 200
+MAX_POINTS_COURBE_ELO = 2000
+
+def serie_elo(joueur_id, resolution):
+    """Returns [(elo, date)] with the last rating of each period, oldest first.
+
+    Closed periods are read from EloSnapshot; only the history rows after the
+    last snapshot are scanned (index on joueur_id, date) and any newly closed
+    periods are stored for the next call.
+    """
+    snapshots = EloSnapshot.query.filter_by(joueur_id=joueur_id, resolution=resolution) \
+                                 .order_by(EloSnapshot.periode).all()
+    historique = db.session.query(EloHistory.elo, EloHistory.date).filter(EloHistory.joueur_id == joueur_id)
+    if snapshots:
+        depuis = periode_suivante(snapshots[-1].periode, resolution)
+        historique = historique.filter(EloHistory.date >= datetime.combine(depuis, datetime.min.time()))
+    derniers = {} # periode -> (elo, date) of its last row
+    for elo, date in historique.order_by(EloHistory.date, EloHistory.id):
+        derniers[debut_periode(date, resolution)] = (elo, date)
+
+    periode_courante = debut_periode(datetime.utcnow(), resolution)
+    nouveaux = [EloSnapshot(joueur_id=joueur_id, resolution=resolution, periode=p, elo=elo, date=date)
+                for p, (elo, date) in derniers.items() if p < periode_courante]
+    if nouveaux:
+        try:
+            db.session.add_all(nouveaux)
+            db.session.commit()
+        except exc.IntegrityError: # Another request stored them first
+            db.session.rollback()
+    return [(s.elo, s.date) for s in snapshots] + [derniers[p] for p in sorted(derniers)]
+
+def sous_echantillonner(history, points):
+    """LTTB-downsamples [(elo, date)] to at most `points` entries."""
+    if len(history) <= points:
+        return history
+    echantillon = lttb([(date.timestamp(), elo) for elo, date in history], points)
+    return [(elo, datetime.fromtimestamp(ts)) for ts, elo in echantillon]
+
+def toucher_tournoi(tournoi):
+    """Marks a tournament as changed so caches keyed on its version are bypassed."""
+    tournoi.version = (tournoi.version or 0) + 1
+    invalider_cache_accueil()
+    db.session.info.setdefault('tournois_touches', set()).add(tournoi)
+    if tournoi.termine: # Its cached page fragments are keyed on the old version: free them
+        db.session.info.setdefault('fragments_perimes', set()).add(tournoi.id)
+
+class FormulaireIncomplet(Exception):
+    """A mutating tournament form posted without its token or version (see formulaire_incomplet)."""
+
+def reserver_tournoi(tournoi):
+    """Bumps the version now, so a concurrent request on the same tournament fails fast.
+
+    Forms carry the version they were rendered with: if it is missing (a
+    FormulaireIncomplet) or the tournament changed since, the request is refused. The flush then runs UPDATE ... WHERE version =
+    <read version>: on PostgreSQL it also holds the row lock until commit, on
+    SQLite it takes the write lock. The loser gets a StaleDataError (see
+    conflit_modification).
+    """
+    version_formulaire = request.form.get('version', type=int)
+    if version_formulaire is None:
+        raise FormulaireIncomplet(f"tournoi {tournoi.id}: form without version")
+    if version_formulaire != tournoi.version:
+        raise StaleDataError(f"tournoi {tournoi.id}: version {tournoi.version}, form rendered at {version_formulaire}")
+    toucher_tournoi(tournoi)
+    db.session.flush()
+
+DUREE_JETONS = timedelta(days=1)
+
+def consommer_jeton():
+    """Records the form's idempotency token in the current transaction.
+
+    Returns False if the token was already used (a resubmitted or double-fired
+    form). A request without a token is refused (FormulaireIncomplet).
+    """
+    jeton = request.form.get('jeton')
+    if not jeton:
+        raise FormulaireIncomplet("form without token")
+    if db.session.get(JetonRequete, jeton[:64]) is not None:
+        return False
+    db.session.execute(delete(JetonRequete).where(JetonRequete.date < datetime.utcnow() - DUREE_JETONS))
+    db.session.add(JetonRequete(jeton=jeton[:64]))
+    return True
+
+@bp_tournois.app_template_global()
+def nouveau_jeton():
+    return uuid.uuid4().hex
+
+@bp_tournois.app_errorhandler(FormulaireIncomplet)
+def formulaire_incomplet(e):
+    db.session.rollback()
+    flash("Formulaire incomplet ou périmé : rechargez la page avant de recommencer.", 'warning')
+    return redirect(request.referrer or url_for('tournois.index'))
+
+@bp_tournois.app_errorhandler(StaleDataError)
+def conflit_modification(e):
+    db.session.rollback()
+    flash("Le tournoi vient d'être modifié par une autre requête (autre arbitre ou double clic). Vérifiez la page avant de recommencer.", 'warning')
+    return redirect(request.referrer or url_for('tournois.index'))
+
+# Home page data (first pages of each list), shared by all requests of this process.
+# Dropped after any commit that changes ratings or tournaments; the TTL bounds how
+# long other worker processes can serve it after a change made elsewhere.
+TAILLE_PAGE_ACCUEIL = 50
+cache_accueil = {}
+
+def invalider_cache_accueil():
+    """Drops the cached home page data once the current transaction commits."""
+    db.session.info['invalider_accueil'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _vider_cache_accueil(session):
+    if session.info.pop('invalider_accueil', False):
+        cache_accueil.clear()
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_invalidation(session):
+    session.info.pop('invalider_accueil', None)
+    session.info.pop('tournois_touches', None)
+    session.info.pop('etats_a_diffuser', None)
+    session.info.pop('fragments_perimes', None)
+
+@event.listens_for(Session, 'before_commit')
+def _preparer_diffusion(session):
+    # Snapshot now: after the commit the objects are expired and reading them would query
+    touches = session.info.pop('tournois_touches', None)
+    if touches:
+        session.info['etats_a_diffuser'] = [(t.id, etat_tournoi(t)) for t in touches if t.id is not None]
+
+@event.listens_for(Session, 'after_commit')
+def _diffuser(session):
+    for tournoi_id, etat in session.info.pop('etats_a_diffuser', ()):
+        diffuseur.publier(tournoi_id, etat)
+
+@event.listens_for(Session, 'after_commit')
+def _oublier_fragments(session):
+    perimes = session.info.pop('fragments_perimes', None)
+    if perimes:
+        cache_fragments.oublier(lambda cle: cle[0] == 'termine' and cle[1] in perimes)
+
+def nouvelle_ligne_classement(tournoi_id, joueur_id):
+    ligne = Classement(tournoi_id=tournoi_id, joueur_id=joueur_id, points=0.0, parties=0, couleurs='', exempt=False)
+    db.session.add(ligne)
+    return ligne
+
+def reconstruire_classement(tournoi_id):
+    """Rebuilds the standings rows of a tournament from the Match rows of its published rounds (caller commits)."""
+    Classement.query.filter_by(tournoi_id=tournoi_id).delete()
+    lignes = {}
+    def ligne(joueur_id):
+        if joueur_id not in lignes:
+            lignes[joueur_id] = nouvelle_ligne_classement(tournoi_id, joueur_id)
+        return lignes[joueur_id]
+
+    tournoi = db.session.get(Tournoi, tournoi_id)
+    for j in tournoi.joueurs:
+        ligne(j.id)
+    for m in Match.query.filter(Match.tournoi_id == tournoi_id, Match.ronde <= tournoi.ronde_actuelle) \
+                        .order_by(Match.ronde, Match.id):
+        if m.joueur1_id and m.joueur2_id:
+            l1, l2 = ligne(m.joueur1_id), ligne(m.joueur2_id)
+            l1.couleurs += 'B'
+            l2.couleurs += 'N'
+            if m.resultat is not None:
+                l1.points += m.resultat
+                l2.points += 1.0 - m.resultat
+                l1.parties += 1
+                l2.parties += 1
+        elif m.joueur1_id: # Bye
+            l1 = ligne(m.joueur1_id)
+            l1.exempt = True
+            if m.resultat is not None:
+                l1.points += m.resultat
+    return lignes
+
+DEPARTAGES_AFFICHES = (('buchholz_cut1', 'Bu-1'), ('buchholz', 'Bu'), ('sonneborn_berger', 'SB')) # Columns of the exports
+
+def ordre_departages(tournoi):
+    return ORDRE_DEPARTAGES_TOUTES_RONDES if tournoi.type_tournoi in TYPES_TOUTES_RONDES else ORDRE_DEPARTAGES
+
+def departages_tournoi(tournoi, matchs):
+    """Tiebreaks of every player who played, from (ronde, joueur1_id, joueur2_id, resultat) rows."""
+    ids = {m[1] for m in matchs} | {m[2] for m in matchs if m[2] is not None}
+    return calculer_departages(sorted(ids), matchs, tournoi.nombre_rondes)
+
+def grille_tournoi(tournoi):
+    """Per-player round-by-round grid of a tournament, in standings order (used by every export).
+
+    Each entry: joueur, nom, total_points, departages and rondes {r: {resultat, couleur, elo_gain, adversaire}}.
+    """
+    # Use all players who participated, even if withdrawn
+    if tournoi.archive:
+        archive = charger_archive(tournoi)
+        classement = archive.classement
+        all_players_in_tournoi = [archive.joueurs[pid] for pid, ligne in classement.items() if ligne.couleurs or ligne.exempt]
+        matchs = ((m.ronde, m.joueur1_id, m.joueur2_id, m.resultat, m.elo_gain_j1, m.elo_gain_j2) for m in archive.matchs)
+    else:
+        classement = charger_classement(tournoi)
+        all_player_ids = [pid for pid, ligne in classement.items() if ligne.couleurs or ligne.exempt]
+        all_players_in_tournoi = Joueur.query.filter(Joueur.id.in_(all_player_ids)).all()
+        matchs = db.session.execute(select(Match.ronde, Match.joueur1_id, Match.joueur2_id, Match.resultat, Match.elo_gain_j1, Match.elo_gain_j2)
+                                    .filter(Match.tournoi_id == tournoi.id, Match.ronde <= tournoi.ronde_actuelle)
+                                    .order_by(Match.ronde).execution_options(yield_per=1000))
+
+    player_data = {}
+    for j in all_players_in_tournoi:
+        player_data[j.id] = {
+            'joueur': j,
+            'nom': f"{j.prenom} {j.nom}",
+            'total_points': classement[j.id].points,
+            'rondes': {r: {'resultat': '-', 'couleur': '', 'elo_gain': 0, 'adversaire': None} for r in range(1, tournoi.nombre_rondes + 1)}
+        }
+
+    resultats = [] # Input of the tiebreak matrix, collected in the same pass
+    for ronde, j1_id, j2_id, resultat, elo_gain_j1, elo_gain_j2 in matchs:
+        resultats.append((ronde, j1_id, j2_id, resultat))
+        if j1_id not in player_data or (j2_id and j2_id not in player_data):
+             continue # Skip match if a player was deleted entirely
+
+        if j2_id:
+            if resultat is not None:
+                res_j1, res_j2 = resultat, 1.0 - resultat
+                player_data[j1_id]['rondes'][ronde] = {'resultat': res_j1, 'couleur': 'B', 'elo_gain': elo_gain_j1 or 0, 'adversaire': j2_id}
+                player_data[j2_id]['rondes'][ronde] = {'resultat': res_j2, 'couleur': 'N', 'elo_gain': elo_gain_j2 or 0, 'adversaire': j1_id}
+
+        elif j1_id: # Bye case
+            if resultat == 1.0:
+                player_data[j1_id]['rondes'][ronde] = {'resultat': 1.0, 'couleur': 'BYE', 'elo_gain': 0, 'adversaire': None}
+
+    departages = departages_tournoi(tournoi, resultats)
+    ordre = ordre_departages(tournoi)
+    for pid, donnees in player_data.items():
+        donnees['departages'] = departages.get(pid)
+    return sorted(player_data.values(), key=lambda x: cle_classement(x['total_points'], x['departages'], x['joueur'].elo, ordre),
+                  reverse=True)
+
+def charger_classement(tournoi):
+    """Returns {joueur_id: Classement} for a tournament, rebuilding rows missing from older deployments.
+
+    Rebuilt rows are only flushed: they are saved with the caller's transaction,
+    never committed half-way through a route.
+    """
+    lignes = {c.joueur_id: c for c in Classement.query.filter_by(tournoi_id=tournoi.id)}
+    if not lignes and tournoi.ronde_actuelle > 0:
+        lignes = reconstruire_classement(tournoi.id)
+        db.session.flush()
+    return lignes
+
 # --- Routes d'Authentification ---
-# (load_user, register, login, logout - unchanged)
+# Identity cache: load_user runs on every authenticated request, so the fields that
+# authorization and templates read are kept per process in a bounded LRU with a TTL.
+# Routes that change them invalidate the entries once their transaction commits; the
+# TTL bounds how long other worker processes can serve a stale identity.
+
+class Identite(UserMixin):
+    """Detached copy of a Joueur's id, username, names, is_admin and elo (current_user)."""
+    def __init__(self, joueur):
+        self.id = joueur.id
+        self.username = joueur.username
+        self.prenom = joueur.prenom
+        self.nom = joueur.nom
+        self.is_admin = bool(joueur.is_admin)
+        self.elo = joueur.elo
+
+class CacheIdentites:
+    def __init__(self, taille_max, ttl):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict() # joueur_id -> (expiration, Identite)
+        self._verrou = threading.Lock()
+
+    def get(self, joueur_id):
+        with self._verrou:
+            entree = self._entrees.get(joueur_id)
+            if entree is None:
+                return None
+            if entree[0] < time.monotonic():
+                del self._entrees[joueur_id]
+                return None
+            self._entrees.move_to_end(joueur_id)
+            return entree[1]
+
+    def put(self, identite):
+        with self._verrou:
+            self._entrees[identite.id] = (time.monotonic() + self.ttl, identite)
+            self._entrees.move_to_end(identite.id)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def invalider(self, joueur_ids=None):
+        """Drops the given ids, or everything when joueur_ids is None."""
+        with self._verrou:
+            if joueur_ids is None:
+                self._entrees.clear()
+            else:
+                for joueur_id in joueur_ids:
+                    self._entrees.pop(joueur_id, None)
+
+cache_identites = CacheIdentites(10000, 60) # Bounds set from the config by create_app
+
+def invalider_identites(joueur_ids=None):
+    """Drops cached identities (all of them when joueur_ids is None) once the current transaction commits."""
+    a_invalider = db.session.info.get('identites_a_invalider', set())
+    if joueur_ids is None or a_invalider is None:
+        db.session.info['identites_a_invalider'] = None
+    else:
+        db.session.info['identites_a_invalider'] = a_invalider | set(joueur_ids)
+
+@event.listens_for(Session, 'after_commit')
+def _vider_identites(session):
+    if 'identites_a_invalider' in session.info:
+        cache_identites.invalider(session.info.pop('identites_a_invalider'))
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_identites(session):
+    session.info.pop('identites_a_invalider', None)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return Joueur.query.get(int(user_id))
+    identite = cache_identites.get(int(user_id))
+    if identite is None:
+        joueur = db.session.get(Joueur, int(user_id))
+        if joueur is None:
+            return None
+        identite = Identite(joueur)
+        cache_identites.put(identite)
+    return identite
+
+# --- Métriques et profilage ---
+# Every request records its latency, its SQL statement count and time, and its
+# template render time in the process registry, served at /metrics (Prometheus
+# text format) and summarised on /admin/metriques. Each worker process keeps its
+# own counters. The profiler is opt-in: when on, a sample of the requests runs
+# under cProfile and those slower than the threshold are saved to PROFILER_DOSSIER.
+metriques = Metriques()
+_verrou_profileur = threading.Lock() # cProfile profiles one request at a time
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _debut_sql(connexion, curseur, instruction, parametres, contexte, executemany):
+    connexion.info.setdefault('debuts_sql', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _fin_sql(connexion, curseur, instruction, parametres, contexte, executemany):
+    duree = time.perf_counter() - connexion.info['debuts_sql'].pop()
+    if has_request_context() and 'requetes_sql' in g:
+        g.requetes_sql += 1
+        g.duree_sql += duree
+
+@before_render_template.connect
+def _debut_rendu(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('debuts_rendu', []).append(time.perf_counter())
+
+@template_rendered.connect
+def _fin_rendu(sender, template, context, **extra):
+    if has_request_context() and g.get('debuts_rendu'):
+        duree = time.perf_counter() - g.debuts_rendu.pop()
+        g.duree_rendu += duree
+        metriques.observer_rendu(template.name or '<chaine>', duree)
+
+@bp_supervision.before_app_request
+def _debut_requete():
+    g.debut_requete = time.perf_counter()
+    g.requetes_sql, g.duree_sql, g.duree_rendu = 0, 0.0, 0.0
+    if (current_app.config['PROFILER_ACTIF'] and random.random() < current_app.config['PROFILER_ECHANTILLON']
+            and _verrou_profileur.acquire(blocking=False)):
+        g.profileur = cProfile.Profile()
+        g.profileur.enable()
+
+@bp_supervision.after_app_request
+def _statut_requete(reponse):
+    g.statut = reponse.status_code
+    return reponse
+
+@bp_supervision.teardown_app_request
+def _fin_requete(erreur=None):
+    if 'debut_requete' not in g:
+        return
+    duree = time.perf_counter() - g.debut_requete
+    endpoint = request.endpoint or 'inconnu'
+    profileur = g.pop('profileur', None)
+    if profileur is not None:
+        profileur.disable()
+        _verrou_profileur.release()
+        if duree * 1000 >= current_app.config['PROFILER_SEUIL_MS']:
+            enregistrer_profil(profileur, endpoint, duree)
+    statut = g.get('statut', 500 if erreur else 200)
+    metriques.observer_requete(endpoint, request.method, statut, duree, g.requetes_sql, g.duree_sql, g.duree_rendu)
+
+def enregistrer_profil(profileur, endpoint, duree):
+    """Saves the request's cProfile stats, keeping the PROFILER_MAX_FICHIERS most recent files."""
+    dossier = current_app.config['PROFILER_DOSSIER']
+    os.makedirs(dossier, exist_ok=True)
+    nom = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{endpoint}-{round(duree * 1000)}ms.prof"
+    profileur.dump_stats(os.path.join(dossier, nom))
+    metriques.compter_profil()
+    for ancien in profils_enregistres()[current_app.config['PROFILER_MAX_FICHIERS']:]:
+        try:
+            os.remove(os.path.join(dossier, ancien))
+        except OSError:
+            pass # Already removed by another worker
+
+def profils_enregistres():
+    """Names of the saved profiles, most recent first."""
+    dossier = current_app.config['PROFILER_DOSSIER']
+    if not os.path.isdir(dossier):
+        return []
+    return sorted((f for f in os.listdir(dossier) if f.endswith('.prof')), reverse=True)
+
+@bp_supervision.route('/metrics')
+def metrics():
+    jeton = current_app.config['METRICS_TOKEN']
+    autorise = current_user.is_authenticated and current_user.is_admin
+    if not autorise and jeton and request.headers.get('Authorization') == f"Bearer {jeton}":
+        autorise = True
+    if not autorise:
+        abort(403)
+    return Response(metriques.texte(), mimetype='text/plain; version=0.0.4')
+
+@bp_supervision.route('/admin/metriques')
+@login_required
+def metriques_admin():
+    if not current_user.is_admin:
+        return redirect(url_for('tournois.index'))
+    routes, templates = metriques.resume()
+    return render_template('admin_metriques.html', routes=routes, templates=templates, profils=profils_enregistres())
+
+@bp_supervision.route('/admin/metriques/profileur', methods=['POST'])
+@login_required
+def basculer_profileur():
+    if not current_user.is_admin:
+        flash('Action non autorisée.', 'danger')
+        return redirect(url_for('tournois.index'))
+    current_app.config['PROFILER_ACTIF'] = request.form.get('actif') == '1'
+    if current_app.config['PROFILER_ACTIF']:
+        flash(f"Profilage activé pour ce processus : {current_app.config['PROFILER_ECHANTILLON']:.0%} des requêtes, "
+              f"enregistrées au-delà de {current_app.config['PROFILER_SEUIL_MS']:.0f} ms.", 'success')
+    else:
+        flash("Profilage désactivé pour ce processus.", 'info')
+    return redirect(url_for('supervision.metriques_admin'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp_supervision.route('/admin/metriques/profil/<nom>')
+@login_required
+def voir_profil(nom):
+    if not current_user.is_admin:
+        return redirect(url_for('tournois.index'))
+    if nom not in profils_enregistres():
+        abort(404)
+    chemin = os.path.join(current_app.config['PROFILER_DOSSIER'], nom)
+    if request.args.get('brut'): # For snakeviz, gprof2dot...
+        return send_file(chemin, as_attachment=True, download_name=nom)
+    tri = request.args.get('tri')
+    sortie = StringIO()
+    stats = pstats.Stats(chemin, stream=sortie)
+    stats.sort_stats(tri if tri in ('cumulative', 'tottime', 'calls') else 'cumulative').print_stats(40)
+    return Response(sortie.getvalue(), mimetype='text/plain')
+
+@bp_comptes.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('tournois.index'))
     if request.method == 'POST':
         username = request.form['username']
         prenom = request.form['prenom']
@@ -121,11 +800,12 @@ def register():
         user_exists = Joueur.query.filter_by(username=username).first()
         if user_exists:
             flash('Ce nom d\'utilisateur est déjà pris.', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('comptes.register'))
 
         nouveau_joueur = Joueur(username=username, prenom=prenom, nom=nom, elo=elo_initial)
         nouveau_joueur.set_password(password)
         db.session.add(nouveau_joueur)
+        invalider_cache_accueil()
         db.session.commit()
 
         start_date = datetime(datetime.now().year, 10, 1)
@@ -133,12 +813,12 @@ def register():
         db.session.commit()
 
         flash('Compte créé avec succès ! ELO de départ : 1500. Vous pouvez maintenant vous connecter.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('comptes.login'))
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp_comptes.route('/login', methods=['GET', 'POST'])
 def login():
-    if current_user.is_authenticated: return redirect(url_for('index'))
+    if current_user.is_authenticated: return redirect(url_for('tournois.index'))
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
@@ -147,87 +827,111 @@ def login():
             login_user(user, remember=True)
             # Redirect to intended page or index
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('index'))
+            return redirect(next_page or url_for('tournois.index'))
         else:
             flash('Nom d\'utilisateur ou mot de passe incorrect.', 'danger')
-            return redirect(url_for('login'))
+            return redirect(url_for('comptes.login'))
     return render_template('login.html')
 
-@app.route('/logout')
+@bp_comptes.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Vous avez été déconnecté.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('tournois.index'))
 
-@app.route('/profil')
+@bp_comptes.route('/profil')
 @login_required
 def profil():
-    # (profil logic with weekly ELO calculation - unchanged)
-    history_query = None
-    try:
-        if IS_POSTGRES:
-            week_group = func.to_char(EloHistory.date, 'YYYY-WW')
-            subquery = db.session.query(
-                EloHistory.id, EloHistory.elo, EloHistory.date,
-                func.row_number().over(
-                    partition_by=week_group,
-                    order_by=EloHistory.date.desc()
-                ).label('rn')
-            ).filter(EloHistory.joueur_id == current_user.id).subquery()
-            history_query = db.session.query(subquery.c.elo, subquery.c.date) \
-                                      .filter(subquery.c.rn == 1) \
-                                      .order_by(subquery.c.date)
-        else:
-            week_group = func.strftime('%Y-%W', EloHistory.date)
-            subquery = db.session.query(
-                week_group.label('week_group'),
-                func.max(EloHistory.date).label('max_date')
-            ).filter(EloHistory.joueur_id == current_user.id) \
-             .group_by('week_group') \
-             .subquery()
-            history_query = db.session.query(EloHistory.elo, EloHistory.date) \
-                                      .join(subquery, EloHistory.date == subquery.c.max_date) \
-                                      .order_by(EloHistory.date)
-        history = history_query.all()
-        if not history:
-             # Ensure at least the starting ELO is shown
-            start_history = EloHistory.query.filter_by(joueur_id=current_user.id, note="Création du compte").first()
-            if start_history:
-                 history = [(start_history.elo, start_history.date)]
-            else: # Fallback if even the start history is missing
-                 history = [(current_user.elo, datetime(datetime.now().year, 10, 1))]
-
-
-    except exc.OperationalError:
-        # Fallback if SQL functions are not supported
-        history_raw = EloHistory.query.filter_by(joueur_id=current_user.id).order_by(EloHistory.date).all()
-        if not history_raw:
-            history = [(current_user.elo, datetime(datetime.now().year, 10, 1))]
-        else:
-            history = [(h.elo, h.date) for h in history_raw]
+    # Weekly ELO curve, served from the period snapshots (see serie_elo)
+    history = serie_elo(current_user.id, 'semaine')
+    if not history:
+        # Ensure at least the current ELO is shown
+        history = [(current_user.elo, datetime(datetime.now().year, 10, 1))]
+    history = sous_echantillonner(history, POINTS_COURBE_ELO)
 
     labels = [h_date.strftime('%Y-%m-%d') for h_elo, h_date in history]
     data = [h_elo for h_elo, h_date in history]
-    return render_template('profil.html', labels=labels, data=data)
+    return render_template('profil.html', labels=labels, data=data, resolutions=RESOLUTIONS)
+
+@bp_comptes.route('/api/joueur/<int:id>/elo')
+@login_required
+def api_elo_joueur(id):
+    """ELO series of a player as JSON: ?resolution=jour|semaine|mois&debut=AAAA-MM-JJ&fin=AAAA-MM-JJ&points=N"""
+    resolution = request.args.get('resolution', 'semaine')
+    if resolution not in RESOLUTIONS:
+        return jsonify(erreur=f"Résolution invalide (attendu : {', '.join(RESOLUTIONS)})."), 400
+    try:
+        debut = datetime.strptime(request.args['debut'], '%Y-%m-%d') if request.args.get('debut') else None
+        fin = datetime.strptime(request.args['fin'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('fin') else None
+        points = max(3, min(int(request.args.get('points', POINTS_COURBE_ELO)), MAX_POINTS_COURBE_ELO))
+    except ValueError:
+        return jsonify(erreur="Paramètres invalides (dates au format AAAA-MM-JJ)."), 400
+    if db.session.get(Joueur, id) is None:
+        return jsonify(erreur="Joueur introuvable."), 404
+
+    history = [(elo, date) for elo, date in serie_elo(id, resolution)
+               if (debut is None or date >= debut) and (fin is None or date < fin)]
+    history = sous_echantillonner(history, points)
+    return jsonify(joueur_id=id, resolution=resolution,
+                   labels=[h_date.strftime('%Y-%m-%d') for h_elo, h_date in history],
+                   data=[h_elo for h_elo, h_date in history])
 
 
 # --- Routes de l'Application (Admin) ---
-# (gerer_joueurs, modifier_elo, supprimer_joueur, creer_tournoi, supprimer_tournoi - unchanged)
-@app.route('/joueurs')
+@bp_joueurs.route('/joueurs')
 @login_required
 def gerer_joueurs():
     if not current_user.is_admin:
-        return redirect(url_for('index'))
+        return redirect(url_for('tournois.index'))
     joueurs = Joueur.query.order_by(Joueur.elo.desc()).all()
     return render_template('admin_joueurs.html', joueurs=joueurs)
 
-@app.route('/joueur/modifier_elo/<int:id>', methods=['POST'])
+TAILLE_RECHERCHE_JOUEURS = 20
+
+def minuscules_sql(texte):
+    """texte lowered as the database's lower() does it: SQLite's only folds ASCII letters."""
+    if db.engine.dialect.name == 'sqlite':
+        return ''.join(c.lower() if c.isascii() else c for c in texte)
+    return texte.lower()
+
+def filtre_prefixe(colonne, prefixe):
+    """lower(colonne) starts with prefixe (already lowered): a range on the lower() index, then the exact test.
+
+    The bound is the next string in code point order, so the range is compared
+    under the "C" collation (see Minuscules), like the index.
+    """
+    borne = prefixe[:-1] + chr(ord(prefixe[-1]) + 1)
+    minuscules = Minuscules(colonne)
+    return and_(minuscules >= prefixe, minuscules < borne, minuscules.startswith(prefixe, autoescape=True))
+
+def rechercher_joueurs(texte, limite=TAILLE_RECHERCHE_JOUEURS):
+    """Players whose first name, last name or username starts with each word of texte, by name."""
+    mots = [minuscules_sql(mot) for mot in texte.split()]
+    if not mots:
+        return []
+    return db.session.query(Joueur.id, Joueur.prenom, Joueur.nom, Joueur.username, Joueur.elo) \
+                     .filter(*[or_(filtre_prefixe(Joueur.nom, mot), filtre_prefixe(Joueur.prenom, mot),
+                                   filtre_prefixe(Joueur.username, mot)) for mot in mots]) \
+                     .order_by(Joueur.nom, Joueur.prenom, Joueur.id).limit(limite).all()
+
+@bp_joueurs.route('/joueurs/recherche')
+@login_required
+def recherche_joueurs():
+    """Autocomplete of the registration picker: ?q=<name prefixes>&limite=N (admins only)."""
+    if not current_user.is_admin:
+        return jsonify(erreur="Action non autorisée."), 403
+    limite = max(1, min(request.args.get('limite', TAILLE_RECHERCHE_JOUEURS, type=int), 50))
+    joueurs = rechercher_joueurs(request.args.get('q', '')[:80], limite)
+    return jsonify(joueurs=[{'id': j.id, 'prenom': j.prenom, 'nom': j.nom, 'username': j.username, 'elo': j.elo}
+                            for j in joueurs])
+
+@bp_joueurs.route('/joueur/modifier_elo/<int:id>', methods=['POST'])
 @login_required
 def modifier_elo(id):
     if not current_user.is_admin:
         flash('Action non autorisée.', 'danger')
-        return redirect(url_for('gerer_joueurs'))
+        return redirect(url_for('joueurs.gerer_joueurs'))
 
     joueur = Joueur.query.get_or_404(id)
     try:
@@ -236,105 +940,290 @@ def modifier_elo(id):
             flash('L\'ELO ne peut pas être négatif.', 'danger')
         else:
             joueur.elo = new_elo
-            db.session.add(EloHistory(joueur_id=joueur.id, elo=new_elo, note=f"Modif. Admin par {current_user.username}"))
+            db.session.add(EloHistory(joueur_id=joueur.id, elo=new_elo, note=f"{NOTE_MODIF_ADMIN} par {current_user.username}"))
+            invalider_cache_accueil()
+            invalider_identites([joueur.id])
             db.session.commit()
             flash(f'ELO de {joueur.prenom} {joueur.nom} mis à jour à {new_elo}.', 'success')
     except ValueError:
         flash('Valeur ELO invalide.', 'danger')
 
-    return redirect(url_for('gerer_joueurs'))
+    return redirect(url_for('joueurs.gerer_joueurs'))
 
-@app.route('/joueur/supprimer/<int:id>')
+@bp_joueurs.route('/joueur/supprimer/<int:id>')
 @login_required
 def supprimer_joueur(id):
     if not current_user.is_admin:
         flash('Action non autorisée.', 'danger')
-        return redirect(url_for('index'))
+        return redirect(url_for('tournois.index'))
 
     joueur = Joueur.query.get_or_404(id)
-    Match.query.filter((Match.joueur1_id == id) | (Match.joueur2_id == id)).delete()
+    filtre_matchs = (Match.joueur1_id == id) | (Match.joueur2_id == id)
+    tournois_touches = [t_id for (t_id,) in db.session.query(Match.tournoi_id).filter(filtre_matchs).distinct()]
+    db.session.execute(delete(PlaceRonde).where(PlaceRonde.match_id.in_(select(Match.id).where(filtre_matchs))))
+    Match.query.filter(filtre_matchs).delete()
+    Classement.query.filter_by(joueur_id=id).delete()
+    EloSnapshot.query.filter_by(joueur_id=id).delete()
     db.session.delete(joueur) # EloHistory is deleted via cascade
+    invalider_cache_accueil()
+    invalider_identites([id])
+    db.session.flush()
+    for t_id in tournois_touches: # Opponents lose the deleted games too
+        reconstruire_classement(t_id)
+        toucher_tournoi(db.session.get(Tournoi, t_id))
     db.session.commit()
     flash('Joueur (et ses matchs/historique) supprimé.', 'success')
-    return redirect(url_for('gerer_joueurs'))
+    return redirect(url_for('joueurs.gerer_joueurs'))
 
 
-@app.route('/tournoi/creer', methods=['POST'])
+@bp_tournois.route('/tournoi/creer', methods=['POST'])
 @login_required
 def creer_tournoi():
-    if not current_user.is_admin: return redirect(url_for('index'))
-    nouveau_tournoi = Tournoi(nom=request.form['nom'], nombre_rondes=int(request.form['nombre_rondes']))
+    if not current_user.is_admin: return redirect(url_for('tournois.index'))
+    type_tournoi = request.form.get('type_tournoi', 'suisse')
+    if type_tournoi not in TYPES_TOURNOI:
+        flash('Type de tournoi inconnu.', 'danger')
+        return redirect(url_for('tournois.index'))
+    # Round-robins get their number of rounds from the players registered at the start
+    nombre_rondes = 0 if type_tournoi in TYPES_TOUTES_RONDES else int(request.form['nombre_rondes'])
+    nouveau_tournoi = Tournoi(nom=request.form['nom'], type_tournoi=type_tournoi, nombre_rondes=nombre_rondes)
     db.session.add(nouveau_tournoi)
+    invalider_cache_accueil()
     db.session.commit()
     flash('Tournoi créé ! Vous pouvez maintenant le voir dans la liste des tournois actifs.', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('tournois.index'))
 
-@app.route('/tournoi/supprimer/<int:id>')
+@bp_tournois.route('/tournoi/supprimer/<int:id>')
 @login_required
 def supprimer_tournoi(id):
-    if not current_user.is_admin: return redirect(url_for('index'))
+    if not current_user.is_admin: return redirect(url_for('tournois.index'))
     tournoi = Tournoi.query.get_or_404(id)
+    PlaceRonde.query.filter_by(tournoi_id=id).delete()
     Match.query.filter_by(tournoi_id=id).delete()
+    Classement.query.filter_by(tournoi_id=id).delete()
+    TournoiArchive.query.filter_by(tournoi_id=id).delete()
+    # The players' history is kept, detached from the deleted tournament (its id may be reused)
+    EloHistory.query.filter_by(tournoi_id=id).update({'tournoi_id': None, 'ronde': None})
     tournoi.joueurs = [] # Remove associations
     db.session.delete(tournoi)
+    invalider_cache_accueil()
     db.session.commit()
+    cache_fragments.oublier(lambda cle: cle[1] == id)
     flash(f'Le tournoi "{tournoi.nom}" a été supprimé.', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('tournois.index'))
 
 # --- Routes des Tournois (Publiques et Admin) ---
-# (index, rejoindre_tournoi, retirer_joueur, gerer_tournoi, generer_ronde, sauver_resultats, export_pdf - unchanged)
-@app.route('/')
+def lire_curseur(valeur, convertir):
+    """Parses a keyset cursor 'valeur_id' from the query string; None if absent or invalid."""
+    if not valeur or '_' not in valeur:
+        return None
+    cle, _, identifiant = valeur.rpartition('_')
+    try:
+        return convertir(cle), int(identifiant)
+    except ValueError:
+        return None
+
+def page_classement_elo(apres=None):
+    """One leaderboard page ordered by (elo desc, id), starting after the (elo, id) cursor."""
+    requete = db.session.query(Joueur.id, Joueur.prenom, Joueur.nom, Joueur.elo).order_by(Joueur.elo.desc(), Joueur.id)
+    if apres:
+        elo, joueur_id = apres
+        requete = requete.filter(or_(Joueur.elo < elo, and_(Joueur.elo == elo, Joueur.id > joueur_id)))
+    lignes = requete.limit(TAILLE_PAGE_ACCUEIL + 1).all()
+    suivant = None
+    if len(lignes) > TAILLE_PAGE_ACCUEIL:
+        lignes = lignes[:TAILLE_PAGE_ACCUEIL]
+        suivant = f"{lignes[-1].elo}_{lignes[-1].id}"
+    return lignes, suivant
+
+def page_tournois_termines(apres=None):
+    """One page of finished tournaments ordered by (date_creation desc, id desc)."""
+    requete = db.session.query(Tournoi.id, Tournoi.nom, Tournoi.date_creation).filter(Tournoi.termine == True) \
+                        .order_by(Tournoi.date_creation.desc(), Tournoi.id.desc())
+    if apres:
+        date_creation, tournoi_id = apres
+        requete = requete.filter(or_(Tournoi.date_creation < date_creation,
+                                     and_(Tournoi.date_creation == date_creation, Tournoi.id < tournoi_id)))
+    lignes = requete.limit(TAILLE_PAGE_ACCUEIL + 1).all()
+    suivant = None
+    if len(lignes) > TAILLE_PAGE_ACCUEIL:
+        lignes = lignes[:TAILLE_PAGE_ACCUEIL]
+        suivant = f"{lignes[-1].date_creation.isoformat()}_{lignes[-1].id}"
+    return lignes, suivant
+
+def donnees_accueil():
+    """First pages of the home page lists, from the process cache when fresh."""
+    donnees = cache_accueil.get('donnees')
+    if donnees is None or cache_accueil.get('expire', 0) < time.monotonic():
+        active_tournois = db.session.query(Tournoi.id, Tournoi.nom, Tournoi.ronde_actuelle) \
+                                    .filter(Tournoi.termine == False).order_by(Tournoi.date_creation.desc()).all()
+        finished_tournois, historique_suivant = page_tournois_termines()
+        joueurs_tries, classement_suivant = page_classement_elo()
+        donnees = dict(active_tournois=active_tournois,
+                       finished_tournois=finished_tournois, historique_suivant=historique_suivant,
+                       joueurs_tries=joueurs_tries, classement_suivant=classement_suivant)
+        cache_accueil.update(donnees=donnees, expire=time.monotonic() + current_app.config['ACCUEIL_CACHE_TTL'])
+    return donnees
+
+@bp_tournois.route('/')
 def index():
-    active_tournois = Tournoi.query.filter_by(termine=False).order_by(Tournoi.date_creation.desc()).all()
-    finished_tournois = Tournoi.query.filter_by(termine=True).order_by(Tournoi.date_creation.desc()).all()
-    joueurs_tries = Joueur.query.order_by(Joueur.elo.desc()).all()
-
-    return render_template('index.html',
-                           active_tournois=active_tournois,
-                           finished_tournois=finished_tournois,
-                           joueurs_tries=joueurs_tries)
-
-@app.route('/tournoi/<int:id>/rejoindre', methods=['POST'])
+    donnees = dict(donnees_accueil())
+    # Later pages (keyset cursors) bypass the cache
+    classement_apres = lire_curseur(request.args.get('classement_apres'), int)
+    if classement_apres:
+        donnees['joueurs_tries'], donnees['classement_suivant'] = page_classement_elo(classement_apres)
+    historique_apres = lire_curseur(request.args.get('historique_apres'), datetime.fromisoformat)
+    if historique_apres:
+        donnees['finished_tournois'], donnees['historique_suivant'] = page_tournois_termines(historique_apres)
+
+    mes_tournois = set()
+    if current_user.is_authenticated and not current_user.is_admin:
+        mes_tournois = {t_id for (t_id,) in db.session.query(tournoi_joueurs.c.tournoi_id)
+                                                      .filter(tournoi_joueurs.c.joueur_id == current_user.id)}
+
+    return render_template('index.html', mes_tournois=mes_tournois, types_tournoi=TYPES_TOURNOI,
+                           rang_depart=request.args.get('rang', 1, type=int),
+                           onglet=request.args.get('onglet', 'actifs'), **donnees)
+
+@bp_tournois.route('/tournoi/<int:id>/rejoindre', methods=['POST'])
 @login_required
 def rejoindre_tournoi(id):
     tournoi = Tournoi.query.get_or_404(id)
     if tournoi.ronde_actuelle > 0:
         flash("Les inscriptions sont fermées, le tournoi a déjà commencé.", 'danger')
-        return redirect(url_for('index'))
-    if current_user in tournoi.joueurs:
+        return redirect(url_for('tournois.index'))
+    joueur = db.session.get(Joueur, current_user.id) # current_user is a cached Identite, not a mapped Joueur
+    if joueur in tournoi.joueurs:
         flash("Vous êtes déjà inscrit à ce tournoi.", 'warning')
-        return redirect(url_for('gerer_tournoi', id=id))
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
 
-    tournoi.joueurs.append(current_user)
+    tournoi.joueurs.append(joueur)
+    toucher_tournoi(tournoi)
     db.session.commit()
     flash(f"Vous êtes maintenant inscrit au tournoi '{tournoi.nom}' !", 'success')
-    return redirect(url_for('gerer_tournoi', id=id))
+    return redirect(url_for('tournois.gerer_tournoi', id=id))
 
-@app.route('/tournoi/<int:tournoi_id>/retirer_joueur/<int:joueur_id>')
+@bp_tournois.route('/tournoi/<int:tournoi_id>/retirer_joueur/<int:joueur_id>')
 @login_required
 def retirer_joueur(tournoi_id, joueur_id):
     if not current_user.is_admin:
         flash('Action non autorisée.', 'danger')
-        return redirect(url_for('gerer_tournoi', id=tournoi_id))
+        return redirect(url_for('tournois.gerer_tournoi', id=tournoi_id))
 
     tournoi = Tournoi.query.get_or_404(tournoi_id)
     if tournoi.termine:
         flash('Le tournoi est terminé, impossible de retirer un joueur.', 'warning')
-        return redirect(url_for('gerer_tournoi', id=tournoi_id))
+        return redirect(url_for('tournois.gerer_tournoi', id=tournoi_id))
 
     joueur = Joueur.query.get_or_404(joueur_id)
 
     if joueur in tournoi.joueurs:
         tournoi.joueurs.remove(joueur)
+        toucher_tournoi(tournoi)
         db.session.commit()
         flash(f'{joueur.prenom} {joueur.nom} a été retiré(e) du tournoi. Il/Elle ne sera plus apparié(e).', 'success')
     else:
         flash('Ce joueur n\'est pas (ou plus) dans le tournoi.', 'warning')
 
-    return redirect(url_for('gerer_tournoi', id=tournoi_id))
-
-
-@app.route('/tournoi/<int:id>', methods=['GET', 'POST'])
+    return redirect(url_for('tournois.gerer_tournoi', id=tournoi_id))
+
+
+# Rendered fragments of the tournament page (standings rows, round summaries) that no
+# longer change: every part of a finished tournament, keyed on its version, and the
+# summaries of completed rounds, keyed on their results. Per process, LRU-evicted.
+class CacheLRU:
+    """Thread-safe LRU of rendered content (PDF bytes, HTML), bounded in total size."""
+    def __init__(self, max_octets):
+        self.max_octets = max_octets
+        self.taille = 0
+        self.entrees = OrderedDict()
+        self.verrou = threading.Lock()
+
+    def get(self, cle):
+        with self.verrou:
+            contenu = self.entrees.get(cle)
+            if contenu is not None:
+                self.entrees.move_to_end(cle)
+            return contenu
+
+    def put(self, cle, contenu):
+        if len(contenu) > self.max_octets:
+            return
+        with self.verrou:
+            ancien = self.entrees.pop(cle, None)
+            if ancien is not None:
+                self.taille -= len(ancien)
+            self.entrees[cle] = contenu
+            self.taille += len(contenu)
+            while self.taille > self.max_octets:
+                _, evince = self.entrees.popitem(last=False)
+                self.taille -= len(evince)
+
+    def oublier(self, predicat):
+        """Drops the entries whose key matches the predicate."""
+        with self.verrou:
+            for cle in [c for c in self.entrees if predicat(c)]:
+                self.taille -= len(self.entrees.pop(cle))
+
+cache_fragments = CacheLRU(16 * 1024 * 1024) # Bound set from the config by create_app
+
+def donnees_page_tournoi(tournoi):
+    """Scores, tiebreaks, participants in standings order and matches per published round."""
+    if tournoi.archive:
+        archive = charger_archive(tournoi)
+        scores = {pid: ligne.points for pid, ligne in archive.classement.items()}
+        matchs, participants = archive.matchs, archive.inscrits
+    else:
+        # Scores come from the standings rows (withdrawn players keep theirs)
+        scores = {pid: ligne.points for pid, ligne in charger_classement(tournoi).items()}
+        # All rounds in one query, players joined in, grouped by round in Python
+        matchs = Match.query.options(joinedload(Match.joueur1), joinedload(Match.joueur2)) \
+                            .filter(Match.tournoi_id == tournoi.id, Match.ronde <= tournoi.ronde_actuelle) \
+                            .order_by(Match.ronde, Match.id).all()
+        participants = tournoi.joueurs
+
+    matchs_par_ronde = {r: [] for r in range(1, tournoi.ronde_actuelle + 1)}
+    for m in matchs:
+        matchs_par_ronde.setdefault(m.ronde, []).append(m)
+
+    # Sort CURRENT participants for display: score, tiebreaks, then ELO
+    departages = departages_tournoi(tournoi, [(m.ronde, m.joueur1_id, m.joueur2_id, m.resultat) for m in matchs])
+    ordre = ordre_departages(tournoi)
+    joueurs_tries = sorted(participants, key=lambda j: cle_classement(scores.get(j.id, 0.0), departages.get(j.id), j.elo, ordre),
+                           reverse=True)
+    return scores, departages, joueurs_tries, matchs_par_ronde
+
+def resumes_rondes(tournoi, matchs_par_ronde):
+    """HTML summary of each round, newest first; completed rounds come from the fragment cache."""
+    resume_ronde = get_template_attribute('tournoi_fragments.html', 'resume_ronde')
+    resumes = []
+    for ronde, matchs in sorted(matchs_par_ronde.items(), reverse=True):
+        if ronde < tournoi.ronde_actuelle:
+            # Results of a completed round only change if a player is deleted, which drops rows
+            cle = ('ronde', tournoi.id, ronde, hash(tuple((m.id, m.resultat) for m in matchs)))
+            html = cache_fragments.get(cle)
+            if html is None:
+                html = str(resume_ronde(ronde, matchs))
+                cache_fragments.put(cle, html)
+            resumes.append(Markup(html))
+        else:
+            resumes.append(resume_ronde(ronde, matchs))
+    return resumes
+
+def fragments_tournoi_termine(tournoi):
+    """(standings rows, round summaries) of a finished tournament, rendered once per version."""
+    cle = ('termine', tournoi.id, tournoi.version)
+    classement_html, rondes_html = cache_fragments.get(cle + ('classement',)), cache_fragments.get(cle + ('rondes',))
+    if classement_html is None or rondes_html is None:
+        scores, departages, joueurs_tries, matchs_par_ronde = donnees_page_tournoi(tournoi)
+        lignes_classement = get_template_attribute('tournoi_fragments.html', 'lignes_classement')
+        classement_html = str(lignes_classement(tournoi, joueurs_tries, scores, departages, False))
+        rondes_html = ''.join(resumes_rondes(tournoi, matchs_par_ronde))
+        cache_fragments.put(cle + ('classement',), classement_html)
+        cache_fragments.put(cle + ('rondes',), rondes_html)
+    return Markup(classement_html), [Markup(rondes_html)] if rondes_html else []
+
+@bp_tournois.route('/tournoi/<int:id>', methods=['GET', 'POST'])
 @login_required
 def gerer_tournoi(id):
     tournoi = Tournoi.query.get_or_404(id)
@@ -342,199 +1231,615 @@ def gerer_tournoi(id):
     if request.method == 'POST': # Manual registration (Admin)
         if not current_user.is_admin:
             flash('Action non autorisée.', 'danger')
-            return redirect(url_for('gerer_tournoi', id=id))
-        ids_joueurs_a_inscrire = request.form.getlist('joueurs_ids')
-        tournoi.joueurs = [] # Reset and add selected
-        for joueur_id in ids_joueurs_a_inscrire:
-            joueur = Joueur.query.get(joueur_id)
-            if joueur: tournoi.joueurs.append(joueur)
+            return redirect(url_for('tournois.gerer_tournoi', id=id))
+        if tournoi.ronde_actuelle > 0:
+            flash("Les inscriptions sont fermées, le tournoi a déjà commencé.", 'danger')
+            return redirect(url_for('tournois.gerer_tournoi', id=id))
+        reserver_tournoi(tournoi) # A player who joined since the form was rendered is not dropped silently
+        # The form sends the whole selection; only the difference is written, in one DELETE and one INSERT
+        selection = {int(j) for j in request.form.getlist('joueurs_ids') if j.isdigit()}
+        inscrits = set(db.session.scalars(select(tournoi_joueurs.c.joueur_id).where(tournoi_joueurs.c.tournoi_id == id)))
+        a_retirer = inscrits - selection
+        a_ajouter = set(db.session.scalars(select(Joueur.id).where(Joueur.id.in_(selection - inscrits)))) if selection - inscrits else set()
+        if a_retirer:
+            db.session.execute(delete(tournoi_joueurs).where(tournoi_joueurs.c.tournoi_id == id,
+                                                             tournoi_joueurs.c.joueur_id.in_(a_retirer)))
+        if a_ajouter:
+            db.session.execute(insert(tournoi_joueurs), [{'tournoi_id': id, 'joueur_id': j} for j in sorted(a_ajouter)])
         db.session.commit()
-        flash('Inscriptions mises à jour.', 'success')
-        return redirect(url_for('gerer_tournoi', id=id))
-
-    tous_les_joueurs = Joueur.query.order_by(Joueur.nom).all()
-    joueurs_inscrits_ids = {j.id for j in tournoi.joueurs}
-
-    # Score calculation logic handling withdrawn players
-    matchs_du_tournoi = Match.query.filter_by(tournoi_id=id).all()
-    all_player_ids_in_tournoi = set(j.id for j in tournoi.joueurs)
-    for m in matchs_du_tournoi:
-        if m.joueur1_id: all_player_ids_in_tournoi.add(m.joueur1_id)
-        if m.joueur2_id: all_player_ids_in_tournoi.add(m.joueur2_id)
-    scores = {pid: 0.0 for pid in all_player_ids_in_tournoi}
-    for m in matchs_du_tournoi:
-        if m.resultat is not None:
-            if m.joueur1_id in scores: scores[m.joueur1_id] += m.resultat
-            if m.joueur2_id in scores: scores[m.joueur2_id] += (1.0 - m.resultat)
+        flash(f'Inscriptions mises à jour : {len(a_ajouter)} ajout(s), {len(a_retirer)} retrait(s).', 'success')
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
 
-    # Sort CURRENT participants for display
-    joueurs_tries = sorted(tournoi.joueurs, key=lambda j: (scores.get(j.id, 0.0), j.elo), reverse=True)
+    if tournoi.termine: # Nothing left to edit: the page is the cached fragments plus the viewer's style
+        classement_html, resumes = fragments_tournoi_termine(tournoi)
+        return render_template('tournoi.html', tournoi=tournoi, classement_html=classement_html, resumes=resumes,
+                               types_tournoi=TYPES_TOURNOI)
 
-    matchs_par_ronde = {}
-    for r in range(1, tournoi.ronde_actuelle + 1):
-        matchs_par_ronde[r] = Match.query.filter_by(tournoi_id=id, ronde=r).all()
+    # The registration picker only shows before round 1; other players are found through recherche_joueurs
+    joueurs_inscrits = sorted(tournoi.joueurs, key=lambda j: (j.nom, j.prenom)) if tournoi.ronde_actuelle == 0 else []
+    scores, departages, joueurs_tries, matchs_par_ronde = donnees_page_tournoi(tournoi)
+    lignes_classement = get_template_attribute('tournoi_fragments.html', 'lignes_classement')
+    classement_html = lignes_classement(tournoi, joueurs_tries, scores, departages, current_user.is_admin)
+    matchs_a_jouer = [m for m in matchs_par_ronde.get(tournoi.ronde_actuelle, []) if m.resultat is None and m.joueur2]
 
-    return render_template('tournoi.html', tournoi=tournoi, tous_les_joueurs=tous_les_joueurs, joueurs_inscrits_ids=joueurs_inscrits_ids, scores=scores, joueurs_tries=joueurs_tries, matchs_par_ronde=matchs_par_ronde)
+    return render_template('tournoi.html', tournoi=tournoi, joueurs_inscrits=joueurs_inscrits,
+                           classement_html=classement_html, resumes=resumes_rondes(tournoi, matchs_par_ronde),
+                           matchs_a_jouer=matchs_a_jouer, types_tournoi=TYPES_TOURNOI)
 
 
-@app.route('/tournoi/<int:id>/generer_ronde')
+@bp_tournois.route('/tournoi/<int:id>/generer_ronde', methods=['POST'])
 @login_required
 def generer_ronde(id):
-    if not current_user.is_admin: return redirect(url_for('gerer_tournoi', id=id))
+    if not current_user.is_admin: return redirect(url_for('tournois.gerer_tournoi', id=id))
     tournoi = Tournoi.query.get_or_404(id)
+    if not consommer_jeton():
+        flash("Cette ronde a déjà été générée.", "info")
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
+    toutes_rondes = tournoi.type_tournoi in TYPES_TOUTES_RONDES
+    if toutes_rondes and tournoi.ronde_actuelle == 0:
+        if len(tournoi.joueurs) < 2:
+            flash("Il faut au moins deux joueurs inscrits.", "warning")
+            return redirect(url_for('tournois.gerer_tournoi', id=id))
+        nombre_joueurs = len(tournoi.joueurs) + len(tournoi.joueurs) % 2
+        tournoi.nombre_rondes = (nombre_joueurs - 1) * (2 if tournoi.type_tournoi == 'berger_double' else 1)
     if tournoi.termine or tournoi.ronde_actuelle >= tournoi.nombre_rondes:
         flash("Tournoi terminé ou max rondes atteint.", "warning")
-        return redirect(url_for('gerer_tournoi', id=id))
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
     if tournoi.ronde_actuelle > 0:
         matchs_ronde_precedente = Match.query.filter_by(tournoi_id=id, ronde=tournoi.ronde_actuelle).all()
         if any(m.resultat is None for m in matchs_ronde_precedente if m.joueur2_id): # Only check non-bye matches
             flash("Veuillez entrer tous les résultats de la ronde actuelle.", "danger")
-            return redirect(url_for('gerer_tournoi', id=id))
+            return redirect(url_for('tournois.gerer_tournoi', id=id))
 
     tournoi.ronde_actuelle += 1
+    reserver_tournoi(tournoi)
 
     # Pairings use current tournoi.joueurs
-    scores = {j.id: 0.0 for j in tournoi.joueurs}
-    matchs_du_tournoi = Match.query.filter_by(tournoi_id=id).all()
-    for m in matchs_du_tournoi:
-        if m.resultat is not None:
-            if m.joueur1_id in scores: scores[m.joueur1_id] += m.resultat
-            if m.joueur2_id in scores: scores[m.joueur2_id] += (1.0 - m.resultat)
+    classement = charger_classement(tournoi)
+    for j in tournoi.joueurs:
+        if j.id not in classement:
+            classement[j.id] = nouvelle_ligne_classement(id, j.id)
+    if toutes_rondes:
+        if tournoi.ronde_actuelle == 1:
+            planifier_toutes_rondes(tournoi)
+        publier_ronde_toutes_rondes(tournoi, classement)
+        return enregistrer_ronde(tournoi)
+
+    scores = {j.id: classement[j.id].points for j in tournoi.joueurs}
+    couleurs = {j.id: classement[j.id].couleurs for j in tournoi.joueurs}
+    exemptes = {j.id for j in tournoi.joueurs if classement[j.id].exempt}
 
     joueurs_a_apparier = sorted(tournoi.joueurs, key=lambda j: (scores.get(j.id, 0.0), j.elo), reverse=True)
     adversaires_deja_rencontres = {j.id: set() for j in tournoi.joueurs}
-    for m in matchs_du_tournoi:
-        if m.joueur1_id and m.joueur2_id:
-            # Only consider encounters between currently active players for future pairings
-            if m.joueur1_id in adversaires_deja_rencontres:
-                adversaires_deja_rencontres[m.joueur1_id].add(m.joueur2_id)
-            if m.joueur2_id in adversaires_deja_rencontres:
-                adversaires_deja_rencontres[m.joueur2_id].add(m.joueur1_id)
-
-
-    appariements = []
-    joueurs_non_apparies = list(joueurs_a_apparier)
-    while len(joueurs_non_apparies) > 1:
-        j1 = joueurs_non_apparies.pop(0) # White
-        # Find opponent j2 hasn't played yet
-        j2_trouve = next((j for j in joueurs_non_apparies if j.id not in adversaires_deja_rencontres[j1.id]), None)
-        if not j2_trouve: # If all possible opponents already played, force pairing
-             j2_trouve = joueurs_non_apparies.pop(0) # Black
-        else: # Found suitable opponent
-             joueurs_non_apparies.remove(j2_trouve)
-        appariements.append((j1, j2_trouve)) # (White, Black)
-
-    for j1, j2 in appariements:
-        db.session.add(Match(tournoi_id=id, ronde=tournoi.ronde_actuelle, joueur1_id=j1.id, joueur2_id=j2.id))
-    if joueurs_non_apparies: # Handle bye
-        joueur_exempt = joueurs_non_apparies[0]
+    rencontres = db.session.query(Match.joueur1_id, Match.joueur2_id) \
+                           .filter(Match.tournoi_id == id, Match.joueur2_id.isnot(None))
+    for j1_id, j2_id in rencontres:
+        # Only consider encounters between currently active players for future pairings
+        if j1_id in adversaires_deja_rencontres:
+            adversaires_deja_rencontres[j1_id].add(j2_id)
+        if j2_id in adversaires_deja_rencontres:
+            adversaires_deja_rencontres[j2_id].add(j1_id)
+
+    joueurs_par_id = {j.id: j for j in tournoi.joueurs}
+    appariements, exempt_id = apparier([j.id for j in joueurs_a_apparier], scores, adversaires_deja_rencontres, couleurs, exemptes)
+
+    for blanc_id, noir_id in appariements:
+        db.session.add(Match(tournoi_id=id, ronde=tournoi.ronde_actuelle, joueur1_id=blanc_id, joueur2_id=noir_id))
+        classement[blanc_id].couleurs += 'B'
+        classement[noir_id].couleurs += 'N'
+    if exempt_id is not None: # Handle bye
+        joueur_exempt = joueurs_par_id[exempt_id]
         db.session.add(Match(tournoi_id=id, ronde=tournoi.ronde_actuelle, joueur1_id=joueur_exempt.id, joueur2_id=None, resultat=1.0))
-        # Update ELO for bye (treat as draw against self)
-        # Check if player exists before updating ELO
-        joueur_obj = Joueur.query.get(joueur_exempt.id)
-        if joueur_obj:
-            elo_avant = joueur_obj.elo
-            joueur_obj.elo = calculer_nouveau_elo(elo_avant, elo_avant, 0.5)
-            db.session.add(EloHistory(joueur_id=joueur_obj.id, elo=joueur_obj.elo, note=f"Tournoi {tournoi.nom} R{tournoi.ronde_actuelle} (Bye)"))
-
-
-    db.session.commit()
+        classement[exempt_id].points += 1.0
+        classement[exempt_id].exempt = True
+        noter_exempt(tournoi, joueur_exempt.id)
+    return enregistrer_ronde(tournoi)
+
+def noter_exempt(tournoi, joueur_id):
+    """Rates the bye of the current round (a draw against oneself) and records it in the ELO history."""
+    # Check if player exists before updating ELO
+    joueur_obj = db.session.get(Joueur, joueur_id)
+    if joueur_obj:
+        elo_avant = joueur_obj.elo
+        joueur_obj.elo = calculer_nouveau_elo(elo_avant, elo_avant, 0.5)
+        db.session.add(EloHistory(joueur_id=joueur_obj.id, elo=joueur_obj.elo, note=f"Tournoi {tournoi.nom} R{tournoi.ronde_actuelle} (Bye)",
+                                  tournoi_id=tournoi.id, ronde=tournoi.ronde_actuelle))
+        invalider_identites([joueur_obj.id])
+
+def placer_joueurs(tournoi_id, ronde):
+    """Seats the players of a round's games in PlaceRonde, in the current transaction."""
+    db.session.flush()
+    for colonne in (Match.joueur1_id, Match.joueur2_id):
+        db.session.execute(insert(PlaceRonde).from_select(
+            ['tournoi_id', 'ronde', 'joueur_id', 'match_id'],
+            select(Match.tournoi_id, Match.ronde, colonne, Match.id)
+            .where(Match.tournoi_id == tournoi_id, Match.ronde == ronde, colonne.is_not(None))))
+
+def enregistrer_ronde(tournoi):
+    """Seats the round's players, commits the round and redirects to the tournament page."""
+    id = tournoi.id
+    try:
+        placer_joueurs(id, tournoi.ronde_actuelle)
+        db.session.commit()
+    except exc.IntegrityError: # PlaceRonde or the unique indexes: a player is already seated in this round
+        db.session.rollback()
+        flash("Cette ronde a déjà été générée.", "info")
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
     flash(f"Ronde {tournoi.ronde_actuelle} générée !", "success")
-    return redirect(url_for('gerer_tournoi', id=id))
-
-@app.route('/tournoi/<int:id>/resultats', methods=['POST'])
+    return redirect(url_for('tournois.gerer_tournoi', id=id))
+
+def planifier_toutes_rondes(tournoi):
+    """Writes every round of a round-robin in one bulk INSERT, when round 1 is generated.
+
+    Pairing numbers follow the ratings, highest first. Byes are written without
+    a result: like the games, they score once their round is published.
+    """
+    joueurs = sorted(tournoi.joueurs, key=lambda j: (-j.elo, j.id))
+    calendrier = calendrier_berger([j.id for j in joueurs], aller_retour=tournoi.type_tournoi == 'berger_double')
+    lignes = []
+    for ronde, (appariements, exempt) in enumerate(calendrier, 1):
+        if exempt is not None:
+            appariements = appariements + [(exempt, None)]
+        lignes.extend({'tournoi_id': tournoi.id, 'ronde': ronde, 'joueur1_id': blanc, 'joueur2_id': noir,
+                       'resultat': None, 'elo_gain_j1': 0, 'elo_gain_j2': 0} for blanc, noir in appariements)
+    db.session.execute(insert(Match), lignes)
+
+def publier_ronde_toutes_rondes(tournoi, classement):
+    """Opens the current round of a round-robin: colours in the standings, bye scored and rated."""
+    for m in Match.query.filter_by(tournoi_id=tournoi.id, ronde=tournoi.ronde_actuelle):
+        if m.joueur2_id is None:
+            m.resultat = 1.0
+            if m.joueur1_id in classement:
+                classement[m.joueur1_id].points += 1.0
+                classement[m.joueur1_id].exempt = True
+            noter_exempt(tournoi, m.joueur1_id)
+            continue
+        for joueur_id, couleur in ((m.joueur1_id, 'B'), (m.joueur2_id, 'N')):
+            if joueur_id in classement:
+                classement[joueur_id].couleurs += couleur
+
+@bp_tournois.route('/tournoi/<int:id>/resultats', methods=['POST'])
 @login_required
 def sauver_resultats(id):
-    if not current_user.is_admin: return redirect(url_for('gerer_tournoi', id=id))
+    if not current_user.is_admin: return redirect(url_for('tournois.gerer_tournoi', id=id))
     tournoi = Tournoi.query.get_or_404(id)
+    if tournoi.archive:
+        flash("Ce tournoi est archivé, ses résultats ne peuvent plus être modifiés.", 'warning')
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
+    if tournoi.ronde_actuelle == 0: # Also a round-robin not started yet: nombre_rondes is still 0
+        flash("Aucune ronde n'a encore été générée.", 'warning')
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
+    if not consommer_jeton():
+        flash("Ces résultats ont déjà été enregistrés.", 'info')
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
+    reserver_tournoi(tournoi)
     ronde = tournoi.ronde_actuelle
     matchs_ronde_actuelle = Match.query.filter_by(tournoi_id=id, ronde=ronde).all()
+    classement = charger_classement(tournoi)
+    modifs_classement = {} # joueur_id -> [points, parties], written back in one bulk UPDATE
+    matchs_saisis = [] # Games getting their first result in this request: the only ones rated below
 
     for match in matchs_ronde_actuelle:
         if match.joueur2_id is not None: # Only process non-bye matches
             resultat_form = request.form.get(f'resultat_{match.id}')
             if resultat_form is not None:
+                ancien_resultat = match.resultat
                 match.resultat = float(resultat_form)
-
-    db.session.commit() # Save results first
-
-    # Calculate ELO changes
-    for match in matchs_ronde_actuelle:
-        if match.resultat is not None and match.joueur2_id is not None:
-            j1 = Joueur.query.get(match.joueur1_id)
-            j2 = Joueur.query.get(match.joueur2_id)
-            # Proceed only if both players still exist
-            if j1 and j2:
-                elo_j1_avant = j1.elo
-                elo_j2_avant = j2.elo
-                resultat_j1 = match.resultat
-                resultat_j2 = 1.0 - match.resultat
-
-                j1.elo = calculer_nouveau_elo(elo_j1_avant, elo_j2_avant, resultat_j1)
-                j2.elo = calculer_nouveau_elo(elo_j2_avant, elo_j1_avant, resultat_j2)
-
-                match.elo_gain_j1 = j1.elo - elo_j1_avant
-                match.elo_gain_j2 = j2.elo - elo_j2_avant
-
-                db.session.add(EloHistory(joueur_id=j1.id, elo=j1.elo, note=f"Tournoi {tournoi.nom} R{ronde}"))
-                db.session.add(EloHistory(joueur_id=j2.id, elo=j2.elo, note=f"Tournoi {tournoi.nom} R{ronde}"))
-
-    if tournoi.ronde_actuelle == tournoi.nombre_rondes:
+                if ancien_resultat is None:
+                    matchs_saisis.append(match)
+                # Apply the difference to the standings in the same transaction
+                l1, l2 = classement.get(match.joueur1_id), classement.get(match.joueur2_id)
+                if l1 and l2:
+                    m1 = modifs_classement.setdefault(l1.joueur_id, [l1.points, l1.parties])
+                    m2 = modifs_classement.setdefault(l2.joueur_id, [l2.points, l2.parties])
+                    m1[0] += match.resultat - (ancien_resultat if ancien_resultat is not None else 0.0)
+                    m2[0] += (1.0 - match.resultat) - (1.0 - ancien_resultat if ancien_resultat is not None else 0.0)
+                    if ancien_resultat is None:
+                        m1[1] += 1
+                        m2[1] += 1
+    if modifs_classement:
+        db.session.execute(update(Classement), [
+            {'tournoi_id': id, 'joueur_id': pid, 'points': points, 'parties': parties}
+            for pid, (points, parties) in modifs_classement.items()])
+
+    # Calculate ELO changes for the whole round at once. Corrections of an existing
+    # result are not re-rated here (use the ELO recompute), so nothing is applied twice.
+    matchs_joues = matchs_saisis
+    ids_participants = {m.joueur1_id for m in matchs_joues} | {m.joueur2_id for m in matchs_joues}
+    joueurs = {j.id: j for j in Joueur.query.filter(Joueur.id.in_(ids_participants))} if ids_participants else {}
+    # Proceed only if both players still exist
+    matchs_joues = [m for m in matchs_joues if m.joueur1_id in joueurs and m.joueur2_id in joueurs]
+
+    elos_j1 = [joueurs[m.joueur1_id].elo for m in matchs_joues]
+    elos_j2 = [joueurs[m.joueur2_id].elo for m in matchs_joues]
+    resultats = [m.resultat for m in matchs_joues]
+    nouveaux_j1 = calculer_nouveaux_elos(elos_j1, elos_j2, resultats)
+    nouveaux_j2 = calculer_nouveaux_elos(elos_j2, elos_j1, [1.0 - r for r in resultats])
+
+    note = f"Tournoi {tournoi.nom} R{ronde}"
+    historique = []
+    for match, avant_j1, avant_j2, elo_j1, elo_j2 in zip(matchs_joues, elos_j1, elos_j2, nouveaux_j1, nouveaux_j2):
+        joueurs[match.joueur1_id].elo = elo_j1
+        joueurs[match.joueur2_id].elo = elo_j2
+        match.elo_gain_j1 = elo_j1 - avant_j1
+        match.elo_gain_j2 = elo_j2 - avant_j2
+        historique.append({'joueur_id': match.joueur1_id, 'elo': elo_j1, 'note': note, 'tournoi_id': id, 'ronde': ronde})
+        historique.append({'joueur_id': match.joueur2_id, 'elo': elo_j2, 'note': note, 'tournoi_id': id, 'ronde': ronde})
+    if historique:
+        db.session.execute(insert(EloHistory), historique)
+        invalider_identites(joueurs.keys())
+
+    # Finished once the last round is fully played, not on its first partial save
+    if tournoi.ronde_actuelle == tournoi.nombre_rondes and \
+            all(m.resultat is not None for m in matchs_ronde_actuelle if m.joueur2_id is not None):
         tournoi.termine = True
 
-    db.session.commit() # Save ELO changes and match gains
+    db.session.commit() # Results, standings and ELO changes in one transaction
+    if tournoi.termine:
+        fragments_tournoi_termine(tournoi) # Warm the page everyone is about to open
     flash(f"Résultats de la ronde {ronde} enregistrés et ELO mis à jour !", "success")
-    return redirect(url_for('gerer_tournoi', id=id))
-
-
-# --- PDF ---
-# (export_pdf function using updated player_data logic - unchanged)
-@app.route('/tournoi/<int:id>/export_pdf')
+    return redirect(url_for('tournois.gerer_tournoi', id=id))
+
+
+# --- Recalcul ELO (rejeu complet de l'historique) ---
+TAILLE_LOT_RECALCUL = 10000
+
+def recalculer_elo(dry_run=False, taille_lot=TAILLE_LOT_RECALCUL):
+    """Replays every Match (and the games of the archived snapshots) in chronological order and rewrites ratings, gains and history.
+
+    Rounds are ordered by the date they were rated (their first history row,
+    else the tournament's creation), so overlapping tournaments interleave as
+    they were played. Each player starts from their account-creation rating;
+    admin ELO edits are re-applied as overrides at their date. History rows
+    are only rewritten from the first round whose recomputed gains differ
+    from the stored ones.
+
+    Returns a report: matchs_modifies, rondes_reecrites and joueurs_modifies
+    as a list of (joueur_id, ancien_elo, nouvel_elo).
+    """
+    max_id = db.session.query(func.max(Joueur.id)).scalar() or 0
+    elos = array('i', [1500]) * (max_id + 1) # Ratings indexed by player id
+
+    creations = db.session.execute(select(EloHistory.joueur_id, EloHistory.elo)
+                                   .where(EloHistory.note.like(NOTE_CREATION + '%'))
+                                   .order_by(EloHistory.date.desc()))
+    for joueur_id, elo in creations: # Earliest row wins
+        elos[joueur_id] = elo
+    modifs_admin = db.session.execute(select(EloHistory.date, EloHistory.joueur_id, EloHistory.elo)
+                                      .where(EloHistory.note.like(NOTE_MODIF_ADMIN + '%'))
+                                      .order_by(EloHistory.date)).all()
+    # One date per tournament round, taken from the history rows it originally produced
+    dates_rondes = select(EloHistory.tournoi_id, EloHistory.ronde, func.min(EloHistory.date).label('date')) \
+        .where(EloHistory.tournoi_id.is_not(None)).group_by(EloHistory.tournoi_id, EloHistory.ronde).subquery()
+    tournois, tournois_archives = {}, set()
+    for t_id, nom, archive in db.session.execute(select(Tournoi.id, Tournoi.nom, Tournoi.archive)):
+        tournois[t_id] = nom
+        if archive:
+            tournois_archives.add(t_id)
+
+    rapport = {'matchs_modifies': 0, 'rondes_reecrites': 0, 'joueurs_modifies': []}
+    # Rows written by this run get higher ids, so the old ones can be deleted at the end
+    dernier_id_historique = db.session.query(func.max(EloHistory.id)).scalar() or 0
+    gains_a_ecrire, historique_a_ecrire, rondes_a_effacer = [], [], []
+    gains_archives = {} # tournoi_id -> {match_id: (gain_j1, gain_j2)}, written back into the snapshots at the end
+    historique_ronde = []
+    divergent = False
+    i_modif = 0
+
+    # Plain Core executemany statements: the ORM bulk path costs more than the SQL here
+    maj_gains = Match.__table__.update().where(Match.__table__.c.id == bindparam('m_id')) \
+                                        .values(elo_gain_j1=bindparam('g1'), elo_gain_j2=bindparam('g2'))
+
+    def ecrire_lot():
+        if not dry_run:
+            if gains_a_ecrire:
+                db.session.execute(maj_gains, gains_a_ecrire)
+            if historique_a_ecrire:
+                db.session.execute(EloHistory.__table__.insert(), historique_a_ecrire)
+        gains_a_ecrire.clear()
+        historique_a_ecrire.clear()
+
+    def fin_de_ronde():
+        if divergent and historique_ronde:
+            rapport['rondes_reecrites'] += 1
+            historique_a_ecrire.extend(historique_ronde)
+            rondes_a_effacer.append(ronde_courante)
+        historique_ronde.clear()
+        if len(historique_a_ecrire) + len(gains_a_ecrire) >= taille_lot:
+            ecrire_lot()
+
+    date_ronde = func.coalesce(dates_rondes.c.date, Tournoi.date_creation)
+    matchs = db.session.execute(
+        select(date_ronde, Match.tournoi_id, Match.ronde, Match.id, Match.joueur1_id, Match.joueur2_id,
+               Match.resultat, Match.elo_gain_j1, Match.elo_gain_j2)
+        .join(Tournoi, Match.tournoi_id == Tournoi.id)
+        .outerjoin(dates_rondes, and_(dates_rondes.c.tournoi_id == Match.tournoi_id, dates_rondes.c.ronde == Match.ronde))
+        .order_by(date_ronde, Match.tournoi_id, Match.ronde, Match.id)
+        .execution_options(yield_per=taille_lot))
+    # The games of the archived tournaments come from their snapshots, merged in the same order
+    matchs = heapq.merge(matchs, parties_archivees(dates_rondes), key=itemgetter(0, 1, 2, 3))
+
+    ronde_courante = None
+    for date_ronde, t_id, ronde, m_id, j1, j2, resultat, gain_j1, gain_j2 in matchs:
+        if (t_id, ronde) != ronde_courante:
+            fin_de_ronde()
+            ronde_courante = (t_id, ronde)
+            note = f"Tournoi {tournois[t_id]} R{ronde}"
+            while i_modif < len(modifs_admin) and modifs_admin[i_modif].date <= date_ronde:
+                elos[modifs_admin[i_modif].joueur_id] = modifs_admin[i_modif].elo
+                i_modif += 1
+        if resultat is None or j1 is None or j1 > max_id or (j2 is not None and j2 > max_id):
+            continue
+        if j2 is None: # Bye: draw against oneself, rating unchanged
+            historique_ronde.append({'joueur_id': j1, 'elo': elos[j1], 'date': date_ronde, 'note': note + " (Bye)",
+                                     'tournoi_id': t_id, 'ronde': ronde})
+            continue
+        e1, e2 = elos[j1], elos[j2]
+        n1 = calculer_nouveau_elo(e1, e2, resultat)
+        n2 = calculer_nouveau_elo(e2, e1, 1.0 - resultat)
+        if (n1 - e1, n2 - e2) != (gain_j1 or 0, gain_j2 or 0):
+            divergent = True
+            rapport['matchs_modifies'] += 1
+            if t_id in tournois_archives:
+                gains_archives.setdefault(t_id, {})[m_id] = (n1 - e1, n2 - e2)
+            else:
+                gains_a_ecrire.append({'m_id': m_id, 'g1': n1 - e1, 'g2': n2 - e2})
+        elos[j1], elos[j2] = n1, n2
+        historique_ronde.append({'joueur_id': j1, 'elo': n1, 'date': date_ronde, 'note': note, 'tournoi_id': t_id, 'ronde': ronde})
+        historique_ronde.append({'joueur_id': j2, 'elo': n2, 'date': date_ronde, 'note': note, 'tournoi_id': t_id, 'ronde': ronde})
+    fin_de_ronde()
+    for modif in modifs_admin[i_modif:]:
+        elos[modif.joueur_id] = modif.elo
+
+    changements_elo = []
+    for joueur_id, elo in db.session.execute(select(Joueur.id, Joueur.elo).order_by(Joueur.id)):
+        if elos[joueur_id] != elo:
+            rapport['joueurs_modifies'].append((joueur_id, elo, elos[joueur_id]))
+            changements_elo.append({'j_id': joueur_id, 'nouvel_elo': elos[joueur_id]})
+    if dry_run:
+        db.session.rollback()
+    else:
+        ecrire_lot()
+        for t_id, gains in gains_archives.items():
+            archive = db.session.get(TournoiArchive, t_id)
+            document = decompresser(archive.donnees)
+            for m in document['matchs']:
+                if m[0] in gains:
+                    m[5], m[6] = gains[m[0]]
+            archive.donnees, archive.taille = compresser(document)
+        # Old history rows of the rewritten rounds, a few large IN lists rather than one delete per lot
+        for k in range(0, len(rondes_a_effacer), 5000):
+            db.session.execute(delete(EloHistory).where(EloHistory.id <= dernier_id_historique,
+                                                        tuple_(EloHistory.tournoi_id, EloHistory.ronde).in_(rondes_a_effacer[k:k + 5000])))
+        if rondes_a_effacer: # Past periods changed: snapshots are recomputed on the next view
+            db.session.execute(delete(EloSnapshot))
+        if rapport['matchs_modifies']: # ELO gains shown in exports changed
+            db.session.execute(update(Tournoi).values(version=Tournoi.version + 1))
+        if changements_elo:
+            invalider_cache_accueil()
+            invalider_identites(c['j_id'] for c in changements_elo)
+            db.session.execute(Joueur.__table__.update().where(Joueur.__table__.c.id == bindparam('j_id'))
+                                                        .values(elo=bindparam('nouvel_elo')), changements_elo)
+        db.session.commit()
+    return rapport
+
+def parties_archivees(dates_rondes):
+    """Games of the archived tournaments, as recalculer_elo reads the live ones and in the same order.
+
+    Rows: (date_ronde, tournoi_id, ronde, match_id, joueur1_id, joueur2_id,
+    resultat, elo_gain_j1, elo_gain_j2); dates_rondes is the per-round date
+    subquery of recalculer_elo. A snapshot is decompressed when the stream
+    reaches its first round, so only the archives of overlapping tournaments
+    are open at once. Games of deleted players are left out, as live games are
+    deleted with the player.
+    """
+    dates = {}
+    for t_id, ronde, date, date_creation in db.session.execute(
+            select(Tournoi.id, dates_rondes.c.ronde, dates_rondes.c.date, Tournoi.date_creation)
+            .outerjoin(dates_rondes, dates_rondes.c.tournoi_id == Tournoi.id).where(Tournoi.archive == True)):
+        dates.setdefault(t_id, {'creation': date_creation})[ronde] = date or date_creation
+    if not dates:
+        return
+    existants = set(db.session.scalars(select(Joueur.id)))
+
+    def parties(t_id):
+        dates_tournoi = dates[t_id]
+        document = decompresser(db.session.scalar(select(TournoiArchive.donnees).where(TournoiArchive.tournoi_id == t_id)))
+        lignes = [(dates_tournoi.get(ronde, dates_tournoi['creation']), t_id, ronde, m_id, j1, j2, resultat, gain_j1, gain_j2)
+                  for m_id, ronde, j1, j2, resultat, gain_j1, gain_j2 in document['matchs']
+                  if j1 in existants and (j2 is None or j2 in existants)]
+        return iter(sorted(lignes, key=itemgetter(0, 2, 3)))
+
+    # Archives by first round date, merged through a heap of (row key, row, iterator)
+    debuts = sorted((min(d for cle, d in dates_tournoi.items() if cle != 'creation'), t_id)
+                    if len(dates_tournoi) > 1 else (dates_tournoi['creation'], t_id)
+                    for t_id, dates_tournoi in dates.items())
+    tas = []
+
+    def ouvrir(iterateur):
+        ligne = next(iterateur, None)
+        if ligne is not None:
+            heapq.heappush(tas, (ligne[:4], ligne, iterateur))
+
+    for debut, t_id in debuts:
+        while tas and tas[0][0] < (debut, t_id):
+            _, ligne, iterateur = heapq.heappop(tas)
+            yield ligne
+            ouvrir(iterateur)
+        ouvrir(parties(t_id))
+    while tas:
+        _, ligne, iterateur = heapq.heappop(tas)
+        yield ligne
+        ouvrir(iterateur)
+
+def resume_recalcul(rapport, dry_run):
+    """Flash-style summary of a recalculer_elo report."""
+    modifies = rapport['joueurs_modifies']
+    resume = f"{rapport['matchs_modifies']} match(s) et {len(modifies)} joueur(s) concernés"
+    if modifies:
+        noms = {j.id: f"{j.prenom} {j.nom}" for j in Joueur.query.filter(Joueur.id.in_([m[0] for m in modifies[:10]]))}
+        resume += " : " + ", ".join(f"{noms.get(j_id, j_id)} {avant} → {apres}" for j_id, avant, apres in modifies[:10])
+        if len(modifies) > 10: resume += ", …"
+    if dry_run:
+        return f"Simulation du recalcul ELO : {resume}."
+    return f"ELO recalculés depuis l'historique des matchs : {resume}."
+
+@bp_joueurs.route('/joueurs/recalculer_elo', methods=['POST'])
 @login_required
-def export_pdf(id):
-    tournoi = Tournoi.query.get_or_404(id)
-    # Use all players who participated, even if withdrawn
-    all_matchs = Match.query.filter_by(tournoi_id=id).order_by(Match.ronde).all()
-    all_player_ids = set()
-    for m in all_matchs:
-        if m.joueur1_id: all_player_ids.add(m.joueur1_id)
-        if m.joueur2_id: all_player_ids.add(m.joueur2_id)
-    all_players_in_tournoi = Joueur.query.filter(Joueur.id.in_(all_player_ids)).all()
+def recalculer_elo_admin():
+    if not current_user.is_admin:
+        flash('Action non autorisée.', 'danger')
+        return redirect(url_for('tournois.index'))
+    dry_run = request.form.get('dry_run') == '1'
+    tache = soumettre_tache('recalcul_elo', {'dry_run': dry_run}, cle=f"recalcul_elo-{int(dry_run)}")
+    flash("Recalcul ELO lancé en arrière-plan.", 'info')
+    return redirect(url_for('taches.suivre_tache', id=tache.id))
+
+
+# --- Import de joueurs (CSV / JSON) ---
+# Hashing dominates the cost of creating an account, so passwords are hashed in a
+# process pool; rows are then inserted with bulk INSERTs, one commit per chunk (a
+# re-run skips the usernames already imported).
+TAILLE_LOT_IMPORT = 1000
+SEUIL_POOL_HACHAGE = 32 # Below this, starting the pool costs more than it saves
+CHAMPS_IMPORT = ('username', 'prenom', 'nom', 'password')
+
+def lire_fichier_joueurs(texte, format_fichier):
+    """Parses a CSV (',' or ';' separated, with a header row) or JSON list of players.
+
+    Returns (lignes, erreurs): valid rows as dicts with username, prenom, nom,
+    password and elo (1500 when missing), and one message per rejected row.
+    """
+    if format_fichier == 'json':
+        try:
+            entrees = json.loads(texte)
+        except ValueError as e:
+            return [], [f"JSON invalide : {e}"]
+        if not isinstance(entrees, list):
+            return [], ["Le fichier JSON doit contenir une liste de joueurs."]
+    else:
+        premiere_ligne = texte.split('\n', 1)[0]
+        entrees = csv.DictReader(StringIO(texte), delimiter=';' if premiere_ligne.count(';') > premiere_ligne.count(',') else ',')
+    lignes, erreurs = [], []
+    for numero, entree in enumerate(entrees, 1):
+        if not isinstance(entree, dict):
+            erreurs.append(f"Ligne {numero} : format invalide.")
+            continue
+        ligne = {champ: str(entree.get(champ) or '').strip() for champ in CHAMPS_IMPORT}
+        manquants = [champ for champ in CHAMPS_IMPORT if not ligne[champ]]
+        if manquants:
+            erreurs.append(f"Ligne {numero} : champ(s) manquant(s) {', '.join(manquants)}.")
+            continue
+        if len(ligne['username']) > 80:
+            erreurs.append(f"Ligne {numero} : nom d'utilisateur trop long.")
+            continue
+        try:
+            ligne['elo'] = int(entree.get('elo') or 1500)
+        except (TypeError, ValueError):
+            erreurs.append(f"Ligne {numero} : ELO invalide ({entree.get('elo')}).")
+            continue
+        lignes.append(ligne)
+    return lignes, erreurs
+
+def hacher_mots_de_passe(mots_de_passe, processus=None):
+    """generate_password_hash over a list, in a process pool when it is worth it."""
+    if len(mots_de_passe) < SEUIL_POOL_HACHAGE or processus == 1:
+        return [generate_password_hash(m) for m in mots_de_passe]
+    from concurrent.futures import ProcessPoolExecutor # Only the import paths need it
+    processus = processus or os.cpu_count() or 1
+    # 'spawn' children start clean: no inherited DB connections, locks or SSE threads
+    with ProcessPoolExecutor(processus, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(generate_password_hash, mots_de_passe,
+                             chunksize=max(1, len(mots_de_passe) // (4 * processus))))
+
+def importer_joueurs(lignes, taille_lot=TAILLE_LOT_IMPORT, processus=None, progression=None):
+    """Creates the players of lignes (see lire_fichier_joueurs) with their initial history row.
+
+    Usernames that already exist, or appear twice in the file, are skipped.
+    progression(faits, total), if given, is called after each committed chunk.
+    Returns a report: counts, durations and throughput.
+    """
+    debut = time.perf_counter()
+    existants = set(db.session.scalars(select(Joueur.username))) # One set-based lookup
+    nouvelles = []
+    for ligne in lignes:
+        if ligne['username'] not in existants:
+            existants.add(ligne['username'])
+            nouvelles.append(ligne)
+    ignores = len(lignes) - len(nouvelles)
+
+    debut_hachage = time.perf_counter()
+    hashes = hacher_mots_de_passe([l['password'] for l in nouvelles], processus)
+    duree_hachage = time.perf_counter() - debut_hachage
+
+    debut_insertion = time.perf_counter()
+    date_creation = datetime(datetime.now().year, 10, 1) # Same start date as register()
+    for i in range(0, len(nouvelles), taille_lot):
+        lot = nouvelles[i:i + taille_lot]
+        ids = db.session.execute(insert(Joueur).returning(Joueur.id, sort_by_parameter_order=True), [
+            {'username': l['username'], 'prenom': l['prenom'], 'nom': l['nom'], 'elo': l['elo'],
+             'password_hash': h, 'is_admin': False}
+            for l, h in zip(lot, hashes[i:i + taille_lot])]).scalars().all()
+        db.session.execute(insert(EloHistory), [
+            {'joueur_id': joueur_id, 'elo': l['elo'], 'date': date_creation, 'note': NOTE_CREATION}
+            for joueur_id, l in zip(ids, lot)])
+        invalider_cache_accueil()
+        db.session.commit()
+        if progression:
+            progression(i + len(lot), len(nouvelles))
+    duree_insertion = time.perf_counter() - debut_insertion
 
-    player_data = {}
-    for j in all_players_in_tournoi:
-        player_data[j.id] = {
-            'nom': f"{j.prenom} {j.nom}",
-            'total_points': 0.0,
-            'rondes': {r: {'resultat': '-', 'couleur': '', 'elo_gain': 0} for r in range(1, tournoi.nombre_rondes + 1)}
-        }
+    duree = time.perf_counter() - debut
+    return {'importes': len(nouvelles), 'ignores': ignores, 'duree': duree,
+            'duree_hachage': duree_hachage, 'duree_insertion': duree_insertion,
+            'debit': len(nouvelles) / duree if duree else 0.0}
 
-    for match in all_matchs:
-        ronde = match.ronde
-        if match.joueur1_id not in player_data or (match.joueur2_id and match.joueur2_id not in player_data):
-             continue # Skip match if a player was deleted entirely
+@bp_joueurs.route('/joueurs/importer', methods=['POST'])
+@login_required
+def importer_joueurs_admin():
+    if not current_user.is_admin:
+        flash('Action non autorisée.', 'danger')
+        return redirect(url_for('tournois.index'))
+    fichier = request.files.get('fichier')
+    if not fichier or not fichier.filename:
+        flash("Aucun fichier sélectionné.", 'danger')
+        return redirect(url_for('joueurs.gerer_joueurs'))
+    format_fichier = 'json' if fichier.filename.lower().endswith('.json') else 'csv'
+    try:
+        texte = fichier.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        flash("Le fichier doit être encodé en UTF-8.", 'danger')
+        return redirect(url_for('joueurs.gerer_joueurs'))
+    lignes, erreurs = lire_fichier_joueurs(texte, format_fichier)
+    if erreurs:
+        flash(f"{len(erreurs)} ligne(s) rejetée(s) : " + " ".join(erreurs[:5]) + (" …" if len(erreurs) > 5 else ""), 'warning')
+    if not lignes:
+        return redirect(url_for('joueurs.gerer_joueurs'))
+    # Rows go to the job as a file: they hold the clear-text passwords until it has run
+    os.makedirs(dossier_taches, exist_ok=True)
+    chemin = os.path.join(dossier_taches, f"import_{uuid.uuid4().hex}.json")
+    with open(os.open(chemin, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w', encoding='utf-8') as f:
+        json.dump(lignes, f)
+    tache = soumettre_tache('import_joueurs', {'chemin': chemin})
+    flash(f"Import de {len(lignes)} joueur(s) lancé en arrière-plan.", 'info')
+    return redirect(url_for('taches.suivre_tache', id=tache.id))
 
-        if match.joueur2_id:
-            j1_id, j2_id = match.joueur1_id, match.joueur2_id
-            if match.resultat is not None:
-                res_j1, res_j2 = match.resultat, 1.0 - match.resultat
-                player_data[j1_id]['total_points'] += res_j1
-                player_data[j2_id]['total_points'] += res_j2
-                player_data[j1_id]['rondes'][ronde] = {'resultat': res_j1, 'couleur': 'B', 'elo_gain': match.elo_gain_j1 or 0}
-                player_data[j2_id]['rondes'][ronde] = {'resultat': res_j2, 'couleur': 'N', 'elo_gain': match.elo_gain_j2 or 0}
 
-        elif match.joueur1_id and not match.joueur2_id: # Bye case
-            j1_id = match.joueur1_id
-            if match.resultat == 1.0:
-                player_data[j1_id]['total_points'] += 1.0
-                player_data[j1_id]['rondes'][ronde] = {'resultat': 1.0, 'couleur': 'BYE', 'elo_gain': 0}
+# --- PDF ---
+# Rendered PDFs are cached per (tournoi, version): in memory with LRU eviction
+# bounded in bytes, and on disk for finished tournaments.
+POLICE_PDF = os.path.join(basedir, 'DejaVuSans.ttf')
+dossier_pdf = os.environ.get('PDF_DOSSIER', os.path.join(instance_path, 'pdf'))
 
+cache_pdf = CacheLRU(32 * 1024 * 1024) # Bound set from the config by create_app
 
-    sorted_players = sorted(player_data.values(), key=lambda x: x['total_points'], reverse=True)
+def generer_pdf_classement(tournoi):
+    """Renders the standings grid of a tournament and returns the PDF bytes."""
+    from fpdf import FPDF # Heavy (fontTools): loaded by the process that renders, not at boot
+    sorted_players = grille_tournoi(tournoi)
 
     class PDF(FPDF):
         def header(self):
-            self.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
             self.set_font('DejaVu', '', 16)
             self.cell(0, 10, f'Grille de Classement - "{tournoi.nom}"', 0, 1, 'C')
             self.set_font('DejaVu', '', 10)
@@ -546,8 +1851,8 @@ def export_pdf(id):
             self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
 
     pdf = PDF(orientation='L', unit='mm', format='A4') # Landscape mode
+    pdf.add_font('DejaVu', '', POLICE_PDF) # Once per document, before the first header
     pdf.add_page()
-    pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
     pdf.set_font('DejaVu', '', 10)
 
     # Calculate column widths dynamically
@@ -555,7 +1860,9 @@ def export_pdf(id):
     col_width_joueur = 60
     col_width_total = 15
     col_width_elo = 20
-    remaining_width = available_width - col_width_joueur - col_width_total - col_width_elo
+    col_width_departage = 12
+    remaining_width = available_width - col_width_joueur - col_width_total - col_width_elo \
+                      - col_width_departage * len(DEPARTAGES_AFFICHES)
     col_width_ronde = remaining_width / tournoi.nombre_rondes if tournoi.nombre_rondes > 0 else 0
 
     # Table Header
@@ -564,6 +1871,8 @@ def export_pdf(id):
     for r in range(1, tournoi.nombre_rondes + 1):
         pdf.cell(col_width_ronde, 10, f'R {r}', 1, 0, 'C')
     pdf.cell(col_width_total, 10, 'Total', 1, 0, 'C')
+    for _, titre in DEPARTAGES_AFFICHES:
+        pdf.cell(col_width_departage, 10, titre, 1, 0, 'C')
     pdf.cell(col_width_elo, 10, 'Gain ELO', 1, 1, 'C')
 
     # Table Body
@@ -587,21 +1896,973 @@ def export_pdf(id):
             pdf.cell(col_width_ronde, 10, cell_text, 1, 0, 'C')
 
         pdf.cell(col_width_total, 10, f"{player['total_points']}", 1, 0, 'C')
+        for cle, _ in DEPARTAGES_AFFICHES:
+            valeur = player['departages'][cle] if player['departages'] else 0.0
+            pdf.cell(col_width_departage, 10, format_points(valeur), 1, 0, 'C')
         pdf.cell(col_width_elo, 10, f"{'+' if elo_gain_cumul > 0 else ''}{elo_gain_cumul}", 1, 1, 'C')
 
-    pdf_bytes = pdf.output()
-    return send_file(BytesIO(pdf_bytes), as_attachment=True, download_name=f'classement_{tournoi.nom}.pdf', mimetype='application/pdf')
+    return bytes(pdf.output())
+
+def chemin_pdf_archive(tournoi):
+    return os.path.join(dossier_pdf, f"classement_{tournoi.id}_v{tournoi.version}.pdf")
+
+def archiver_pdf(tournoi, pdf_bytes):
+    """Writes the final PDF of a finished tournament to disk, replacing older versions."""
+    os.makedirs(dossier_pdf, exist_ok=True)
+    chemin = chemin_pdf_archive(tournoi)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(temporaire, chemin) # Atomic, concurrent workers never see a partial file
+    prefixe = f"classement_{tournoi.id}_v"
+    for nom in os.listdir(dossier_pdf):
+        if nom.startswith(prefixe) and nom.endswith('.pdf') and os.path.join(dossier_pdf, nom) != chemin:
+            os.remove(os.path.join(dossier_pdf, nom))
+
+@bp_tournois.route('/tournoi/<int:id>/export_pdf')
+@login_required
+def export_pdf(id):
+    tournoi = Tournoi.query.get_or_404(id)
+    etag = f"pdf-{tournoi.id}-{tournoi.version}"
+    options = dict(as_attachment=True, download_name=f'classement_{tournoi.nom}.pdf',
+                   mimetype='application/pdf', etag=etag, conditional=True, max_age=0)
+    if request.if_none_match.contains(etag):
+        return send_file(BytesIO(), **options) # 304, nothing rendered or read
+
+    # Finished tournaments never change: render once, then serve from disk
+    if tournoi.termine and os.path.exists(chemin_pdf_archive(tournoi)):
+        return send_file(chemin_pdf_archive(tournoi), **options)
+
+    pdf_bytes = cache_pdf.get((tournoi.id, tournoi.version))
+    if pdf_bytes is not None:
+        return send_file(BytesIO(pdf_bytes), **options)
+
+    # Rendering is left to the job executor; this worker only queues it (once per version)
+    tache = soumettre_tache('export_pdf', {'tournoi_id': tournoi.id, 'version': tournoi.version},
+                            cle=f"pdf-{tournoi.id}-{tournoi.version}")
+    if tache.statut == 'terminee' and tache.fichier and os.path.exists(tache.fichier):
+        with open(tache.fichier, 'rb') as f:
+            pdf_bytes = f.read()
+        cache_pdf.put((tournoi.id, tournoi.version), pdf_bytes)
+        return send_file(BytesIO(pdf_bytes), **options)
+    return redirect(url_for('taches.suivre_tache', id=tache.id))
+
+
+# --- Tâches de fond ---
+# Heavy work (PDF rendering, ELO recompute, player import) runs outside the web
+# workers. Jobs are rows of the tache table; an executor claims the oldest pending
+# one with a conditional UPDATE, so any number of executors can share the table.
+# TACHES_MODE=processus (default) starts one low-priority executor process per
+# machine: the web workers elect the one that starts it through a file lock, and the
+# others take over if it stops. thread runs it in a thread of the web process
+# (single-process development); externe starts nothing and leaves the jobs to
+# `flask worker`.
+dossier_taches = os.environ.get('TACHES_DOSSIER', os.path.join(instance_path, 'taches'))
+TACHES = {} # type -> function(tache, parametres) returning the result message
+_executeur = {'pid': None}
+_verrou_executeur = threading.Lock()
+DELAI_ELECTION = 30 # Seconds between two attempts of a worker that lost the election
+_election = {'pid': None, 'prochain': 0.0}
+
+def tache_de_fond(type_tache):
+    """Registers a job function under a type name."""
+    def enregistrer(fonction):
+        TACHES[type_tache] = fonction
+        return fonction
+    return enregistrer
+
+def soumettre_tache(type_tache, parametres, cle=None):
+    """Queues a job and commits; returns the pending, running or finished job of the same key if there is one."""
+    if cle is not None:
+        existante = Tache.query.filter(Tache.cle == cle, Tache.statut != 'echouee').order_by(Tache.id.desc()).first()
+        if existante is not None and (existante.statut != 'terminee' or not existante.fichier
+                                      or os.path.exists(existante.fichier)):
+            return existante
+    nouvelle = Tache(type=type_tache, cle=cle, parametres=json.dumps(parametres),
+                     auteur_id=current_user.id if has_request_context() and current_user.is_authenticated else None)
+    db.session.add(nouvelle)
+    db.session.commit()
+    demarrer_executeur(reveiller=True)
+    return nouvelle
+
+def signaler_progression(tache_id, faits, total, message=None):
+    """Records a job's progress on its own connection, visible at once to the status endpoint.
+
+    Call it between the job's own commits: on SQLite, a write from another
+    connection waits for the job's open write transaction.
+    """
+    valeurs = {'progression': min(99, int(100 * faits / total)) if total else 0}
+    if message is not None:
+        valeurs['message'] = message
+    with db.engine.begin() as connexion:
+        connexion.execute(update(Tache).where(Tache.id == tache_id).values(**valeurs))
+
+def nom_executeur():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def reserver_tache(executeur):
+    """Claims the oldest pending job for this executor; returns its id or None."""
+    candidats = db.session.scalars(select(Tache.id).where(Tache.statut == 'en_attente').order_by(Tache.id).limit(5)).all()
+    for tache_id in candidats:
+        reservee = db.session.execute(update(Tache).where(Tache.id == tache_id, Tache.statut == 'en_attente')
+                                      .values(statut='en_cours', executeur=executeur, date_debut=datetime.utcnow()))
+        db.session.commit()
+        if reservee.rowcount: # Another executor may have taken it in between
+            return tache_id
+    db.session.commit()
+    return None
+
+def executer_tache(tache_id):
+    tache_courante = db.session.get(Tache, tache_id)
+    try:
+        resultat = TACHES[tache_courante.type](tache_courante, json.loads(tache_courante.parametres))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Job %s (%s) failed", tache_id, tache_courante.type)
+        db.session.execute(update(Tache).where(Tache.id == tache_id).values(
+            statut='echouee', erreur=f"{type(e).__name__}: {e}", date_fin=datetime.utcnow()))
+    else:
+        db.session.execute(update(Tache).where(Tache.id == tache_id).values(
+            statut='terminee', progression=100, message=resultat, date_fin=datetime.utcnow()))
+    db.session.commit()
+
+def relancer_taches_orphelines():
+    """Requeues the jobs left running by executors of this host that no longer exist."""
+    hote = socket.gethostname()
+    for tache_id, executeur in db.session.execute(select(Tache.id, Tache.executeur).where(Tache.statut == 'en_cours')):
+        hote_tache, _, pid = (executeur or '').rpartition(':')
+        if hote_tache != hote or not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            db.session.execute(update(Tache).where(Tache.id == tache_id, Tache.statut == 'en_cours')
+                               .values(statut='en_attente', executeur=None))
+        except PermissionError:
+            pass # Alive, another user's process
+    db.session.commit()
+
+def purger_taches():
+    """Deletes finished jobs older than TACHES_RETENTION and their result files."""
+    limite = datetime.utcnow() - current_app.config['TACHES_RETENTION']
+    anciennes = db.session.execute(select(Tache.id, Tache.fichier)
+                                   .where(Tache.statut.in_(('terminee', 'echouee')), Tache.date_creation < limite)).all()
+    for _, fichier in anciennes:
+        # Archived PDFs of finished tournaments live elsewhere and are kept
+        if fichier and os.path.dirname(fichier) == dossier_taches and os.path.exists(fichier):
+            os.remove(fichier)
+    if anciennes:
+        db.session.execute(delete(Tache).where(Tache.id.in_([t_id for t_id, _ in anciennes])))
+    db.session.commit()
+
+def boucle_taches(app, arret, reveil=None, parent=None):
+    """Runs app's jobs until arret is set (or the parent process exits); waits on reveil between polls."""
+    executeur = nom_executeur()
+    derniere_purge = 0.0
+    with app.app_context():
+        relancer_taches_orphelines()
+        while not arret.is_set() and (parent is None or os.getppid() == parent):
+            try:
+                tache_id = reserver_tache(executeur)
+                if tache_id is not None:
+                    executer_tache(tache_id)
+                    continue
+                if time.monotonic() - derniere_purge > 3600:
+                    purger_taches()
+                    derniere_purge = time.monotonic()
+            except Exception as e: # Database unreachable: retry on the next poll
+                db.session.rollback()
+                app.logger.warning("Job executor: %s", e)
+            finally:
+                db.session.remove()
+            if reveil is None:
+                arret.wait(app.config['TACHES_INTERVALLE'])
+            elif reveil.wait(app.config['TACHES_INTERVALLE']):
+                reveil.clear()
+
+# Settings passed to the executor process, which builds its own application
+CONFIG_EXECUTEUR = ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_ENGINE_OPTIONS', 'DB_PROFILE', 'SQLITE_PRAGMAS',
+                    'TACHES_MODE', 'TACHES_INTERVALLE', 'TACHES_NICE', 'TACHES_RETENTION', 'PDF_CACHE_MAX_OCTETS')
+
+def _processus_taches(config, arret, reveil, parent):
+    app = create_app(config)
+    try:
+        os.nice(app.config['TACHES_NICE']) # Web requests keep the CPU when both compete
+    except OSError:
+        pass
+    boucle_taches(app, arret, reveil, parent)
+
+def elire_executeur():
+    """True if this process holds the machine's executor lock (kept until it exits).
+
+    A worker that loses only tries again after DELAI_ELECTION seconds; the lock
+    is freed by the system when its holder dies, whatever the cause.
+    """
+    if fcntl is None: # No flock (Windows): every worker runs its own executor
+        return True
+    maintenant = time.monotonic()
+    if _election['pid'] == os.getpid() and maintenant < _election['prochain']:
+        return False
+    _election.update(pid=os.getpid(), prochain=maintenant + DELAI_ELECTION)
+    os.makedirs(dossier_taches, exist_ok=True)
+    fichier = open(os.path.join(dossier_taches, 'executeur.lock'), 'w')
+    try:
+        fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fichier.close()
+        return False
+    _election['fichier'] = fichier
+    return True
+
+def demarrer_executeur(reveiller=False):
+    """Starts the job executor if TACHES_MODE asks for one here (once per pid, processus: once per machine); reveiller wakes it up."""
+    mode = current_app.config['TACHES_MODE']
+    if mode not in ('processus', 'thread'):
+        return
+    with _verrou_executeur:
+        if _executeur['pid'] != os.getpid():
+            if mode == 'processus' and not elire_executeur():
+                return # Another worker of this machine runs the executor, which polls the table
+            if mode == 'thread':
+                arret, reveil = threading.Event(), threading.Event()
+                executeur = threading.Thread(target=boucle_taches, name='taches', daemon=True,
+                                             args=(current_app._get_current_object(), arret, reveil))
+            else:
+                # 'spawn': a clean interpreter, without this process's connections and threads. Not a daemon,
+                # so that it may start its own pool (import hashing); it stops with its parent.
+                contexte = multiprocessing.get_context('spawn')
+                arret, reveil = contexte.Event(), contexte.Event()
+                config = {cle: current_app.config[cle] for cle in CONFIG_EXECUTEUR if cle in current_app.config}
+                executeur = contexte.Process(target=_processus_taches, name='taches',
+                                             args=(config, arret, reveil, os.getpid()))
+            executeur.start()
+            _executeur.update(pid=os.getpid(), arret=arret, reveil=reveil, executeur=executeur)
+            atexit.register(arreter_executeur)
+    if reveiller:
+        _executeur['reveil'].set()
+
+def arreter_executeur(delai=10):
+    if _executeur['pid'] == os.getpid():
+        _executeur['arret'].set()
+        _executeur['reveil'].set()
+        _executeur['executeur'].join(delai)
+
+@bp_taches.before_app_request
+def _demarrer_executeur():
+    if _executeur['pid'] != os.getpid(): # Also picks up the jobs left pending by a restart
+        demarrer_executeur()
+
+@tache_de_fond('export_pdf')
+def tache_export_pdf(tache_courante, parametres):
+    tournoi = db.session.get(Tournoi, parametres['tournoi_id'])
+    if tournoi is None:
+        raise LookupError("Tournoi supprimé.")
+    pdf_bytes = generer_pdf_classement(tournoi)
+    if tournoi.termine:
+        archiver_pdf(tournoi, pdf_bytes)
+        chemin = chemin_pdf_archive(tournoi)
+    else:
+        os.makedirs(dossier_taches, exist_ok=True)
+        chemin = os.path.join(dossier_taches, f"tache_{tache_courante.id}.pdf")
+        with open(chemin, 'wb') as f:
+            f.write(pdf_bytes)
+    tache_courante.fichier = chemin
+    tache_courante.nom_fichier = f"classement_{tournoi.nom}.pdf"
+    tache_courante.mimetype = 'application/pdf'
+    return f"Classement de {tournoi.nom} prêt ({len(pdf_bytes) // 1024} Ko)."
+
+@tache_de_fond('recalcul_elo')
+def tache_recalcul_elo(tache_courante, parametres):
+    signaler_progression(tache_courante.id, 0, 1, "Rejeu de l'historique des matchs…")
+    rapport = recalculer_elo(dry_run=parametres['dry_run'])
+    return resume_recalcul(rapport, parametres['dry_run'])
+
+@tache_de_fond('import_joueurs')
+def tache_import_joueurs(tache_courante, parametres):
+    chemin = parametres['chemin']
+    try:
+        with open(chemin, encoding='utf-8') as f:
+            lignes = json.load(f)
+    finally:
+        if os.path.exists(chemin):
+            os.remove(chemin) # Clear-text passwords: read once, even if the import fails
+    signaler_progression(tache_courante.id, 0, 1, "Hachage des mots de passe…")
+    rapport = importer_joueurs(lignes, progression=lambda faits, total: signaler_progression(
+        tache_courante.id, faits, total, f"{faits} / {total} joueurs enregistrés…"))
+    return (f"{rapport['importes']} joueur(s) importé(s), {rapport['ignores']} déjà existant(s) "
+            f"en {rapport['duree']:.1f} s ({rapport['debit']:.0f} joueurs/s).")
+
+def tache_accessible(tache_courante):
+    # PDF exports are shared between everyone asking for the same version
+    return (current_user.is_admin or tache_courante.auteur_id == current_user.id
+            or tache_courante.type == 'export_pdf')
+
+def tache_json(tache_courante):
+    donnees = {c: getattr(tache_courante, c) for c in ('id', 'type', 'statut', 'progression', 'message', 'erreur')}
+    donnees['resultat'] = (url_for('taches.resultat_tache', id=tache_courante.id)
+                           if tache_courante.statut == 'terminee' and tache_courante.fichier else None)
+    return donnees
+
+@bp_taches.route('/taches')
+@login_required
+def liste_taches():
+    if not current_user.is_admin:
+        return redirect(url_for('tournois.index'))
+    taches = Tache.query.order_by(Tache.id.desc()).limit(100).all()
+    return render_template('admin_taches.html', taches=taches, mode=current_app.config['TACHES_MODE'])
+
+@bp_taches.route('/taches/<int:id>')
+@login_required
+def suivre_tache(id):
+    tache_courante = Tache.query.get_or_404(id)
+    if not tache_accessible(tache_courante):
+        return redirect(url_for('tournois.index'))
+    return render_template('tache.html', tache=tache_courante, etat=tache_json(tache_courante))
+
+@bp_taches.route('/api/taches/<int:id>')
+@login_required
+def api_tache(id):
+    tache_courante = db.session.get(Tache, id)
+    if tache_courante is None or not tache_accessible(tache_courante):
+        return jsonify({'erreur': 'Tâche introuvable.'}), 404
+    return jsonify(tache_json(tache_courante))
+
+@bp_taches.route('/taches/<int:id>/resultat')
+@login_required
+def resultat_tache(id):
+    tache_courante = Tache.query.get_or_404(id)
+    if not tache_accessible(tache_courante):
+        return redirect(url_for('tournois.index'))
+    if tache_courante.statut != 'terminee' or not tache_courante.fichier or not os.path.exists(tache_courante.fichier):
+        flash("Le résultat de cette tâche n'est pas disponible.", 'warning')
+        return redirect(url_for('taches.suivre_tache', id=id))
+    options = {}
+    if tache_courante.type == 'export_pdf': # Same ETag as export_pdf, whichever route served the file
+        parametres = json.loads(tache_courante.parametres)
+        options = dict(etag=f"pdf-{parametres['tournoi_id']}-{parametres['version']}", conditional=True, max_age=0)
+    return send_file(tache_courante.fichier, as_attachment=True, download_name=tache_courante.nom_fichier,
+                     mimetype=tache_courante.mimetype, **options)
+
+
+# --- Exports CSV / FIDE TRF (streamed) ---
+LIGNES_PAR_PAQUET = 1000
+
+def flux_csv(lignes):
+    """Yields CSV text in chunks of LIGNES_PAR_PAQUET rows, so the first byte leaves immediately."""
+    tampon = StringIO()
+    writer = csv.writer(tampon)
+    for n, ligne in enumerate(lignes, 1):
+        writer.writerow(ligne)
+        if n % LIGNES_PAR_PAQUET == 0:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+def reponse_fichier(generateur, nom_fichier, mimetype):
+    reponse = Response(stream_with_context(generateur), mimetype=mimetype)
+    # Same header as send_file(download_name=...): quoted ASCII name, plus the
+    # RFC 5987 UTF-8 form when the tournament name is not ASCII
+    try:
+        nom_fichier.encode('ascii')
+        noms = {'filename': nom_fichier}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', nom_fichier).encode('ascii', 'ignore').decode('ascii')
+        noms = {'filename': simple, 'filename*': "UTF-8''" + quote(nom_fichier, safe="!#$&+-.^_`|~")}
+    reponse.headers.set('Content-Disposition', 'attachment', **noms)
+    return reponse
+
+def format_points(points):
+    return f"{points:g}"
+
+@bp_tournois.route('/tournoi/<int:id>/export_csv')
+@login_required
+def export_csv(id):
+    tournoi = Tournoi.query.get_or_404(id)
+
+    def lignes():
+        joueurs = grille_tournoi(tournoi)
+        rangs = {p['joueur'].id: i for i, p in enumerate(joueurs, 1)}
+        yield ['Rang', 'Joueur', 'ELO'] + [f'R{r}' for r in range(1, tournoi.nombre_rondes + 1)] + ['Total'] + [titre for _, titre in DEPARTAGES_AFFICHES] + ['Gain ELO']
+        for rang, p in enumerate(joueurs, 1):
+            cases = []
+            for r in range(1, tournoi.nombre_rondes + 1):
+                data = p['rondes'][r]
+                if data['couleur'] == 'BYE': cases.append('BYE +1')
+                elif data['couleur'] == '': cases.append('-')
+                else: cases.append(f"{rangs[data['adversaire']]}{data['couleur']} {format_points(data['resultat'])}")
+            gain = sum(d['elo_gain'] for d in p['rondes'].values())
+            departages = [format_points(p['departages'][cle] if p['departages'] else 0.0) for cle, _ in DEPARTAGES_AFFICHES]
+            yield [rang, p['nom'], p['joueur'].elo] + cases + [format_points(p['total_points'])] + departages + [gain]
+
+    return reponse_fichier(flux_csv(lignes()), f'grille_{tournoi.nom}.csv', 'text/csv')
+
+# Tournament type of the TRF 092 line, per TYPES_TOURNOI key
+TYPES_TRF = {
+    'suisse': 'Individual: Swiss-System',
+    'berger': 'Individual: Round-Robin',
+    'berger_double': 'Individual: Double Round-Robin',
+}
+
+@bp_tournois.route('/tournoi/<int:id>/export_trf')
+@login_required
+def export_trf(id):
+    """FIDE TRF-16 report (fixed-width player lines, one block per round)."""
+    tournoi = Tournoi.query.get_or_404(id)
+
+    def lignes():
+        joueurs = grille_tournoi(tournoi)
+        # Starting ranks follow the rating order, final ranks the standings
+        depart = sorted(joueurs, key=lambda p: (-p['joueur'].elo, p['joueur'].nom, p['joueur'].prenom))
+        rang_depart = {p['joueur'].id: i for i, p in enumerate(depart, 1)}
+        rang_final = {p['joueur'].id: i for i, p in enumerate(joueurs, 1)}
+        yield f"012 {tournoi.nom}\n"
+        yield f"022 TPCHESS\n"
+        if tournoi.date_creation:
+            yield f"042 {tournoi.date_creation:%Y/%m/%d}\n"
+        yield f"062 {len(joueurs)}\n"
+        yield f"092 {TYPES_TRF[tournoi.type_tournoi]}\n"
+        for p in depart:
+            j = p['joueur']
+            # Columns 1-89: rank, name (15-47), rating (49-52), points (81-84), final rank (86-89)
+            ligne = (f"001 {rang_depart[j.id]:>4}{'':6}{f'{j.nom}, {j.prenom}'[:33]:<33} {j.elo:>4}"
+                     f"{'':28}{p['total_points']:>4.1f} {rang_final[j.id]:>4}")
+            for r in range(1, tournoi.nombre_rondes + 1):
+                data = p['rondes'][r]
+                if data['couleur'] == 'BYE':
+                    ligne += "  0000 - U"
+                elif data['couleur'] == '':
+                    ligne += "          "
+                else:
+                    code = {1.0: '1', 0.5: '=', 0.0: '0'}[data['resultat']]
+                    couleur = 'w' if data['couleur'] == 'B' else 'b'
+                    ligne += f"  {rang_depart[data['adversaire']]:>4} {couleur} {code}"
+            yield ligne.rstrip() + "\n"
+
+    return reponse_fichier(lignes(), f'{tournoi.nom}.trf', 'text/plain')
+
+@bp_joueurs.route('/export/elo_history.csv')
+@login_required
+def export_elo_history():
+    if not current_user.is_admin:
+        flash('Action non autorisée.', 'danger')
+        return redirect(url_for('tournois.index'))
+
+    def lignes():
+        yield ['joueur_id', 'username', 'prenom', 'nom', 'date', 'elo', 'note']
+        # yield_per streams through a server-side cursor where the driver supports it
+        historique = db.session.execute(
+            select(EloHistory.joueur_id, Joueur.username, Joueur.prenom, Joueur.nom,
+                   EloHistory.date, EloHistory.elo, EloHistory.note)
+            .join(Joueur, EloHistory.joueur_id == Joueur.id)
+            .order_by(EloHistory.joueur_id, EloHistory.date, EloHistory.id)
+            .execution_options(yield_per=LIGNES_PAR_PAQUET))
+        for joueur_id, username, prenom, nom, date, elo, note in historique:
+            yield [joueur_id, username, prenom, nom, date.isoformat(sep=' ') if date else '', elo, note or '']
+
+    return reponse_fichier(flux_csv(lignes()), 'elo_history.csv', 'text/csv')
+
+
+# --- Archivage des tournois terminés ---
+# A finished tournament can be archived: its Match and Classement rows are replaced by
+# one compressed snapshot (archives.py), so those tables only grow with the live
+# seasons. The page, the exports and the JSON API of an archived tournament read the
+# snapshot. EloHistory is kept: it is the players' own rating history.
+def charger_archive(tournoi):
+    """Read view (archives.Archive) of an archived tournament's snapshot."""
+    return Archive(decompresser(db.session.get(TournoiArchive, tournoi.id).donnees))
+
+def archiver_tournoi(tournoi):
+    """Stores the snapshot of a finished tournament and deletes its games and standings rows.
+
+    The caller bumps the version (reserver_tournoi or toucher_tournoi) and
+    commits. Returns (games, uncompressed size, compressed size).
+    """
+    classement = charger_classement(tournoi)
+    matchs = db.session.execute(select(Match.id, Match.ronde, Match.joueur1_id, Match.joueur2_id, Match.resultat,
+                                       Match.elo_gain_j1, Match.elo_gain_j2)
+                                .filter(Match.tournoi_id == tournoi.id).order_by(Match.ronde, Match.id)).all()
+    inscrits = [j_id for (j_id,) in db.session.query(tournoi_joueurs.c.joueur_id).filter(tournoi_joueurs.c.tournoi_id == tournoi.id)]
+    ids = set(classement) | set(inscrits) | {m.joueur1_id for m in matchs} | {m.joueur2_id for m in matchs}
+    joueurs = db.session.execute(select(Joueur.id, Joueur.prenom, Joueur.nom, Joueur.elo)
+                                 .where(Joueur.id.in_(ids - {None}))).all()
+    document = document_archive(
+        {'id': tournoi.id, 'nom': tournoi.nom, 'type': tournoi.type_tournoi, 'nombre_rondes': tournoi.nombre_rondes,
+         'ronde_actuelle': tournoi.ronde_actuelle,
+         'date_creation': tournoi.date_creation.isoformat() if tournoi.date_creation else None},
+        joueurs, inscrits,
+        [(l.joueur_id, l.points, l.parties, l.couleurs, l.exempt) for l in classement.values()], matchs)
+    donnees, taille = compresser(document)
+    db.session.add(TournoiArchive(tournoi_id=tournoi.id, matchs=len(matchs), taille=taille, donnees=donnees))
+    db.session.execute(delete(PlaceRonde).where(PlaceRonde.tournoi_id == tournoi.id))
+    db.session.execute(delete(Match).where(Match.tournoi_id == tournoi.id))
+    db.session.execute(delete(Classement).where(Classement.tournoi_id == tournoi.id))
+    tournoi.archive = True
+    return len(matchs), taille, len(donnees)
+
+@bp_tournois.route('/tournoi/<int:id>/archiver', methods=['POST'])
+@login_required
+def archiver_tournoi_admin(id):
+    if not current_user.is_admin: return redirect(url_for('tournois.gerer_tournoi', id=id))
+    tournoi = Tournoi.query.get_or_404(id)
+    if not tournoi.termine or tournoi.archive:
+        flash("Seul un tournoi terminé et pas encore archivé peut être archivé.", 'warning')
+        return redirect(url_for('tournois.gerer_tournoi', id=id))
+    reserver_tournoi(tournoi)
+    matchs, taille, taille_compressee = archiver_tournoi(tournoi)
+    db.session.commit()
+    flash(f"Tournoi archivé : {matchs} parties, {taille / 1024:.1f} Ko compressés en {taille_compressee / 1024:.1f} Ko.", 'success')
+    return redirect(url_for('tournois.gerer_tournoi', id=id))
+
+
+# --- API JSON publique (classement, rondes, résultats d'un joueur) ---
+# No login on purpose: board displays and the mobile app read them. Standings, round
+# pairings and results are public, and the tournament page shows the same to every
+# viewer (admin forms aside).
+# Strong ETags come from Tournoi.version (plus the latest EloHistory id where current
+# ratings are shown), so an unchanged resource is answered with a 304 after a single
+# primary-key lookup, without reading Match.
+def reponse_json_conditionnelle(etag, construire):
+    if request.if_none_match.contains(etag):
+        reponse = Response(status=304)
+    else:
+        reponse = jsonify(construire())
+    reponse.set_etag(etag)
+    reponse.headers['Cache-Control'] = 'public, no-cache' # Always revalidate, 304s are cheap
+    reponse.headers['Access-Control-Allow-Origin'] = '*' # Board displays and mobile clients
+    return reponse
+
+LigneClassementApi = namedtuple('LigneClassementApi', 'id prenom nom elo points parties') # Row of the api_classement query
+
+def tournoi_json(tournoi):
+    return {'id': tournoi.id, 'nom': tournoi.nom, 'type': tournoi.type_tournoi, 'nombre_rondes': tournoi.nombre_rondes,
+            'ronde_actuelle': tournoi.ronde_actuelle, 'termine': bool(tournoi.termine)}
+
+def joueur_json(joueur):
+    return {'id': joueur.id, 'prenom': joueur.prenom, 'nom': joueur.nom} if joueur else None
+
+def tournoi_ou_404(id):
+    tournoi = db.session.get(Tournoi, id)
+    if tournoi is None:
+        return None, (jsonify(erreur="Tournoi introuvable."), 404)
+    return tournoi, None
+
+@bp_api.route('/api/tournoi/<int:id>/classement')
+def api_classement(id):
+    tournoi, erreur = tournoi_ou_404(id)
+    if erreur: return erreur
+    dernier_elo = db.session.query(func.max(EloHistory.id)).scalar() or 0
+    etag = f"classement-{tournoi.id}-{tournoi.version}-{dernier_elo}"
+
+    def construire():
+        if tournoi.archive: # Same row shape, from the snapshot
+            archive = charger_archive(tournoi)
+            lignes = []
+            for j in archive.inscrits:
+                ligne = archive.classement.get(j.id)
+                lignes.append(LigneClassementApi(j.id, j.prenom, j.nom, j.elo, ligne.points if ligne else None,
+                                                 ligne.parties if ligne else None))
+            matchs = archive.resultats()
+        else:
+            lignes = db.session.query(Joueur.id, Joueur.prenom, Joueur.nom, Joueur.elo, Classement.points, Classement.parties) \
+                               .join(tournoi_joueurs, tournoi_joueurs.c.joueur_id == Joueur.id) \
+                               .outerjoin(Classement, and_(Classement.joueur_id == Joueur.id, Classement.tournoi_id == tournoi.id)) \
+                               .filter(tournoi_joueurs.c.tournoi_id == tournoi.id).all()
+            matchs = db.session.execute(select(Match.ronde, Match.joueur1_id, Match.joueur2_id, Match.resultat)
+                                        .filter(Match.tournoi_id == tournoi.id, Match.ronde <= tournoi.ronde_actuelle)).all()
+        departages = departages_tournoi(tournoi, matchs)
+        # Same order as the tournament page: score, tiebreaks, then ELO
+        ordre = ordre_departages(tournoi)
+        lignes.sort(key=lambda l: cle_classement(l.points or 0.0, departages.get(l.id), l.elo, ordre), reverse=True)
+        return {'tournoi': tournoi_json(tournoi),
+                'classement': [{'rang': rang, 'joueur': joueur_json(l), 'elo': l.elo,
+                                'points': l.points or 0.0, 'parties': l.parties or 0,
+                                'departages': {d: v for d, v in (departages.get(l.id) or {}).items() if d != 'points'}}
+                               for rang, l in enumerate(lignes, 1)]}
+    return reponse_json_conditionnelle(etag, construire)
+
+@bp_api.route('/api/tournoi/<int:id>/rondes')
+def api_rondes(id):
+    """Every board of every published round: pairings are public (see the section comment)."""
+    tournoi, erreur = tournoi_ou_404(id)
+    if erreur: return erreur
+    etag = f"rondes-{tournoi.id}-{tournoi.version}"
+
+    def construire():
+        rondes = {r: [] for r in range(1, tournoi.ronde_actuelle + 1)}
+        if tournoi.archive:
+            matchs = charger_archive(tournoi).matchs
+        else:
+            matchs = Match.query.options(joinedload(Match.joueur1), joinedload(Match.joueur2)) \
+                                .filter(Match.tournoi_id == tournoi.id, Match.ronde <= tournoi.ronde_actuelle) \
+                                .order_by(Match.ronde, Match.id).all()
+        for m in matchs:
+            appariements = rondes.setdefault(m.ronde, [])
+            appariements.append({'id': m.id, 'echiquier': len(appariements) + 1, 'blancs': joueur_json(m.joueur1),
+                                 'noirs': joueur_json(m.joueur2), 'exempt': m.joueur2_id is None,
+                                 'resultat': m.resultat})
+        return {'tournoi': tournoi_json(tournoi),
+                'rondes': [{'ronde': r, 'appariements': rondes[r]} for r in sorted(rondes)]}
+    return reponse_json_conditionnelle(etag, construire)
+
+@bp_api.route('/api/tournoi/<int:id>/joueur/<int:joueur_id>')
+def api_resultats_joueur(id, joueur_id):
+    tournoi, erreur = tournoi_ou_404(id)
+    if erreur: return erreur
+    etag = f"joueur-{tournoi.id}-{tournoi.version}-{joueur_id}"
+
+    def construire():
+        if tournoi.archive:
+            archive = charger_archive(tournoi)
+            matchs = [m for m in archive.matchs if joueur_id in (m.joueur1_id, m.joueur2_id)]
+            ligne = archive.classement.get(joueur_id)
+        else:
+            matchs = Match.query.options(joinedload(Match.joueur1), joinedload(Match.joueur2)) \
+                                .filter(Match.tournoi_id == tournoi.id, Match.ronde <= tournoi.ronde_actuelle,
+                                        (Match.joueur1_id == joueur_id) | (Match.joueur2_id == joueur_id)) \
+                                .order_by(Match.ronde).all()
+            ligne = db.session.get(Classement, (tournoi.id, joueur_id))
+        resultats = []
+        for m in matchs:
+            blancs = m.joueur1_id == joueur_id
+            score = m.resultat if blancs or m.resultat is None else 1.0 - m.resultat
+            resultats.append({'ronde': m.ronde,
+                              'couleur': 'exempt' if m.joueur2_id is None else ('blancs' if blancs else 'noirs'),
+                              'adversaire': joueur_json(m.joueur2 if blancs else m.joueur1),
+                              'score': score, 'elo_gain': (m.elo_gain_j1 if blancs else m.elo_gain_j2) or 0})
+        return {'tournoi': tournoi_json(tournoi), 'joueur_id': joueur_id,
+                'points': ligne.points if ligne else 0.0, 'resultats': resultats}
+    return reponse_json_conditionnelle(etag, construire)
+
+
+# --- Flux SSE par tournoi ---
+# Each worker process has its own broker. Changes committed by this process are
+# published right after the commit; changes made by other workers are picked up by
+# a single poller thread per process, which reads the versions of the followed
+# tournaments in one query. Streams hold a thread each: gunicorn.conf.py runs gthread
+# workers and caps the streams per process (SSE_MAX_FLUX) below their thread count.
+# Clients refused past the cap get a 503 and poll /api/tournoi/<id>/etat instead.
+diffuseur = Diffuseur() # Queue size set from the config by create_app
+_sondeur = {'pid': None}
+_verrou_sondeur = threading.Lock()
+
+def etat_tournoi(tournoi):
+    return {'version': tournoi.version or 0, 'ronde_actuelle': tournoi.ronde_actuelle, 'termine': bool(tournoi.termine)}
+
+def _sonder_versions(app):
+    while True:
+        time.sleep(app.config['SSE_POLL_INTERVAL'])
+        ids = diffuseur.tournois_suivis()
+        if not ids:
+            continue
+        try:
+            with app.app_context():
+                lignes = db.session.query(Tournoi.id, Tournoi.version, Tournoi.ronde_actuelle, Tournoi.termine) \
+                                   .filter(Tournoi.id.in_(ids)).all()
+            for l in lignes:
+                diffuseur.publier(l.id, etat_tournoi(l))
+        except exc.SQLAlchemyError as e:
+            app.logger.warning("SSE poller: %s", e)
+
+def demarrer_sondeur():
+    """Starts the version poller once per process (after a gunicorn fork, in the worker)."""
+    with _verrou_sondeur:
+        if _sondeur['pid'] != os.getpid():
+            threading.Thread(target=_sonder_versions, args=(current_app._get_current_object(),),
+                             name='sse-sondeur', daemon=True).start()
+            _sondeur['pid'] = os.getpid()
+
+@bp_api.route('/api/tournoi/<int:id>/etat')
+def api_etat(id):
+    tournoi, erreur = tournoi_ou_404(id)
+    if erreur: return erreur
+    return reponse_json_conditionnelle(f'etat-{id}-{tournoi.version or 0}', lambda: etat_tournoi(tournoi))
+
+def evenement_sse(type_evenement, donnees):
+    return f"event: {type_evenement}\ndata: {json.dumps(donnees)}\n\n"
+
+@bp_api.route('/api/tournoi/<int:id>/flux')
+def flux_tournoi(id):
+    tournoi, erreur = tournoi_ou_404(id)
+    if erreur: return erreur
+    file, etat = diffuseur.abonner(id, etat_tournoi(tournoi))
+    if file is None: # Every stream thread of this worker is taken: the page polls api_etat
+        reponse = jsonify(erreur="Trop de connexions en direct, actualisation périodique.")
+        reponse.status_code = 503
+        reponse.headers['Retry-After'] = str(current_app.config['SSE_REPLI_INTERVALLE'])
+        return reponse
+    demarrer_sondeur()
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+    # Not wrapped in stream_with_context: the app context (and its DB connection) is
+    # released as soon as this view returns, idle streams hold no connection.
+
+    def generer():
+        try:
+            yield "retry: 5000\n" + evenement_sse('etat', etat)
+            while True:
+                try:
+                    evenement = file.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield evenement_sse(evenement['type'], evenement)
+        finally:
+            diffuseur.desabonner(id, file)
+    reponse = Response(generer(), mimetype='text/event-stream')
+    reponse.headers['Cache-Control'] = 'no-cache'
+    reponse.headers['X-Accel-Buffering'] = 'no' # Disable proxy buffering (nginx)
+    return reponse
 
 
 # --- Commandes CLI ---
-# (init-db, create-admin - unchanged)
-@app.cli.command("init-db")
+# Columns added to existing tables after their creation: create_all() does not alter tables
+COLONNES_AJOUTEES = [
+    ('tournoi', 'version', "INTEGER NOT NULL DEFAULT 0"),
+    ('tournoi', 'type_tournoi', "VARCHAR(20) NOT NULL DEFAULT 'suisse'"),
+    ('tournoi', 'archive', "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ('elo_history', 'tournoi_id', "INTEGER REFERENCES tournoi(id)"),
+    ('elo_history', 'ronde', "INTEGER"),
+]
+
+def ajouter_colonnes_manquantes():
+    inspector = db.inspect(db.engine)
+    ajoutees = set()
+    for table, colonne, definition in COLONNES_AJOUTEES:
+        if colonne not in {c['name'] for c in inspector.get_columns(table)}:
+            db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {colonne} {definition}"))
+            ajoutees.add((table, colonne))
+            print(f"Added column {table}.{colonne}.")
+    if ('elo_history', 'tournoi_id') in ajoutees:
+        print(f"Attached {rattacher_historique_tournois()} history row(s) to their tournament round.")
+    db.session.commit()
+
+def rattacher_historique_tournois():
+    """Fills EloHistory.tournoi_id/ronde of the rows written before those columns, from their note.
+
+    A note names the tournament, which may not be unique: the row goes to the
+    tournament of that name whose games of that round include the player,
+    else (archived games) to the one created last before the row's date.
+    """
+    notes = db.session.scalars(select(EloHistory.note).distinct()
+                               .where(EloHistory.tournoi_id.is_(None), EloHistory.note.like('Tournoi % R%'))).all()
+    rondes = {}
+    for note in notes:
+        nom, _, ronde = note.removesuffix(' (Bye)')[len('Tournoi '):].rpartition(' R')
+        if ronde.isdigit():
+            rondes.setdefault(nom, set()).add(int(ronde))
+    homonymes = {}
+    for t_id, nom, date_creation in db.session.execute(select(Tournoi.id, Tournoi.nom, Tournoi.date_creation)
+                                                       .where(Tournoi.nom.in_(rondes)).order_by(Tournoi.date_creation, Tournoi.id)):
+        homonymes.setdefault(nom, []).append((t_id, date_creation))
+    total = 0
+    for par_joueur in (True, False):
+        for nom, tournois in homonymes.items():
+            for n, (t_id, date_creation) in enumerate(tournois):
+                suivant = tournois[n + 1][1] if n + 1 < len(tournois) else None
+                for ronde in rondes[nom]:
+                    note = f"Tournoi {nom} R{ronde}"
+                    requete = update(EloHistory).where(EloHistory.tournoi_id.is_(None), EloHistory.note.in_([note, note + " (Bye)"]),
+                                                       EloHistory.date >= date_creation)
+                    if par_joueur:
+                        de_la_ronde = and_(Match.tournoi_id == t_id, Match.ronde == ronde)
+                        requete = requete.where(EloHistory.joueur_id.in_(
+                            select(Match.joueur1_id).where(de_la_ronde).union(select(Match.joueur2_id).where(de_la_ronde))))
+                    elif suivant is not None:
+                        requete = requete.where(EloHistory.date < suivant)
+                    total += db.session.execute(requete.values(tournoi_id=t_id, ronde=ronde)).rowcount
+    return total
+
+# Indexes are declared on the models; create_all only creates them with new tables,
+# so existing databases get the missing ones from `flask migrate-indexes` (or init-db).
+def index_manquants():
+    """Model indexes absent from the database (or left invalid by a failed CONCURRENTLY build)."""
+    inspector = db.inspect(db.engine)
+    invalides = set()
+    if db.engine.dialect.name == 'postgresql':
+        invalides = set(db.session.scalars(db.text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid")))
+    manquants = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        if db.engine.dialect.name == 'sqlite':
+            # The SQLite reflection skips expression indexes (lower(nom)): read the catalog
+            existants = set(db.session.scalars(db.text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {'table': table.name}))
+        else:
+            existants = {i['name'] for i in inspector.get_indexes(table.name)} - invalides
+        manquants.extend(i for i in sorted(table.indexes, key=lambda i: i.name) if i.name not in existants)
+    return manquants, invalides
+
+def creer_index_manquants(dry_run=False):
+    """Creates the missing indexes, CONCURRENTLY on PostgreSQL; returns the DDL statements."""
+    manquants, invalides = index_manquants()
+    db.session.commit() # CONCURRENTLY cannot run inside a transaction
+    postgres = db.engine.dialect.name == 'postgresql'
+    instructions = []
+    for index in manquants:
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=db.engine.dialect))
+        if postgres:
+            ddl = ddl.replace('CREATE INDEX ', 'CREATE INDEX CONCURRENTLY ', 1)
+            if index.name in invalides:
+                instructions.append(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}")
+        instructions.append(ddl)
+    if not dry_run:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connexion:
+            for ddl in instructions:
+                connexion.execute(db.text(ddl))
+    return instructions
+
+def requetes_principales():
+    """(route, statement) pairs for the main lookups of each route, for EXPLAIN."""
+    ronde_courante = select(Match).where(Match.tournoi_id == 1, Match.ronde == 1)
+    return [
+        ('gerer_tournoi', select(Match).where(Match.tournoi_id == 1).order_by(Match.ronde, Match.id)),
+        ('sauver_resultats', ronde_courante),
+        ('generer_ronde', ronde_courante),
+        ('supprimer_joueur', select(Match.tournoi_id).where(or_(Match.joueur1_id == 1, Match.joueur2_id == 1)).distinct()),
+        ('api_resultats_joueur', select(Match).where(Match.tournoi_id == 1, or_(Match.joueur1_id == 1, Match.joueur2_id == 1))),
+        ('api_classement', select(tournoi_joueurs.c.joueur_id).where(tournoi_joueurs.c.tournoi_id == 1)),
+        ('recherche_joueurs', select(Joueur.id).where(or_(filtre_prefixe(Joueur.nom, 'dup'), filtre_prefixe(Joueur.prenom, 'dup'),
+                                                          filtre_prefixe(Joueur.username, 'dup')))),
+        ('index (en cours)', select(Tournoi.id).where(Tournoi.termine == False).order_by(Tournoi.date_creation.desc())),
+        ('index (historique)', select(Tournoi.id).where(Tournoi.termine == True)
+                                   .order_by(Tournoi.date_creation.desc(), Tournoi.id.desc()).limit(TAILLE_PAGE_ACCUEIL + 1)),
+        ('index (classement)', select(Joueur.id).order_by(Joueur.elo.desc(), Joueur.id.desc()).limit(TAILLE_PAGE_ACCUEIL + 1)),
+        ('profil', select(EloHistory.elo, EloHistory.date).where(EloHistory.joueur_id == 1).order_by(EloHistory.date)),
+    ]
+
+def expliquer(requete):
+    sql = str(requete.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    prefixe = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    lignes = db.session.execute(db.text(prefixe + sql)).all()
+    db.session.rollback()
+    return [ligne[-1] for ligne in lignes] # The plan text is the last column on both backends
+
+@bp_maintenance.cli.command("migrate-indexes")
+@click.option('--dry-run', is_flag=True, help="Print the statements without running them.")
+@click.option('--explain/--no-explain', default=True, show_default=True, help="Show query plans before and after.")
+def migrate_indexes_command(dry_run, explain):
+    """Creates the model indexes missing from an existing database (idempotent)."""
+    requetes = requetes_principales()
+    avant = {route: expliquer(r) for route, r in requetes} if explain else {}
+    instructions = creer_index_manquants(dry_run=dry_run)
+    for ddl in instructions:
+        print(("would run: " if dry_run else "ran: ") + ddl)
+    if not instructions:
+        print("All indexes already exist.")
+    if not explain:
+        return
+    for route, r in requetes:
+        print(f"\n[{route}]")
+        print("  before: " + "\n          ".join(avant[route]))
+        if instructions and not dry_run:
+            print("  after:  " + "\n          ".join(expliquer(r)))
+
+@bp_maintenance.cli.command("init-db")
 def init_db_command():
-    """Creates the database tables."""
+    """Creates the database tables and adds columns and indexes introduced since."""
     db.create_all()
+    ajouter_colonnes_manquantes()
+    for ddl in creer_index_manquants():
+        print(ddl)
     print("Database initialized.")
 
-@app.cli.command("create-admin")
+@bp_maintenance.cli.command("rebuild-standings")
+def rebuild_standings_command():
+    """Rebuilds the standings table from the Match history (repair)."""
+    # Archived tournaments keep their standings in their snapshot
+    tournoi_ids = [t_id for (t_id,) in db.session.query(Tournoi.id).filter(Tournoi.archive == False).order_by(Tournoi.id)]
+    for t_id in tournoi_ids:
+        reconstruire_classement(t_id)
+    db.session.commit()
+    print(f"Standings rebuilt for {len(tournoi_ids)} tournament(s).")
+
+@bp_maintenance.cli.command("recompute-elo")
+@click.option('--dry-run', is_flag=True, help="Report the differences without writing anything.")
+def recompute_elo_command(dry_run):
+    """Replays every match to recompute ratings, ELO gains and history."""
+    debut = datetime.now()
+    rapport = recalculer_elo(dry_run=dry_run)
+    duree = (datetime.now() - debut).total_seconds()
+    for joueur_id, avant, apres in rapport['joueurs_modifies']:
+        print(f"  joueur {joueur_id}: {avant} -> {apres}")
+    print(f"{'[dry-run] ' if dry_run else ''}{rapport['matchs_modifies']} match(es) with different gains, "
+          f"{rapport['rondes_reecrites']} round(s) of history rewritten, "
+          f"{len(rapport['joueurs_modifies'])} rating(s) changed in {duree:.1f}s.")
+
+@bp_maintenance.cli.command("archive-tournaments")
+@click.argument('tournoi_ids', nargs=-1, type=int)
+@click.option('--older-than', 'jours', type=int, default=365, show_default=True,
+              help="Without ids: archive the finished tournaments created at least this many days ago.")
+@click.option('--dry-run', is_flag=True, help="List the tournaments without archiving them.")
+def archive_tournaments_command(tournoi_ids, jours, dry_run):
+    """Archives finished tournaments into compressed snapshots and deletes their games."""
+    requete = db.session.query(Tournoi.id, Tournoi.nom).filter(Tournoi.termine == True, Tournoi.archive == False)
+    if tournoi_ids:
+        requete = requete.filter(Tournoi.id.in_(tournoi_ids))
+    else:
+        requete = requete.filter(Tournoi.date_creation <= datetime.utcnow() - timedelta(days=jours))
+    a_archiver = requete.order_by(Tournoi.date_creation, Tournoi.id).all()
+    total_matchs = total_taille = total_compresse = 0
+    for t_id, nom in a_archiver:
+        if dry_run:
+            print(f"would archive {t_id} {nom!r}")
+            continue
+        tournoi = db.session.get(Tournoi, t_id)
+        toucher_tournoi(tournoi)
+        matchs, taille, taille_compressee = archiver_tournoi(tournoi)
+        db.session.commit() # One transaction per tournament
+        total_matchs, total_taille, total_compresse = total_matchs + matchs, total_taille + taille, total_compresse + taille_compressee
+        print(f"archived {t_id} {nom!r}: {matchs} game(s), {taille / 1024:.1f} KB -> {taille_compressee / 1024:.1f} KB")
+    if dry_run or not a_archiver:
+        print(f"{len(a_archiver)} tournament(s) to archive.")
+    else:
+        print(f"{len(a_archiver)} tournament(s) archived, {total_matchs} game(s) removed from the match table, "
+              f"snapshots {total_taille / 1024:.1f} KB -> {total_compresse / 1024:.1f} KB.")
+
+@bp_maintenance.cli.command("import-players")
+@click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format_fichier', type=click.Choice(['csv', 'json']), help="Defaults to the file extension.")
+@click.option('--processes', type=int, default=None, help="Hashing processes (default: CPU count).")
+@click.option('--chunk-size', type=int, default=TAILLE_LOT_IMPORT, show_default=True)
+def import_players_command(fichier, format_fichier, processes, chunk_size):
+    """Creates players from a CSV/JSON file (username, prenom, nom, password, elo)."""
+    format_fichier = format_fichier or ('json' if fichier.lower().endswith('.json') else 'csv')
+    with open(fichier, encoding='utf-8-sig') as f:
+        lignes, erreurs = lire_fichier_joueurs(f.read(), format_fichier)
+    for erreur in erreurs:
+        print(f"  skipped: {erreur}")
+    rapport = importer_joueurs(lignes, taille_lot=chunk_size, processus=processes)
+    print(f"{rapport['importes']} player(s) imported, {rapport['ignores']} already existing, {len(erreurs)} invalid row(s).")
+    print(f"Hashing {rapport['duree_hachage']:.1f} s, inserts {rapport['duree_insertion']:.1f} s, "
+          f"total {rapport['duree']:.1f} s ({rapport['debit']:.0f} players/s).")
+
+@bp_maintenance.cli.command("worker")
+@click.option('--threads', default=1, show_default=True, help='Jobs run at the same time by this process.')
+@click.option('--nice', default=None, type=int, help='Lower the process priority (default: TACHES_NICE).')
+def worker_command(threads, nice):
+    """Runs background jobs until interrupted (use with TACHES_MODE=externe)."""
+    try:
+        os.nice(current_app.config['TACHES_NICE'] if nice is None else nice)
+    except OSError:
+        pass
+    arret = threading.Event()
+    fils = [threading.Thread(target=boucle_taches, args=(current_app._get_current_object(), arret), name=f'taches-{n}')
+            for n in range(threads)]
+    for f in fils:
+        f.start()
+    print(f"Job worker {nom_executeur()} running {threads} thread(s), polling every {current_app.config['TACHES_INTERVALLE']} s.")
+    try:
+        while any(f.is_alive() for f in fils):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping after the running jobs...")
+        arret.set()
+        for f in fils:
+            f.join()
+
+@bp_maintenance.cli.command("create-admin")
 def create_admin_command():
     """Creates the initial admin user."""
     username = input("Admin username: ")
@@ -624,8 +2885,63 @@ def create_admin_command():
     print(f"Administrator '{username}' created successfully!")
 
 
+# --- Fabrique de l'Application ---
+_moteurs = weakref.WeakSet() # Engines of the apps built in this process, disposed after a fork
+
+def create_app(config=None):
+    """Builds the Flask application; `config` overrides the settings read from the environment.
+
+    `flask --app app`, `gunicorn 'app:create_app()'` and `gunicorn app:app` all call it.
+    """
+    app = Flask(__name__, instance_path=instance_path)
+    configurer(app, config)
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    cache_identites.taille_max = app.config['IDENTITE_CACHE_MAX']
+    cache_identites.ttl = app.config['IDENTITE_CACHE_TTL']
+    cache_pdf.max_octets = app.config['PDF_CACHE_MAX_OCTETS']
+    cache_fragments.max_octets = app.config['FRAGMENTS_CACHE_MAX_OCTETS']
+    diffuseur.taille_file = app.config['SSE_FILE_MAX']
+    diffuseur.max_abonnes = app.config['SSE_MAX_FLUX']
+    for blueprint in (bp_comptes, bp_joueurs, bp_tournois, bp_api, bp_taches, bp_supervision, bp_maintenance):
+        app.register_blueprint(blueprint)
+
+    with app.app_context():
+        # Creating the engine opens no connection: the pool fills on first use
+        moteur = db.engine
+    if app.config['SQLITE_PRAGMAS']:
+        event.listen(moteur, 'connect', partial(_appliquer_pragmas_sqlite, app.config['SQLITE_PRAGMAS']))
+    _moteurs.add(moteur)
+    return app
+
+def _apres_fork():
+    # A forked child (gunicorn --preload worker) inherits the parent's pooled
+    # connections; sharing their sockets corrupts both sides. close=False
+    # forgets them without closing what the parent still uses.
+    for moteur in list(_moteurs):
+        moteur.dispose(close=False)
+
+os.register_at_fork(after_in_child=_apres_fork)
+
+_verrou_app = threading.Lock()
+
+def __getattr__(nom):
+    # Compatibility for `gunicorn app:app` and other WSGI servers that expect a
+    # module-level application: `app.app` is built by create_app() on first
+    # access only, so a plain import still creates nothing.
+    if nom != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    with _verrou_app:
+        if 'app' not in globals():
+            globals()['app'] = create_app()
+    return globals()['app']
+
+
 # --- Run ---
 if __name__ == '__main__':
+    app = create_app()
     # Create tables if running with `python app.py` and db doesn't exist
     with app.app_context():
         # Check if tables exist before creating, especially for local SQLite
@@ -636,4 +2952,6 @@ if __name__ == '__main__':
              print("Tables created.")
         else:
              print("Database tables already exist.")
+             db.create_all() # Tables added since (no-op for existing ones)
+             ajouter_colonnes_manquantes()
     app.run(debug=True) # debug=True for development only!
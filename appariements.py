@@ -0,0 +1,342 @@
+# Moteur d'appariement suisse (score groups, floaters, couleurs, bye) et tables de Berger
+"""Swiss pairing engine used by ``generer_ronde``, and the Berger tables of round-robins.
+
+The engine works on plain ids and dicts so it can be used (and benchmarked)
+without a database. Pairing is done in three stages:
+
+1. Players are split into score groups. Each group (plus the players that
+   floated down from the group above) is paired Dutch-style: top half
+   against bottom half. An odd group floats its lowest player down.
+2. The resulting matching is improved by pairwise exchanges on a weighted
+   cost (rematch >> absolute colour clash >> score difference >> mild
+   colour clash). Only pairs with a rematch or an absolute colour clash are
+   examined, so a round without conflicts stays linear.
+3. Rematches and absolute colour clashes are forbidden (FIDE C.04 absolute
+   criteria: no second game against the same opponent, no colour difference
+   beyond 2, no colour three times in a row). Pairs the exchanges could not
+   fix are re-paired by an exact minimum-cost matching: of the whole field
+   when it is small, otherwise of the few pairs around each conflict.
+
+Round-robins do not pair round by round: ``calendrier_berger`` returns the
+whole schedule at once.
+"""
+
+POIDS_REVANCHE = 1000000  # Playing the same opponent twice (forbidden)
+POIDS_EXEMPT_REPETE = 100000  # Second bye, only to avoid a rematch
+POIDS_COULEUR_ABSOLUE = 10000  # Both players have an absolute preference for the same colour (forbidden)
+POIDS_SCORE = 100      # Per point of score difference between opponents
+POIDS_COULEUR = 1      # Both players have a mild preference for the same colour
+
+MAX_PASSES = 4
+FENETRE = 16  # Neighbouring pairs searched first to fix a colour clash
+TAILLE_EXACTE = 16  # Players (bye included) up to which the exact matching runs
+
+
+def _preference_couleur(historique):
+    """Returns (direction, force) from a colour history string like 'BNB'.
+
+    direction: +1 wants white, -1 wants black, 0 no preference.
+    force: 2 absolute (imbalance >= 2 or same colour twice in a row), 1 mild.
+    """
+    if not historique:
+        return 0, 0
+    diff = historique.count('B') - historique.count('N')
+    if diff >= 2 or historique[-2:] == 'BB':
+        return -1, 2
+    if diff <= -2 or historique[-2:] == 'NN':
+        return 1, 2
+    if diff != 0:
+        return (-1 if diff > 0 else 1), 1
+    return (1 if historique[-1] == 'N' else -1), 1
+
+
+class _Contexte:
+    def __init__(self, scores, adversaires, couleurs):
+        self.scores = scores
+        self.adversaires = adversaires
+        self.couleurs = couleurs
+        self.infos = {}  # id: (score, colour direction, colour force)
+
+    def info(self, pid):
+        i = self.infos.get(pid)
+        if i is None:
+            i = self.infos[pid] = (self.scores.get(pid, 0.0),) + _preference_couleur(self.couleurs.get(pid, ''))
+        return i
+
+    def cout(self, a, b):
+        # Hot path of the exchanges: one lookup per player
+        infos = self.infos
+        score_a, dir_a, force_a = infos[a] if a in infos else self.info(a)
+        score_b, dir_b, force_b = infos[b] if b in infos else self.info(b)
+        c = POIDS_SCORE * abs(score_a - score_b)
+        if b in self.adversaires.get(a, ()):
+            c += POIDS_REVANCHE
+        if dir_a and dir_a == dir_b:
+            c += POIDS_COULEUR_ABSOLUE if force_a == force_b == 2 else POIDS_COULEUR
+        return c
+
+    def interdit(self, a, b):
+        """Rematch or absolute colour clash: the pair breaks an absolute criterion."""
+        return self.cout(a, b) - POIDS_SCORE * abs(self.scores.get(a, 0.0) - self.scores.get(b, 0.0)) >= POIDS_COULEUR_ABSOLUE
+
+
+def _fenetres(i, n):
+    """Ranges of pairs around i, FENETRE wide then four times wider each time, up to all n."""
+    largeur = FENETRE
+    while True:
+        yield range(max(0, i - largeur), min(n, i + largeur + 1))
+        if largeur >= n:
+            return
+        largeur *= 4
+
+
+def _ameliorer(paires, ctx, elargir=True):
+    """Pairwise-exchange improvement of a list of [a, b] pairs, in place.
+
+    For every conflicting pair, try the two possible partner exchanges with
+    the other pairs and keep the best improving one. Rematches search every
+    pair; colour clashes search the FENETRE neighbouring pairs, then (if
+    elargir) wider windows while none of those helps.
+    """
+    if len(paires) < 2:
+        return
+    couts = [ctx.cout(a, b) for a, b in paires]
+    for _ in range(MAX_PASSES):
+        ameliore = False
+        for i in range(len(paires)):
+            a, b = paires[i]
+            # Only rematches and absolute colour clashes trigger a search; mild
+            # colour clashes and score differences are often unavoidable.
+            conflit = couts[i] - POIDS_SCORE * abs(ctx.scores.get(a, 0.0) - ctx.scores.get(b, 0.0))
+            if conflit < POIDS_COULEUR_ABSOLUE:
+                continue
+            if conflit >= POIDS_REVANCHE:
+                recherches = (range(len(paires)),)
+            else:
+                recherches = _fenetres(i, len(paires)) if elargir else (range(max(0, i - FENETRE), min(len(paires), i + FENETRE + 1)),)
+            meilleur = None
+            for candidats in recherches:
+                meilleur_delta = 0
+                for j in candidats:
+                    if j == i:
+                        continue
+                    c, d = paires[j]
+                    avant = couts[i] + couts[j]
+                    for x, y, z, w in ((a, c, b, d), (a, d, b, c)):
+                        c1 = ctx.cout(x, y)
+                        c2 = ctx.cout(z, w)
+                        delta = c1 + c2 - avant
+                        if delta < meilleur_delta:
+                            meilleur_delta = delta
+                            meilleur = (j, [x, y], [z, w], c1, c2)
+                if meilleur:
+                    break
+            if meilleur:
+                j, p1, p2, c1, c2 = meilleur
+                paires[i], paires[j] = p1, p2
+                couts[i], couts[j] = c1, c2
+                ameliore = True
+        if not ameliore:
+            break
+
+
+def _appariement_exact(joueurs, cout):
+    """Minimum-cost perfect matching of an even list of players.
+
+    Dynamic programming over the subsets still to pair, the lowest remaining
+    player taking each possible partner: O(2^n * n), for at most TAILLE_EXACTE
+    players.
+    """
+    couts = [[cout(a, b) if i != j else 0 for j, b in enumerate(joueurs)] for i, a in enumerate(joueurs)]
+    memo = {0: (0, None)}
+
+    def resoudre(masque):
+        meilleur = memo.get(masque)
+        if meilleur is None:
+            i = (masque & -masque).bit_length() - 1
+            reste = masque ^ (1 << i)
+            autres = reste
+            while autres:
+                bit = autres & -autres
+                autres ^= bit
+                j = bit.bit_length() - 1
+                c = couts[i][j] + resoudre(reste ^ bit)[0]
+                if meilleur is None or c < meilleur[0]:
+                    meilleur = (c, j)
+            memo[masque] = meilleur
+        return meilleur
+
+    masque = (1 << len(joueurs)) - 1
+    resoudre(masque)
+    paires = []
+    while masque:
+        i = (masque & -masque).bit_length() - 1
+        j = memo[masque][1]
+        paires.append([joueurs[i], joueurs[j]])
+        masque ^= (1 << i) | (1 << j)
+    return paires
+
+
+def _reparer(paires, ctx):
+    """Re-pairs exactly the pairs around each forbidden pair left by the exchanges, in place.
+
+    The window is the TAILLE_EXACTE players of the neighbouring pairs (close
+    in score); it is replaced only if the exact matching costs less.
+    """
+    taille = min(len(paires), TAILLE_EXACTE // 2)
+    for i in range(len(paires)):
+        if not ctx.interdit(*paires[i]):
+            continue
+        debut = max(0, min(i - taille // 2, len(paires) - taille))
+        fenetre = paires[debut:debut + taille]
+        nouvelles = _appariement_exact([pid for paire in fenetre for pid in paire], ctx.cout)
+        if sum(ctx.cout(a, b) for a, b in nouvelles) < sum(ctx.cout(a, b) for a, b in fenetre):
+            paires[debut:debut + taille] = nouvelles
+
+
+def _apparier_exact(joueurs_classes, ctx, exemptes, rang):
+    """Exact pairing of a small field, the bye included: returns (paires, exempt).
+
+    The bye is a virtual player. It costs the player's score, so it goes to
+    the lowest-ranked player that still allows a legal pairing; a second bye
+    is only given when every other choice leaves a rematch.
+    """
+    dernier = len(joueurs_classes) - 1
+
+    def cout(a, b):
+        if a is None or b is None:
+            pid = b if a is None else a
+            if pid in exemptes:
+                return POIDS_EXEMPT_REPETE
+            return POIDS_SCORE * ctx.scores.get(pid, 0.0) + dernier - rang[pid]
+        return ctx.cout(a, b)
+
+    noeuds = list(joueurs_classes) + ([None] if len(joueurs_classes) % 2 else [])
+    paires, exempt = [], None
+    for a, b in _appariement_exact(noeuds, cout):
+        if a is None or b is None:
+            exempt = b if a is None else a
+        else:
+            paires.append([a, b])
+    return paires, exempt
+
+
+def _attribuer_couleurs(a, b, rang, couleurs):
+    """Returns (blanc, noir) for a pair, honouring colour preferences."""
+    hist_a, hist_b = couleurs.get(a, ''), couleurs.get(b, '')
+    dir_a, force_a = _preference_couleur(hist_a)
+    dir_b, force_b = _preference_couleur(hist_b)
+    if (dir_a, force_a) != (dir_b, force_b):
+        # The stronger (or only) preference wins
+        if dir_a * force_a > dir_b * force_b:
+            return a, b
+        if dir_a * force_a < dir_b * force_b:
+            return b, a
+    # Same preference: alternate on the most recent differing colour
+    for ca, cb in zip(reversed(hist_a), reversed(hist_b)):
+        if ca != cb:
+            return (a, b) if ca == 'N' else (b, a)
+    # Nothing to separate them: higher-ranked player gets white
+    return (a, b) if rang[a] < rang[b] else (b, a)
+
+
+def apparier(joueurs_classes, scores, adversaires, couleurs=None, exemptes=None):
+    """Pairs one Swiss round.
+
+    joueurs_classes: player ids in ranking order (score desc, then ELO desc).
+    scores: {id: points}. adversaires: {id: set of opponents already met}.
+    couleurs: {id: colour history string, 'B' white / 'N' black}.
+    exemptes: ids of players who already received a bye.
+
+    Returns (appariements, exempt) where appariements is a list of
+    (blanc_id, noir_id) in board order and exempt is an id or None.
+    """
+    couleurs = couleurs or {}
+    exemptes = exemptes or set()
+    joueurs = list(joueurs_classes)
+    rang = {pid: i for i, pid in enumerate(joueurs)}
+
+    exempt = None
+    if len(joueurs) % 2:
+        # Lowest-ranked player who has not had a bye yet (or the very last one)
+        exempt = next((pid for pid in reversed(joueurs) if pid not in exemptes), joueurs[-1])
+        joueurs.remove(exempt)
+
+    ctx = _Contexte(scores, adversaires, couleurs)
+
+    # Score groups, preserving ranking order
+    groupes = []
+    for pid in joueurs:
+        s = scores.get(pid, 0.0)
+        if groupes and groupes[-1][0] == s:
+            groupes[-1][1].append(pid)
+        else:
+            groupes.append((s, [pid]))
+
+    paires = []
+    flottants = []
+    for n, (_, membres) in enumerate(groupes):
+        groupe = flottants + membres
+        flottants = []
+        if len(groupe) % 2:
+            flottants.append(groupe.pop())
+        moitie = len(groupe) // 2
+        paires_groupe = [[groupe[i], groupe[i + moitie]] for i in range(moitie)]
+        # Colour clashes a group cannot fix float down, or go to the global pass
+        _ameliorer(paires_groupe, ctx, elargir=False)
+        if n < len(groupes) - 1:
+            # Pairs that are still forbidden float down to the next group together
+            gardees = []
+            for a, b in paires_groupe:
+                if ctx.interdit(a, b):
+                    flottants.extend(sorted((a, b), key=rang.__getitem__))
+                else:
+                    gardees.append([a, b])
+            paires_groupe = gardees
+        paires.extend(paires_groupe)
+
+    # Final global pass across groups for anything still conflicting
+    _ameliorer(paires, ctx)
+    if any(ctx.interdit(a, b) for a, b in paires):
+        # Exchanges of two pairs are stuck: exact matching (bye included on small fields)
+        if len(rang) <= TAILLE_EXACTE:
+            paires, exempt = _apparier_exact(list(rang), ctx, exemptes, rang)
+        else:
+            _reparer(paires, ctx)
+
+    paires.sort(key=lambda p: (-max(scores.get(p[0], 0.0), scores.get(p[1], 0.0)), min(rang[p[0]], rang[p[1]])))
+    appariements = [_attribuer_couleurs(a, b, rang, couleurs) for a, b in paires]
+    return appariements, exempt
+
+
+def calendrier_berger(joueurs, aller_retour=False):
+    """Every round of a round-robin, from the Berger tables (FIDE C.05, annex 1).
+
+    joueurs: ids in pairing-number order; with an odd count, the missing last
+    number is the bye. Returns one (appariements, exempt) per round, as
+    ``apparier`` does. A double round-robin plays the same rounds again with
+    colours reversed. n / 2 boards per round for n - 1 rounds: O(n²) overall.
+    """
+    numeros = list(joueurs) + ([None] if len(joueurs) % 2 else [])
+    n = len(numeros)
+    if n < 2:
+        return []
+    m = n - 1  # Numbers 1..m turn around the table, number n stays on board 1
+    rondes = []
+    for r in range(1, n):
+        # Number n meets the i with 2i = r + 1 (mod m); the other boards pair
+        # i + k with i - k, the first of the two with white
+        pivot = (r + 1) * (m + 1) // 2 % m or m
+        paires = [(numeros[n - 1], numeros[pivot - 1]) if r % 2 == 0 else (numeros[pivot - 1], numeros[n - 1])]
+        for k in range(1, n // 2):
+            paires.append((numeros[(pivot + k - 1) % m], numeros[(pivot - k - 1) % m]))
+        appariements, exempt = [], None
+        for blanc, noir in paires:
+            if blanc is None or noir is None:
+                exempt = noir if blanc is None else blanc
+            else:
+                appariements.append((blanc, noir))
+        rondes.append((appariements, exempt))
+    if aller_retour:
+        rondes += [([(noir, blanc) for blanc, noir in appariements], exempt) for appariements, exempt in rondes]
+    return rondes
@@ -0,0 +1,61 @@
+# Archives des tournois terminés (instantanés compressés)
+"""Snapshot format of archived tournaments.
+
+An archived tournament is one zlib-compressed JSON document holding what its
+page, exports and API show: the players as they were at archive time (names,
+rating), the final standings rows and every game with its result and ELO
+gains. Rows are positional lists rather than objects, which keeps the
+document small before compression.
+
+Archive exposes the snapshot with the attribute names of the live models
+(Joueur, Classement, Match), so the page macros and the exports read either.
+"""
+import json
+import zlib
+from collections import namedtuple
+
+FORMAT = 1
+
+JoueurArchive = namedtuple('JoueurArchive', 'id prenom nom elo')
+LigneArchive = namedtuple('LigneArchive', 'joueur_id points parties couleurs exempt')
+MatchArchive = namedtuple('MatchArchive', 'id ronde joueur1_id joueur2_id resultat elo_gain_j1 elo_gain_j2 joueur1 joueur2')
+
+
+def document_archive(tournoi, joueurs, inscrits, classement, matchs):
+    """Builds the snapshot document from plain rows.
+
+    tournoi: dict of the tournament's columns; joueurs: (id, prenom, nom, elo);
+    inscrits: ids of the players registered at the end; classement: (joueur_id,
+    points, parties, couleurs, exempt); matchs: (id, ronde, joueur1_id,
+    joueur2_id, resultat, elo_gain_j1, elo_gain_j2), in round order.
+    """
+    return {'format': FORMAT, 'tournoi': tournoi,
+            'joueurs': [list(j) for j in joueurs], 'inscrits': sorted(inscrits),
+            'classement': [list(l) for l in classement], 'matchs': [list(m) for m in matchs]}
+
+
+def compresser(document):
+    """Returns (compressed bytes, uncompressed size)."""
+    brut = json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return zlib.compress(brut, 9), len(brut)
+
+
+def decompresser(donnees):
+    document = json.loads(zlib.decompress(donnees))
+    if document.get('format') != FORMAT:
+        raise ValueError(f"unknown archive format {document.get('format')!r}")
+    return document
+
+
+class Archive:
+    """Read view of a snapshot document."""
+    def __init__(self, document):
+        self.tournoi = document['tournoi']
+        self.joueurs = {j[0]: JoueurArchive(*j) for j in document['joueurs']}
+        self.inscrits = [self.joueurs[j_id] for j_id in document['inscrits']]
+        self.classement = {l[0]: LigneArchive(*l) for l in document['classement']}
+        self.matchs = [MatchArchive(*m, self.joueurs.get(m[2]), self.joueurs.get(m[3])) for m in document['matchs']]
+
+    def resultats(self):
+        """(ronde, joueur1_id, joueur2_id, resultat) rows, the input of the tiebreaks."""
+        return [(m.ronde, m.joueur1_id, m.joueur2_id, m.resultat) for m in self.matchs]
@@ -0,0 +1,108 @@
+"""Benchmark: archiving finished tournaments into snapshots.
+
+Bulk-seeds a club history (finished tournaments of 50 players, as
+bench_recalcul_elo does) plus one live tournament, then measures the same
+operations before and after `flask archive-tournaments` moves every finished
+tournament into its compressed snapshot:
+
+- size of the match and standings tables, and of the database file;
+- supprimer_joueur (a few players with a full history each);
+- the live tournament's page, a finished tournament's page with its page
+  cache cleared, and its CSV export;
+- the ELO replay (dry run), which reads the snapshots after archiving.
+
+    python benchmarks/archivage.py [--matchs 200000] [--joueurs 2000] [--suppressions 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import commun
+from bench_recalcul_elo import peupler_historique
+
+
+def mediane_ms(fonction, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return 1000 * statistics.median(durees)
+
+
+def taille_base(module):
+    with module.app.app_context():
+        with module.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connexion:
+            connexion.execute(module.db.text("VACUUM")) # Written through the WAL: checkpoint it into the file
+            connexion.execute(module.db.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        chemin = module.db.engine.url.database
+    return os.path.getsize(chemin) / 1024 / 1024
+
+
+def mesurer(module, client, live, termine, joueurs_a_supprimer):
+    resultat = {}
+    with module.app.app_context():
+        resultat['matchs'] = module.Match.query.count()
+        resultat['classement'] = module.Classement.query.count()
+    resultat['base_mo'] = taille_base(module)
+
+    def page_froide():
+        module.cache_fragments.oublier(lambda cle: True)
+        assert client.get(f'/tournoi/{termine}').status_code == 200
+    resultat['page_live_ms'] = mediane_ms(lambda: client.get(f'/tournoi/{live}'))
+    resultat['page_terminee_ms'] = mediane_ms(page_froide)
+    resultat['csv_ms'] = mediane_ms(lambda: client.get(f'/tournoi/{termine}/export_csv').get_data())
+    with module.app.app_context():
+        resultat['recalcul_s'] = mediane_ms(lambda: module.recalculer_elo(dry_run=True), 1) / 1000
+    durees = []
+    for joueur_id in joueurs_a_supprimer:
+        debut = time.perf_counter()
+        assert client.get(f'/joueur/supprimer/{joueur_id}').status_code == 302
+        durees.append(time.perf_counter() - debut)
+    resultat['suppression_ms'] = 1000 * statistics.median(durees)
+    return resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--matchs', type=int, default=200000, help='games of the finished tournaments')
+    parser.add_argument('--joueurs', type=int, default=2000)
+    parser.add_argument('--suppressions', type=int, default=5, help='players deleted in each phase')
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    nb = peupler_historique(module, joueur_ids, args.matchs)
+    client = commun.client_admin(module)
+    live = commun.creer_tournoi(module, joueur_ids[:50], 7, nom='En cours')
+    for ronde in range(1, 4):
+        commun.jouer_ronde(module, client, live, ronde)
+    with module.app.app_context():
+        termine = module.db.session.query(module.Tournoi.id).filter(module.Tournoi.termine == True) \
+                                   .order_by(module.Tournoi.id.desc()).first()[0]
+    # Players of the seeded history only, not of the live tournament
+    avant = mesurer(module, client, live, termine, joueur_ids[-args.suppressions:])
+
+    debut = time.perf_counter()
+    sortie = module.app.test_cli_runner().invoke(args=['archive-tournaments', '--older-than', '0'])
+    duree_archivage = time.perf_counter() - debut
+    assert sortie.exit_code == 0, sortie.output
+    print(sortie.output.strip().splitlines()[-1])
+    with module.app.app_context():
+        taille, compresse = module.db.session.query(module.func.sum(module.TournoiArchive.taille),
+                                                    module.func.sum(module.func.length(module.TournoiArchive.donnees))).one()
+    apres = mesurer(module, client, live, termine, joueur_ids[-2 * args.suppressions:-args.suppressions])
+
+    print(f"{nb} archived games, archived in {duree_archivage:.1f} s, snapshots {taille / 1024 / 1024:.1f} MB "
+          f"of JSON -> {compresse / 1024 / 1024:.1f} MB compressed")
+    print(f"{'':<28} {'before':>10} {'after':>10}")
+    for cle, titre in (('matchs', 'match rows'), ('classement', 'standings rows'), ('base_mo', 'database (MB)'),
+                       ('suppression_ms', 'supprimer_joueur (ms)'), ('page_live_ms', 'live page (ms)'),
+                       ('page_terminee_ms', 'finished page, cold (ms)'), ('csv_ms', 'finished CSV (ms)'),
+                       ('recalcul_s', 'ELO replay dry run (s)')):
+        print(f"{titre:<28} {avant[cle]:>10.1f} {apres[cle]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: Swiss pairing engine vs. the historical greedy loop.
+
+Simulates full tournaments on synthetic fields (random ELO, results drawn
+from the ELO expectation) and times each round's pairing. Reports the
+rematches and the players who broke an absolute colour rule.
+
+    python benchmarks/bench_appariements.py [--joueurs 2000] [--rondes 9]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appariements import apparier  # noqa: E402
+
+
+def apparier_glouton(joueurs_classes, scores, adversaires, couleurs=None, exemptes=None):
+    """The pairing loop generer_ronde used before the engine (pop(0) + linear scan)."""
+    appariements = []
+    joueurs_non_apparies = list(joueurs_classes)
+    while len(joueurs_non_apparies) > 1:
+        j1 = joueurs_non_apparies.pop(0)
+        j2 = next((j for j in joueurs_non_apparies if j not in adversaires[j1]), None)
+        if j2 is None:
+            j2 = joueurs_non_apparies.pop(0)
+        else:
+            joueurs_non_apparies.remove(j2)
+        appariements.append((j1, j2))
+    return appariements, (joueurs_non_apparies[0] if joueurs_non_apparies else None)
+
+
+def simuler(moteur, nb_joueurs, nb_rondes, graine):
+    rng = random.Random(graine)
+    elos = {pid: rng.randint(1000, 2600) for pid in range(1, nb_joueurs + 1)}
+    scores = {pid: 0.0 for pid in elos}
+    adversaires = {pid: set() for pid in elos}
+    couleurs = {pid: '' for pid in elos}
+    exemptes = set()
+    temps, revanches, desequilibres = [], 0, 0
+
+    for _ in range(nb_rondes):
+        classes = sorted(elos, key=lambda p: (scores[p], elos[p]), reverse=True)
+        debut = time.perf_counter()
+        appariements, exempt = moteur(classes, scores, adversaires, couleurs, exemptes)
+        temps.append(time.perf_counter() - debut)
+
+        for blanc, noir in appariements:
+            if noir in adversaires[blanc]:
+                revanches += 1
+            adversaires[blanc].add(noir)
+            adversaires[noir].add(blanc)
+            couleurs[blanc] += 'B'
+            couleurs[noir] += 'N'
+            attendu = 1 / (1 + 10 ** ((elos[noir] - elos[blanc]) / 400))
+            tirage = rng.random()
+            res = 1.0 if tirage < attendu - 0.1 else (0.0 if tirage > attendu + 0.1 else 0.5)
+            scores[blanc] += res
+            scores[noir] += 1.0 - res
+        if exempt is not None:
+            exemptes.add(exempt)
+            scores[exempt] += 1.0
+
+    for hist in couleurs.values():
+        # Absolute colour rules: difference of at most 2, never three times in a row
+        if abs(hist.count('B') - hist.count('N')) > 2 or 'BBB' in hist or 'NNN' in hist:
+            desequilibres += 1
+    return temps, revanches, desequilibres
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--rondes', type=int, default=9)
+    parser.add_argument('--graine', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'joueurs':>8} {'moteur':>8} {'max/ronde':>10} {'total':>9} {'revanches':>10} {'couleurs':>11}")
+    for n in args.joueurs:
+        for nom, moteur in (('glouton', apparier_glouton), ('suisse', apparier)):
+            temps, revanches, desequilibres = simuler(moteur, n, args.rondes, args.graine)
+            print(f"{n:>8} {nom:>8} {max(temps) * 1000:>8.1f}ms {sum(temps):>8.3f}s {revanches:>10} {desequilibres:>11}")
+
+
+if __name__ == '__main__':
+    main()
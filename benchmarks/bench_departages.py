@@ -0,0 +1,109 @@
+"""Benchmark: tiebreak engine vs. one nested loop per tiebreak.
+
+Plays a synthetic Swiss tournament with the pairing engine (results drawn
+from the ELO expectation), then times the computation of every tiebreak
+from the match list, and checks both methods agree.
+
+    python benchmarks/bench_departages.py [--joueurs 1000] [--rondes 11] [--repetitions 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appariements import apparier  # noqa: E402
+from departages import calculer_departages  # noqa: E402
+
+
+def departages_naifs(joueur_ids, matchs, nombre_rondes):
+    """Straightforward version: every tiebreak rescans the match list for each player."""
+    def parties(pid):
+        for ronde, blanc, noir, resultat in matchs:
+            if blanc == pid:
+                yield ronde, noir, resultat
+            elif noir == pid:
+                yield ronde, blanc, 1.0 - resultat
+
+    points = {pid: sum(s for _, _, s in parties(pid)) for pid in joueur_ids}
+    departages = {}
+    for pid in joueur_ids:
+        adversaires = [points[a] for _, a, _ in parties(pid) if a is not None]
+        buchholz = sum(adversaires, 0.0)
+        progressif = cumul = 0.0
+        for ronde in range(1, nombre_rondes + 1):
+            cumul += sum(s for r, _, s in parties(pid) if r == ronde)
+            progressif += cumul
+        departages[pid] = {
+            'points': points[pid],
+            'buchholz': buchholz,
+            'buchholz_cut1': buchholz - min(adversaires) if adversaires else 0.0,
+            'sonneborn_berger': sum((points[a] * s for _, a, s in parties(pid) if a is not None), 0.0),
+            'progressif': progressif,
+            'confrontation': sum((s for _, a, s in parties(pid) if a is not None and points[a] == points[pid]), 0.0),
+        }
+    return departages
+
+
+def simuler(nb_joueurs, nb_rondes, graine):
+    """Returns (joueur_ids, matchs) with matchs as (ronde, blanc, noir, resultat) rows."""
+    rng = random.Random(graine)
+    elos = {pid: rng.randint(1000, 2600) for pid in range(1, nb_joueurs + 1)}
+    scores = {pid: 0.0 for pid in elos}
+    adversaires = {pid: set() for pid in elos}
+    couleurs = {pid: '' for pid in elos}
+    exemptes = set()
+    matchs = []
+    for ronde in range(1, nb_rondes + 1):
+        classes = sorted(elos, key=lambda p: (scores[p], elos[p]), reverse=True)
+        paires, exempt = apparier(classes, scores, adversaires, couleurs, exemptes)
+        for blanc, noir in paires:
+            attendu = 1 / (1 + 10 ** ((elos[noir] - elos[blanc]) / 400))
+            tirage = rng.random()
+            resultat = 1.0 if tirage < attendu - 0.1 else (0.5 if tirage < attendu + 0.1 else 0.0)
+            matchs.append((ronde, blanc, noir, resultat))
+            scores[blanc] += resultat
+            scores[noir] += 1.0 - resultat
+            adversaires[blanc].add(noir)
+            adversaires[noir].add(blanc)
+            couleurs[blanc] += 'B'
+            couleurs[noir] += 'N'
+        if exempt is not None:
+            matchs.append((ronde, exempt, None, 1.0))
+            scores[exempt] += 1.0
+            exemptes.add(exempt)
+    return list(elos), matchs
+
+
+def mesurer(fonction, joueur_ids, matchs, nb_rondes, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction(joueur_ids, matchs, nb_rondes)
+        durees.append(time.perf_counter() - debut)
+    return resultat, statistics.median(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=int, default=1000)
+    parser.add_argument('--rondes', type=int, default=11)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    joueur_ids, matchs = simuler(args.joueurs, args.rondes, graine=1)
+    moteur, duree_moteur = mesurer(calculer_departages, joueur_ids, matchs, args.rondes, args.repetitions)
+    naif, duree_naif = mesurer(departages_naifs, joueur_ids, matchs, args.rondes, 1)
+    assert moteur == naif, "the two methods disagree"
+
+    print(f"{args.joueurs} joueurs x {args.rondes} rondes, {len(matchs)} matchs")
+    print(f"{'methode':<22} {'ms':>10}")
+    print(f"{'matrice (departages)':<22} {1000 * duree_moteur:>10.1f}")
+    print(f"{'boucles imbriquees':<22} {1000 * duree_naif:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark: request throughput under concurrent writers, per engine profile.
+
+For each DB_PROFILE (defaut, production) a fresh process seeds a throwaway
+database, then forks worker processes, like gunicorn workers, for --duree
+seconds. Each of the --ecrivains writers plays its own tournament through
+the routes (generer_ronde then sauver_resultats, over and over) on a shared
+pool of players, so they contend for the same Joueur rows. The --lecteurs
+readers fetch the standings and pairings API in a loop. Reports successful
+requests per second and failed requests (e.g. "database is locked").
+
+    python benchmarks/bench_profils.py [--ecrivains 4] [--lecteurs 4] [--duree 10] [--url postgresql://...]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import commun
+
+PROFILS = ('defaut', 'production')
+
+
+def ecrivain(module, tournoi_id, debut, fin, resultats):
+    logging.disable(logging.CRITICAL) # Failed requests are counted, not logged
+    client = commun.client_admin(module)
+    time.sleep(max(0.0, debut - time.perf_counter()))
+    ok = echecs = 0
+    ronde = 0
+    resultats_en_attente = False
+    while time.perf_counter() < fin:
+        if not resultats_en_attente:
+            reponse = client.post(f'/tournoi/{tournoi_id}/generer_ronde', data=commun.formulaire_ronde(module, tournoi_id))
+            if reponse.status_code != 302:
+                echecs += 1
+                continue
+            ok += 1
+            ronde += 1
+            resultats_en_attente = True
+        donnees = commun.formulaire_resultats(module, tournoi_id, ronde)
+        reponse = client.post(f'/tournoi/{tournoi_id}/resultats', data=donnees)
+        if reponse.status_code == 302:
+            ok += 1
+            resultats_en_attente = False
+        else:
+            echecs += 1
+    resultats.put(('ecrivain', ok, echecs))
+
+
+def lecteur(module, tournoi_ids, debut, fin, resultats):
+    logging.disable(logging.CRITICAL)
+    client = module.app.test_client()
+    time.sleep(max(0.0, debut - time.perf_counter()))
+    ok = echecs = 0
+    while time.perf_counter() < fin:
+        for tournoi_id in tournoi_ids:
+            for ressource in ('classement', 'rondes'):
+                if client.get(f'/api/tournoi/{tournoi_id}/{ressource}').status_code == 200:
+                    ok += 1
+                else:
+                    echecs += 1
+    resultats.put(('lecteur', ok, echecs))
+
+
+def mesurer(args):
+    """Runs in a child process: DB_PROFILE is read when the application is built."""
+    # No job here: without an executor process per forked worker, workers exit when done
+    os.environ['TACHES_MODE'] = 'externe'
+    module = commun.charger_app(args.url)
+    joueur_ids = commun.peupler(module, args.joueurs)
+    tournois = [commun.creer_tournoi(module, joueur_ids, 10000, nom=f'Ecrivain {n}')
+                for n in range(args.ecrivains)]
+    # Forked children drop the inherited connections themselves (app._apres_fork)
+    contexte = multiprocessing.get_context('fork')
+    resultats = contexte.Queue()
+    debut = time.perf_counter() + 2 # Every worker starts measuring at the same time
+    fin = debut + args.duree
+    processus = [contexte.Process(target=ecrivain, args=(module, t, debut, fin, resultats)) for t in tournois]
+    processus += [contexte.Process(target=lecteur, args=(module, tournois, debut, fin, resultats))
+                  for _ in range(args.lecteurs)]
+    for p in processus:
+        p.start()
+    mesures = [resultats.get() for _ in processus]
+    for p in processus:
+        p.join()
+    total = {'ecrivain': [0, 0], 'lecteur': [0, 0]}
+    for role, ok, echecs in mesures:
+        total[role][0] += ok
+        total[role][1] += echecs
+    print(json.dumps({role: {'ok': ok, 'echecs': echecs, 'debit': ok / args.duree}
+                      for role, (ok, echecs) in total.items()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ecrivains', type=int, default=4)
+    parser.add_argument('--lecteurs', type=int, default=4)
+    parser.add_argument('--joueurs', type=int, default=40, help='shared by every tournament')
+    parser.add_argument('--duree', type=float, default=10.0)
+    parser.add_argument('--url', default=None, help='database URL (default: a throwaway SQLite file)')
+    parser.add_argument('--mesurer', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer:
+        mesurer(args)
+        return
+
+    print(f"{'profil':<12} {'role':<9} {'requetes/s':>10} {'reussies':>9} {'echecs':>7}")
+    for profil in PROFILS:
+        sortie = subprocess.run([sys.executable, os.path.abspath(__file__), '--mesurer'] + sys.argv[1:],
+                                env=dict(os.environ, DB_PROFILE=profil),
+                                capture_output=True, text=True, check=True).stdout
+        for role, mesure in json.loads(sortie.strip().splitlines()[-1]).items():
+            print(f"{profil:<12} {role:<9} {mesure['debit']:>10.1f} {mesure['ok']:>9} {mesure['echecs']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: full ELO replay (recalculer_elo) on a synthetic club history.
+
+Bulk-seeds N games spread over tournaments of 50 players, then times a
+dry run and a real run. Stored gains are left at zero, so the real run
+is the worst case: every match and every history row gets rewritten.
+
+    python benchmarks/bench_recalcul_elo.py [--matchs 1000000] [--joueurs 5000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import commun
+
+JOUEURS_PAR_TOURNOI = 50
+RONDES = 10
+
+
+def peupler_historique(module, joueur_ids, nb_matchs, graine=7):
+    rng = random.Random(graine)
+    echiquiers = JOUEURS_PAR_TOURNOI // 2
+    nb_tournois = max(1, nb_matchs // (echiquiers * RONDES))
+    debut = datetime(2015, 1, 1)
+    with module.app.app_context():
+        session = module.db.session
+        session.execute(module.insert(module.Tournoi), [
+            {'nom': f'Archive {t}', 'nombre_rondes': RONDES, 'ronde_actuelle': RONDES, 'termine': True,
+             'date_creation': debut + timedelta(days=t)} for t in range(nb_tournois)])
+        tournoi_ids = [t for (t,) in session.execute(module.select(module.Tournoi.id).order_by(module.Tournoi.id))]
+        lot = []
+        for t_id in tournoi_ids:
+            participants = rng.sample(joueur_ids, JOUEURS_PAR_TOURNOI)
+            for ronde in range(1, RONDES + 1):
+                rng.shuffle(participants)
+                for k in range(echiquiers):
+                    lot.append({'tournoi_id': t_id, 'ronde': ronde, 'joueur1_id': participants[2 * k],
+                                'joueur2_id': participants[2 * k + 1], 'resultat': rng.choice((0.0, 0.5, 1.0)),
+                                'elo_gain_j1': 0, 'elo_gain_j2': 0})
+            if len(lot) >= 50000:
+                session.execute(module.insert(module.Match), lot)
+                lot.clear()
+        if lot:
+            session.execute(module.insert(module.Match), lot)
+        session.commit()
+        return nb_tournois * echiquiers * RONDES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--matchs', type=int, default=1000000)
+    parser.add_argument('--joueurs', type=int, default=5000)
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    nb = peupler_historique(module, joueur_ids, args.matchs)
+
+    with module.app.app_context():
+        for dry_run in (True, False):
+            debut = time.perf_counter()
+            rapport = module.recalculer_elo(dry_run=dry_run)
+            duree = time.perf_counter() - debut
+            print(f"{nb} matchs, {'dry-run' if dry_run else 'ecriture'}: {duree:.1f}s, "
+                  f"{rapport['matchs_modifies']} matchs modifies, {len(rapport['joueurs_modifies'])} joueurs modifies")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Benchmark: latency of sauver_resultats on one large round.
+
+Seeds a throwaway database, generates round 1 for N players and times the
+POST that saves every board's result and updates the ratings.
+
+    python benchmarks/bench_resultats.py [--joueurs 1000] [--repetitions 3]
+"""
+import argparse
+import statistics
+import time
+
+import commun
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=int, default=1000)
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    client = commun.client_admin(module)
+
+    mesures, requetes = [], []
+    for n in range(args.repetitions):
+        tournoi_id = commun.creer_tournoi(module, joueur_ids, 1, nom=f'Bench {n}')
+        assert client.post(f'/tournoi/{tournoi_id}/generer_ronde', data=commun.formulaire_ronde(module, tournoi_id)).status_code == 302
+        donnees = commun.formulaire_resultats(module, tournoi_id, 1)
+        with commun.compter_requetes(module) as compteur:
+            debut = time.perf_counter()
+            assert client.post(f'/tournoi/{tournoi_id}/resultats', data=donnees).status_code == 302
+            mesures.append(time.perf_counter() - debut)
+        requetes.append(compteur[0])
+
+    print(f"{args.joueurs} joueurs, {args.joueurs // 2} echiquiers: "
+          f"median {statistics.median(mesures) * 1000:.0f} ms, "
+          f"min {min(mesures) * 1000:.0f} ms, {max(requetes)} requetes SQL")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""SQL statement budget per route.
+
+Seeds a throwaway database, plays a full tournament, then renders each
+read route and counts the SQL statements it issues. Exits with status 1
+if any route goes over its budget, so it can gate a CI job.
+
+    python benchmarks/budget_requetes.py [--joueurs 200] [--rondes 9]
+"""
+import argparse
+import sys
+
+import commun
+
+# Maximum statements per request, independent of player and round counts
+BUDGETS = {
+    '/': 5,
+    '/tournoi/{id}': 7,
+    '/tournoi/{id}/export_pdf': 7,
+    '/profil': 4,
+    '/joueurs': 2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=int, default=200)
+    parser.add_argument('--rondes', type=int, default=9)
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    tournoi_id = commun.creer_tournoi(module, joueur_ids, args.rondes)
+    client = commun.client_admin(module)
+    for ronde in range(1, args.rondes + 1):
+        commun.jouer_ronde(module, client, tournoi_id, ronde)
+
+    depassements = 0
+    print(f"{'route':<28} {'requetes':>8} {'budget':>7}")
+    for route, budget in BUDGETS.items():
+        url = route.format(id=tournoi_id)
+        with commun.compter_requetes(module) as compteur:
+            statut = client.get(url).status_code
+        assert statut in (200, 302), f'{url} -> {statut}' # export_pdf queues the rendering job
+        marque = '' if compteur[0] <= budget else '  <-- OVER BUDGET'
+        depassements += bool(marque)
+        print(f"{route:<28} {compteur[0]:>8} {budget:>7}{marque}")
+    sys.exit(1 if depassements else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Load test for the per-tournament SSE stream.
+
+Serves the app, then connects clients to /api/tournoi/<id>/flux in steps
+(up to --clients). At each step it measures the server CPU while the
+streams sit idle (heartbeats included), the latency of an ordinary API
+request, and the time for one tournament update to reach every client.
+
+--serveur werkzeug uses a threaded WSGI server in this process.
+--serveur gunicorn starts gunicorn with gunicorn.conf.py on the same
+database: gthread workers by default, or sync ones with --classe sync to
+see the streams starve the workers. Streams refused past SSE_MAX_FLUX
+(503, the page then polls) are counted apart.
+
+    python benchmarks/charge_sse.py [--clients 1000] [--paliers 4] [--duree 10]
+    python benchmarks/charge_sse.py --serveur gunicorn [--workers 2] [--threads 64] [--classe gthread]
+"""
+import argparse
+import logging
+import os
+import resource
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+import commun
+
+
+class Clients:
+    """Raw SSE clients multiplexed on one selector; counts the events each one received."""
+
+    def __init__(self, port, chemin):
+        self.port = port
+        self.requete = f"GET {chemin} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n".encode()
+        self.selecteur = selectors.DefaultSelector()
+        self.recus = {} # socket -> number of data events received
+        self.refuses = set() # Sockets answered with a 503 (the page would poll)
+        self.entetes = {} # socket -> bytes received until the status line is complete
+
+    def connecter(self, nombre):
+        for _ in range(nombre):
+            s = socket.create_connection(('127.0.0.1', self.port))
+            s.sendall(self.requete)
+            s.setblocking(False)
+            self.recus[s] = 0
+            self.entetes[s] = b''
+            self.selecteur.register(s, selectors.EVENT_READ)
+
+    def lire(self, delai):
+        for cle, _ in self.selecteur.select(delai):
+            try:
+                donnees = cle.fileobj.recv(65536)
+            except BlockingIOError:
+                continue
+            s = cle.fileobj
+            if s in self.entetes:
+                self.entetes[s] += donnees
+                if b'\r\n' in self.entetes[s]:
+                    if b' 503 ' in self.entetes.pop(s).split(b'\r\n', 1)[0]:
+                        self.refuses.add(s)
+                        self.selecteur.unregister(s)
+            self.recus[s] += donnees.count(b'\ndata: ')
+
+    def attendre(self, avant=None, limite=60):
+        """Reads until every client has received one more event than in `avant` (a copy of recus)."""
+        avant = avant or {}
+        fin = time.perf_counter() + limite
+        while True:
+            en_retard = sum(n <= avant.get(s, 0) for s, n in self.recus.items() if s not in self.refuses)
+            if not en_retard:
+                return
+            if time.perf_counter() > fin:
+                raise RuntimeError(f"timeout: {en_retard}/{len(self.recus)} clients without the event")
+            self.lire(0.05)
+
+    def fermer(self):
+        for s in self.recus:
+            s.close()
+
+
+def cpu_processus(pids):
+    """User + system CPU seconds of the given processes, from /proc (Linux)."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                champs = f.read().rsplit(')', 1)[1].split()
+        except FileNotFoundError:
+            continue
+        total += int(champs[11]) + int(champs[12])
+    return total / os.sysconf('SC_CLK_TCK')
+
+
+def processus_gunicorn(maitre):
+    with open(f'/proc/{maitre.pid}/task/{maitre.pid}/children') as f:
+        return [maitre.pid] + [int(pid) for pid in f.read().split()]
+
+
+def latence_requete(port, chemin, delai=10.0):
+    """Milliseconds for one ordinary GET while the streams are open; None on timeout."""
+    debut = time.perf_counter()
+    try:
+        urllib.request.urlopen(f'http://127.0.0.1:{port}{chemin}', timeout=delai).read()
+    except (TimeoutError, urllib.error.URLError, socket.timeout):
+        return None
+    return 1000 * (time.perf_counter() - debut)
+
+
+def lancer_gunicorn(args, url):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=url, TACHES_MODE='externe', SSE_HEARTBEAT=str(args.heartbeat),
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads if args.classe == 'gthread' else 1))
+    if args.classe == 'sync':
+        env['SSE_MAX_FLUX'] = str(args.clients) # No cap: show what the streams do to sync workers
+    maitre = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-k', args.classe,
+                               '--bind', f'127.0.0.1:{port}', '--backlog', '2048', '--log-level', 'warning'],
+                              cwd=commun.RACINE, env=env)
+    fin = time.perf_counter() + 30
+    while latence_requete(port, '/login', 1.0) is None:
+        if time.perf_counter() > fin or maitre.poll() is not None:
+            maitre.kill()
+            raise RuntimeError("gunicorn did not start")
+        time.sleep(0.2)
+    return maitre, port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--paliers', type=int, default=4)
+    parser.add_argument('--duree', type=float, default=10.0, help='idle measurement window per step, in seconds')
+    parser.add_argument('--heartbeat', type=int, default=5)
+    parser.add_argument('--serveur', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=64, help='gunicorn threads per worker')
+    parser.add_argument('--classe', choices=['gthread', 'sync'], default='gthread', help='gunicorn worker class')
+    args = parser.parse_args()
+
+    # Two sockets per client in this process (client and server side)
+    souple, dure = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(dure, max(souple, 2 * args.clients + 256)), dure))
+
+    module = commun.charger_app()
+    module.app.config['SSE_HEARTBEAT'] = args.heartbeat
+    joueur_ids = commun.peupler(module, 20)
+    tournoi_id = commun.creer_tournoi(module, joueur_ids, 5)
+
+    if args.serveur == 'gunicorn':
+        maitre, port = lancer_gunicorn(args, os.environ['DATABASE_URL'])
+        pids = lambda: processus_gunicorn(maitre)
+    else:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING) # No access log line per client
+        serveur = make_server('127.0.0.1', 0, module.app, threaded=True)
+        serveur.request_queue_size = 1024
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        port = serveur.server_port
+        pids = lambda: [os.getpid()]
+    clients = Clients(port, f'/api/tournoi/{tournoi_id}/flux')
+
+    print(f"{'clients':>8} {'refusés':>8} {'CPU repos %':>12} {'requête ms':>11} {'diffusion ms':>13}")
+    for palier in range(1, args.paliers + 1):
+        cible = args.clients * palier // args.paliers
+        clients.connecter(cible - len(clients.recus))
+        try:
+            clients.attendre(limite=15) # Initial 'etat' event
+        except RuntimeError as e:
+            print(f"{cible:>8} {'':>8} streams stalled ({e})")
+            break
+
+        # Idle: only heartbeats flow
+        cpu, debut = cpu_processus(pids()), time.perf_counter()
+        while time.perf_counter() - debut < args.duree:
+            clients.lire(0.5)
+        cpu_repos = 100 * (cpu_processus(pids()) - cpu) / (time.perf_counter() - debut)
+        latence = latence_requete(port, f'/api/tournoi/{tournoi_id}/classement')
+
+        # One update, committed like a route would, fanned out to every client
+        avant = dict(clients.recus)
+        debut = time.perf_counter()
+        with module.app.app_context():
+            module.toucher_tournoi(module.db.session.get(module.Tournoi, tournoi_id))
+            module.db.session.commit()
+        clients.attendre(avant)
+        diffusion_ms = 1000 * (time.perf_counter() - debut)
+        texte_latence = f"{latence:.1f}" if latence is not None else 'timeout'
+        print(f"{cible:>8} {len(clients.refuses):>8} {cpu_repos:>12.1f} {texte_latence:>11} {diffusion_ms:>13.1f}")
+
+    clients.fermer()
+    if args.serveur == 'gunicorn':
+        maitre.terminate()
+        maitre.wait()
+    else:
+        serveur.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: web latency while heavy PDF exports run.
+
+Seeds a throwaway database with a large finished tournament (the PDF to
+render) and a small one (the page to serve), then requests the small
+tournament's page in a loop for --duree seconds, in three situations:
+
+- repos: nothing else running;
+- requete: PDFs rendered in a thread of the web process, as export_pdf did
+  before the job executor (a gthread worker serving other requests meanwhile);
+- taches: the same PDFs queued as jobs, rendered by the executor process.
+
+Reports the page's latency percentiles and the number of PDFs rendered.
+
+    python benchmarks/charge_taches.py [--joueurs 1000] [--rondes 7] [--duree 10]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import commun
+
+
+def latences(client, url, fin):
+    durees = []
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        assert client.get(url).status_code == 200
+        durees.append(time.perf_counter() - debut)
+    return durees
+
+
+def rendre_en_boucle(module, tournoi_id, arret, rendus):
+    with module.app.app_context():
+        tournoi = module.db.session.get(module.Tournoi, tournoi_id)
+        while not arret.is_set():
+            module.generer_pdf_classement(tournoi)
+            rendus[0] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=int, default=1000, help='players of the tournament to render')
+    parser.add_argument('--rondes', type=int, default=7)
+    parser.add_argument('--duree', type=float, default=10.0, help='seconds per situation')
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    client = commun.client_admin(module)
+    gros = commun.creer_tournoi(module, joueur_ids, args.rondes, nom='Gros')
+    petit = commun.creer_tournoi(module, joueur_ids[:16], 3, nom='Petit')
+    for ronde in range(1, args.rondes + 1):
+        commun.jouer_ronde(module, client, gros, ronde)
+    commun.jouer_ronde(module, client, petit, 1)
+    url = f'/tournoi/{petit}'
+    latences(client, url, time.perf_counter() + 1) # Warm-up, also starts the job executor
+
+    resultats = {'repos': (latences(client, url, time.perf_counter() + args.duree), 0)}
+
+    arret, rendus = threading.Event(), [0]
+    fil = threading.Thread(target=rendre_en_boucle, args=(module, gros, arret, rendus))
+    fil.start()
+    resultats['requete'] = (latences(client, url, time.perf_counter() + args.duree), None)
+    arret.set()
+    fil.join()
+    resultats['requete'] = (resultats['requete'][0], rendus[0])
+
+    with module.app.app_context():
+        # No key: every job renders, as many as the executor can do in the time
+        ids = [module.soumettre_tache('export_pdf', {'tournoi_id': gros}).id for _ in range(100)]
+    durees = latences(client, url, time.perf_counter() + args.duree)
+    with module.app.app_context():
+        faits = module.Tache.query.filter(module.Tache.id.in_(ids), module.Tache.statut == 'terminee').count()
+        module.db.session.execute(module.delete(module.Tache).where(module.Tache.statut == 'en_attente'))
+        module.db.session.commit()
+    resultats['taches'] = (durees, faits)
+
+    print(f"page {url} pendant des exports PDF de {args.joueurs} joueurs x {args.rondes} rondes")
+    print(f"{'situation':<10} {'requetes':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'PDF':>5}")
+    for situation, (durees, pdf) in resultats.items():
+        durees = sorted(1000 * d for d in durees)
+        p95 = durees[int(0.95 * (len(durees) - 1))]
+        print(f"{situation:<10} {len(durees):>8} {statistics.median(durees):>8.1f} {p95:>8.1f} "
+              f"{durees[-1]:>8.1f} {pdf:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Shared helpers for the benchmark scripts: throwaway database, seeding, SQL counting."""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOT_DE_PASSE = 'bench'
+
+
+def charger_app(url=None):
+    """Imports app.py against a throwaway SQLite database (or the given URL)."""
+    dossier = tempfile.mkdtemp(prefix='tpchess-bench-')
+    if url is None:
+        url = 'sqlite:///' + os.path.join(dossier, 'bench.db')
+    os.environ['DATABASE_URL'] = url
+    # Archived PDFs and job files are named by id, like the database's rows (the job executor reads these too)
+    os.environ['PDF_DOSSIER'] = os.path.join(dossier, 'pdf')
+    os.environ['TACHES_DOSSIER'] = os.path.join(dossier, 'taches')
+    sys.path.insert(0, RACINE)
+    import app as module
+    module.app = module.create_app() # One application per benchmark process, used through module.app
+    with module.app.app_context():
+        module.db.drop_all()
+        module.db.create_all()
+    return module
+
+
+def peupler(module, nb_joueurs, graine=42):
+    """Creates an admin plus nb_joueurs players with random ratings; returns their ids."""
+    rng = random.Random(graine)
+    Joueur = module.Joueur
+    with module.app.app_context():
+        admin = Joueur(username='admin', prenom='Admin', nom='Bench', elo=1500, is_admin=True)
+        admin.set_password(MOT_DE_PASSE)
+        hash_commun = admin.password_hash # Hashing once keeps seeding fast
+        joueurs = [Joueur(username=f'joueur{i}', prenom=f'Prenom{i}', nom=f'Nom{i}',
+                          elo=rng.randint(1000, 2400), password_hash=hash_commun)
+                   for i in range(nb_joueurs)]
+        module.db.session.add(admin)
+        module.db.session.add_all(joueurs)
+        module.db.session.commit()
+        return [j.id for j in joueurs]
+
+
+def creer_tournoi(module, joueur_ids, nb_rondes, nom='Bench'):
+    with module.app.app_context():
+        tournoi = module.Tournoi(nom=nom, nombre_rondes=nb_rondes)
+        module.db.session.add(tournoi)
+        module.db.session.flush()
+        module.db.session.execute(module.tournoi_joueurs.insert(),
+                                  [{'tournoi_id': tournoi.id, 'joueur_id': j} for j in joueur_ids])
+        module.db.session.commit()
+        return tournoi.id
+
+
+def client_admin(module):
+    client = module.app.test_client()
+    reponse = client.post('/login', data={'username': 'admin', 'password': MOT_DE_PASSE})
+    assert reponse.status_code == 302, 'admin login failed'
+    return client
+
+
+def formulaire_ronde(module, tournoi_id):
+    """The hidden fields of the tournament page's forms: a fresh token and the current version."""
+    with module.app.app_context():
+        return {'jeton': uuid.uuid4().hex, 'version': module.db.session.get(module.Tournoi, tournoi_id).version}
+
+
+def formulaire_resultats(module, tournoi_id, ronde, graine=0):
+    """Random results for every unplayed board of a round, as sauver_resultats expects them."""
+    rng = random.Random(graine * 1000 + ronde)
+    with module.app.app_context():
+        matchs = module.Match.query.filter_by(tournoi_id=tournoi_id, ronde=ronde).all()
+        donnees = {f'resultat_{m.id}': rng.choice(['0.0', '0.5', '1.0'])
+                   for m in matchs if m.joueur2_id and m.resultat is None}
+    donnees.update(formulaire_ronde(module, tournoi_id))
+    return donnees
+
+
+def jouer_ronde(module, client, tournoi_id, ronde):
+    assert client.post(f'/tournoi/{tournoi_id}/generer_ronde', data=formulaire_ronde(module, tournoi_id)).status_code == 302
+    donnees = formulaire_resultats(module, tournoi_id, ronde)
+    assert client.post(f'/tournoi/{tournoi_id}/resultats', data=donnees).status_code == 302
+
+
+def attendre_tache(client, reponse, delai=300):
+    """Follows a redirect to a job's status page until the job ends; returns the final response.
+
+    Responses that are not such a redirect (e.g. a PDF served from the cache)
+    are returned as they are.
+    """
+    if reponse.status_code != 302 or '/taches/' not in reponse.location:
+        return reponse
+    tache_id = reponse.location.rstrip('/').rsplit('/', 1)[-1]
+    fin = time.perf_counter() + delai
+    while time.perf_counter() < fin:
+        etat = client.get(f'/api/taches/{tache_id}').get_json()
+        if etat['statut'] == 'echouee':
+            raise RuntimeError(f"job {tache_id} failed: {etat['erreur']}")
+        if etat['statut'] == 'terminee':
+            return client.get(etat['resultat']) if etat['resultat'] else client.get(f'/taches/{tache_id}')
+        time.sleep(0.02)
+    raise TimeoutError(f"job {tache_id} still running after {delai} s")
+
+
+@contextmanager
+def compter_requetes(module):
+    """Counts SQL statements sent to the engine inside the block: `with compter_requetes(m) as n: ...; n[0]`.
+
+    Only the statements of the calling thread (the test client's request) are
+    counted, not those of a job or event-stream thread running meanwhile.
+    """
+    from sqlalchemy import event
+    with module.app.app_context():
+        moteur = module.db.engine
+    compteur = [0]
+    fil = threading.get_ident()
+
+    def avant_execution(*args, **kwargs):
+        if threading.get_ident() == fil:
+            compteur[0] += 1
+
+    event.listen(moteur, 'before_cursor_execute', avant_execution)
+    try:
+        yield compteur
+    finally:
+        event.remove(moteur, 'before_cursor_execute', avant_execution)
@@ -0,0 +1,197 @@
+"""Benchmark suite: the whole tournament lifecycle through the routes, at several sizes.
+
+For each player count, a fresh process seeds a throwaway SQLite database
+(or the database given by --url; its tables are dropped) and times, through
+the Flask test client:
+
+- register and login (a few accounts, password hashing included);
+- one full tournament per round count: generer_ronde and sauver_resultats
+  for every round, the tournament page after each round, then export_pdf
+  (first call queues the rendering job and waits for the file, the next
+  ones hit the cache);
+- the profile page of a player and the home page.
+
+Each operation reports its count, median / p95 / min / max latency in ms and
+its median number of SQL statements. The results go to a JSON file, which
+--comparer checks against an earlier run: operations whose median got slower
+by more than --tolerance (and --ecart-min ms) are flagged, and the script
+exits with status 1.
+
+    python benchmarks/cycle_tournoi.py [--joueurs 50,500,5000] [--rondes 5,9,13] [--sortie cycle.json]
+    python benchmarks/cycle_tournoi.py --joueurs 50,500 --comparer cycle.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import commun
+
+OPERATIONS = ('register', 'login', 'generer_ronde', 'sauver_resultats', 'gerer_tournoi',
+              'export_pdf', 'export_pdf_cache', 'profil', 'index')
+
+
+def liste_entiers(valeur):
+    return [int(v) for v in valeur.split(',') if v]
+
+
+def chronometrer(module, mesures, operation, appel):
+    """Times one request; keeps (seconds, SQL statements) under the operation's name."""
+    with commun.compter_requetes(module) as compteur:
+        debut = time.perf_counter()
+        reponse = appel()
+        duree = time.perf_counter() - debut
+    assert reponse.status_code in (200, 302), f"{operation}: HTTP {reponse.status_code}"
+    mesures.setdefault(operation, []).append((duree, compteur[0]))
+    return reponse
+
+
+def statistiques(echantillons):
+    durees = sorted(1000 * d for d, _ in echantillons)
+    return {
+        'n': len(durees),
+        'median_ms': statistics.median(durees),
+        'p95_ms': durees[min(len(durees) - 1, round(0.95 * (len(durees) - 1)))],
+        'min_ms': durees[0],
+        'max_ms': durees[-1],
+        'sql': statistics.median(n for _, n in echantillons),
+    }
+
+
+def jouer_tournoi(module, client, joueur_ids, nb_rondes, mesures):
+    tournoi_id = commun.creer_tournoi(module, joueur_ids, nb_rondes, nom=f'Cycle {len(joueur_ids)}x{nb_rondes}')
+    for ronde in range(1, nb_rondes + 1):
+        donnees = commun.formulaire_ronde(module, tournoi_id)
+        chronometrer(module, mesures, 'generer_ronde', lambda: client.post(f'/tournoi/{tournoi_id}/generer_ronde', data=donnees))
+        donnees = commun.formulaire_resultats(module, tournoi_id, ronde)
+        chronometrer(module, mesures, 'sauver_resultats',
+                     lambda: client.post(f'/tournoi/{tournoi_id}/resultats', data=donnees))
+        chronometrer(module, mesures, 'gerer_tournoi', lambda: client.get(f'/tournoi/{tournoi_id}'))
+    chronometrer(module, mesures, 'export_pdf', # Queued job: until the file is downloaded
+                 lambda: commun.attendre_tache(client, client.get(f'/tournoi/{tournoi_id}/export_pdf')))
+    for _ in range(3):
+        chronometrer(module, mesures, 'export_pdf_cache', lambda: client.get(f'/tournoi/{tournoi_id}/export_pdf'))
+
+
+def mesurer(args):
+    """Runs in a child process, for one player count; prints its result as a JSON line."""
+    nb_joueurs = args.joueurs[0]
+    module = commun.charger_app(args.url)
+    joueur_ids = commun.peupler(module, nb_joueurs)
+    mesures = {}
+
+    anonyme = module.app.test_client()
+    for n in range(args.inscriptions):
+        chronometrer(module, mesures, 'register', lambda: anonyme.post('/register', data={
+            'username': f'nouveau{n}', 'prenom': 'Nouveau', 'nom': f'Joueur{n}', 'password': 'motdepasse'}))
+        client = module.app.test_client()
+        chronometrer(module, mesures, 'login', lambda: client.post('/login', data={
+            'username': f'nouveau{n}', 'password': 'motdepasse'}))
+
+    admin = commun.client_admin(module)
+    for nb_rondes in args.rondes:
+        jouer_tournoi(module, admin, joueur_ids, nb_rondes, mesures)
+
+    joueur = module.app.test_client()
+    assert joueur.post('/login', data={'username': 'joueur0', 'password': commun.MOT_DE_PASSE}).status_code == 302
+    for _ in range(args.repetitions):
+        chronometrer(module, mesures, 'profil', lambda: joueur.get('/profil'))
+        chronometrer(module, mesures, 'index', lambda: anonyme.get('/'))
+
+    print(json.dumps({'joueurs': nb_joueurs, 'rondes': args.rondes,
+                      'operations': {op: statistiques(mesures[op]) for op in OPERATIONS if op in mesures}}))
+
+
+def version_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=commun.RACINE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparer(ancien, nouveau, tolerance, ecart_min_ms):
+    """Prints the median ratio per operation and size; returns the regressions."""
+    avant = {(r['joueurs'], op): s for r in ancien['resultats'] for op, s in r['operations'].items()}
+    regressions = []
+    print(f"\ncompared with {ancien['meta'].get('commit')} ({ancien['meta'].get('date')})")
+    print(f"{'joueurs':>7} {'operation':<18} {'avant':>9} {'apres':>9} {'ratio':>6}")
+    for resultat in nouveau['resultats']:
+        for op, s in resultat['operations'].items():
+            reference = avant.get((resultat['joueurs'], op))
+            if reference is None:
+                continue
+            ratio = s['median_ms'] / reference['median_ms'] if reference['median_ms'] else 1.0
+            ecart = s['median_ms'] - reference['median_ms']
+            drapeau = ' <-' if ratio > 1 + tolerance and ecart > ecart_min_ms else ''
+            print(f"{resultat['joueurs']:>7} {op:<18} {reference['median_ms']:>9.1f} {s['median_ms']:>9.1f} "
+                  f"{ratio:>6.2f}{drapeau}")
+            if drapeau:
+                regressions.append((resultat['joueurs'], op, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--joueurs', type=liste_entiers, default=[50, 500, 5000], help='comma-separated')
+    parser.add_argument('--rondes', type=liste_entiers, default=[5, 9, 13], help='comma-separated')
+    parser.add_argument('--inscriptions', type=int, default=3, help='accounts created by register/login')
+    parser.add_argument('--repetitions', type=int, default=5, help='profil and index requests')
+    parser.add_argument('--url', default=None, help='database URL, e.g. a local PostgreSQL (its tables are dropped)')
+    parser.add_argument('--sortie', default='cycle_tournoi.json', help='JSON results file')
+    parser.add_argument('--comparer', default=None, help='earlier JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown of a median, 0.2 = 20%%')
+    parser.add_argument('--ecart-min', type=float, default=2.0,
+                        help='ignore slowdowns smaller than this many ms (timer noise on fast routes)')
+    parser.add_argument('--mesurer', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer:
+        mesurer(args)
+        return
+
+    resultats = []
+    for nb_joueurs in args.joueurs:
+        commande = [sys.executable, os.path.abspath(__file__), '--mesurer', '--joueurs', str(nb_joueurs),
+                    '--rondes', ','.join(map(str, args.rondes)), '--inscriptions', str(args.inscriptions),
+                    '--repetitions', str(args.repetitions)]
+        if args.url:
+            commande += ['--url', args.url]
+        sortie = subprocess.run(commande, capture_output=True, text=True, check=True).stdout
+        resultat = json.loads(sortie.strip().splitlines()[-1])
+        resultats.append(resultat)
+        print(f"\n{nb_joueurs} joueurs, rondes {','.join(map(str, args.rondes))}")
+        print(f"{'operation':<18} {'n':>4} {'median':>9} {'p95':>9} {'max':>9} {'sql':>5}")
+        for op, s in resultat['operations'].items():
+            print(f"{op:<18} {s['n']:>4} {s['median_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['max_ms']:>9.1f} {s['sql']:>5.0f}")
+
+    rapport = {
+        'meta': {
+            'commit': version_git(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'base': (args.url or 'sqlite').split(':', 1)[0],
+            'rondes': args.rondes,
+        },
+        'resultats': resultats,
+    }
+    with open(args.sortie, 'w') as fichier:
+        json.dump(rapport, fichier, indent=2)
+    print(f"\nresults written to {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer) as fichier:
+            regressions = comparer(json.load(fichier), rapport, args.tolerance, args.ecart_min)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
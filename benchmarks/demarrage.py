@@ -0,0 +1,181 @@
+"""Benchmark: application boot time and memory per worker.
+
+Measures, for a source tree (this one by default):
+
+- import: time to import app.py, then to build the application (create_app(),
+  or the module-level app of trees that predate the factory), in --essais
+  fresh interpreters; reports the medians and the peak RSS of one process;
+- workers: a master process forks --workers workers, like gunicorn. With
+  --preload semantics the master imports app.py and builds the application
+  before forking; without, each worker does both itself. Every worker then serves a few requests (home,
+  login page) and, once all are up, reads its Rss, Pss and private memory
+  from /proc/self/smaps_rollup. Pss splits shared pages between the processes
+  sharing them, so the sum over master and workers is the real footprint.
+
+--comparer runs the same measures on another tree, e.g. the previous commit:
+
+    git worktree add /tmp/avant HEAD~1
+    python benchmarks/demarrage.py --comparer /tmp/avant [--workers 4] [--essais 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def construire(module):
+    fabrique = getattr(module, 'create_app', None)
+    return fabrique() if fabrique else module.app
+
+
+def memoire():
+    """Rss, Pss and private (Private_Clean + Private_Dirty) memory of this process, in kB."""
+    valeurs = {}
+    with open('/proc/self/smaps_rollup') as fichier:
+        for ligne in fichier:
+            champs = ligne.split()
+            if len(champs) == 3 and champs[2] == 'kB':
+                valeurs[champs[0].rstrip(':')] = int(champs[1])
+    return {'rss': valeurs['Rss'], 'pss': valeurs['Pss'],
+            'prive': valeurs['Private_Clean'] + valeurs['Private_Dirty']}
+
+
+def mesurer_import():
+    """In a fresh interpreter: prints the import and build times as a JSON line."""
+    import resource
+    debut = time.perf_counter()
+    import app as module
+    importe = time.perf_counter()
+    application = construire(module)
+    construit = time.perf_counter()
+    with application.app_context():
+        module.db.create_all()
+    print(json.dumps({'import_s': importe - debut, 'create_s': construit - importe,
+                      'maxrss_ko': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      'fpdf': 'fpdf' in sys.modules}))
+
+
+def worker(application, pret, depart, resultat):
+    if application is None:
+        import app as module
+        application = construire(module)
+    client = application.test_client()
+    for _ in range(5):
+        assert client.get('/').status_code == 200
+        assert client.get('/login').status_code == 200
+    os.write(pret, b'.')
+    os.read(depart, 1) # Measured once every worker is up, while they share pages
+    os.write(resultat, json.dumps(memoire()).encode() + b'\n')
+
+
+def mesurer_workers(nb_workers, preload):
+    """Forks the workers; prints the master's and each worker's memory as a JSON line."""
+    application = None
+    if preload: # As gunicorn --preload 'app:create_app()': the master builds the app
+        import app as module
+        application = construire(module)
+    pret_r, pret_w = os.pipe()
+    depart_r, depart_w = os.pipe()
+    resultat_r, resultat_w = os.pipe()
+    pids = []
+    for _ in range(nb_workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                worker(application, pret_w, depart_r, resultat_w)
+            except BaseException:
+                code = 1
+            os._exit(code)
+        pids.append(pid)
+    for _ in range(nb_workers):
+        os.read(pret_r, 1)
+    maitre = memoire()
+    os.write(depart_w, b'.' * nb_workers)
+    with os.fdopen(resultat_r) as sortie:
+        os.close(resultat_w)
+        os.close(pret_w)
+        os.close(depart_r)
+        workers = [json.loads(ligne) for ligne in sortie]
+    for pid in pids:
+        os.waitpid(pid, 0)
+    assert len(workers) == nb_workers, 'a worker failed'
+    print(json.dumps({'maitre': maitre, 'workers': workers}))
+
+
+def lancer(arbre, dossier, *options):
+    """Runs this script in a fresh interpreter against `arbre`; returns its JSON line."""
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(dossier, 'demarrage.db'),
+               PDF_DOSSIER=os.path.join(dossier, 'pdf'), TACHES_DOSSIER=os.path.join(dossier, 'taches'),
+               TACHES_MODE='externe', # No job executor process: boot only
+               PYTHONPATH=arbre, PYTHONDONTWRITEBYTECODE='1')
+    commande = [sys.executable, os.path.abspath(__file__)] + list(options)
+    sortie = subprocess.run(commande, cwd=arbre, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(sortie.strip().splitlines()[-1])
+
+
+def mesurer_arbre(arbre, args):
+    dossier = tempfile.mkdtemp(prefix='tpchess-demarrage-') # The import runs create the tables the workers read
+    essais = [lancer(arbre, dossier, '--mesurer-import') for _ in range(args.essais)]
+    resultat = {
+        'import_ms': 1000 * statistics.median(e['import_s'] for e in essais),
+        'create_ms': 1000 * statistics.median(e['create_s'] for e in essais),
+        'maxrss_mo': statistics.median(e['maxrss_ko'] for e in essais) / 1024,
+        'fpdf': essais[0]['fpdf'],
+    }
+    for preload in (False, True):
+        options = ['--mesurer-workers', '--workers', str(args.workers)] + (['--preload'] if preload else [])
+        mesure = lancer(arbre, dossier, *options)
+        workers = mesure['workers']
+        resultat['preload' if preload else 'sans_preload'] = {
+            'rss_mo': statistics.median(w['rss'] for w in workers) / 1024,
+            'pss_mo': statistics.median(w['pss'] for w in workers) / 1024,
+            'prive_mo': statistics.median(w['prive'] for w in workers) / 1024,
+            'total_pss_mo': (mesure['maitre']['pss'] + sum(w['pss'] for w in workers)) / 1024,
+        }
+    return resultat
+
+
+def afficher(nom, r, workers):
+    print(f"\n{nom}")
+    print(f"  import app.py {r['import_ms']:.0f} ms, create_app {r['create_ms']:.0f} ms, "
+          f"peak RSS {r['maxrss_mo']:.1f} MB, fpdf loaded at boot: {'yes' if r['fpdf'] else 'no'}")
+    print(f"  {'workers':<14} {'RSS/worker':>11} {'PSS/worker':>11} {'private':>9} {f'total PSS ({workers}+1)':>17}")
+    for mode in ('sans_preload', 'preload'):
+        m = r[mode]
+        print(f"  {mode:<14} {m['rss_mo']:>8.1f} MB {m['pss_mo']:>8.1f} MB {m['prive_mo']:>6.1f} MB "
+              f"{m['total_pss_mo']:>14.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--arbre', default=RACINE, help='source tree to measure (default: this one)')
+    parser.add_argument('--comparer', default=None, help='another source tree, e.g. a worktree of HEAD~1')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--essais', type=int, default=5, help='fresh interpreters for the import time')
+    parser.add_argument('--mesurer-import', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mesurer-workers', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer_import:
+        mesurer_import()
+        return
+    if args.mesurer_workers:
+        mesurer_workers(args.workers, args.preload)
+        return
+
+    arbres = [('avant', args.comparer)] if args.comparer else []
+    arbres.append(('apres' if args.comparer else 'arbre', args.arbre))
+    for nom, arbre in arbres:
+        afficher(f"{nom}: {os.path.abspath(arbre)}", mesurer_arbre(os.path.abspath(arbre), args), args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Stress test: concurrent arbiters on the same tournament.
+
+Several threads, each logged in as an admin, drive one tournament at the
+same time through generer_ronde and sauver_resultats. A share of the forms
+is submitted twice with the same idempotency token, as a double click or a
+browser resubmission would. Once the tournament is over, checks that:
+
+- every round exists once and seats each player at most once;
+- the standings rows match a rebuild from the games;
+- each result was rated exactly once (one history row per player and game,
+  and a dry-run ELO replay finds nothing to change).
+
+Exits with status 1 if an invariant is broken.
+
+    python benchmarks/stress_concurrence.py [--arbitres 8] [--joueurs 30] [--rondes 7]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import commun
+
+
+def classer_flash(messages):
+    """Maps the flashed messages of one response to an outcome."""
+    for categorie, message in messages:
+        if categorie == 'success':
+            return 'appliquee'
+        if message.startswith("Le tournoi vient d'être modifié"):
+            return 'conflit'
+        if 'déjà' in message:
+            return 'doublon'
+    return 'refusee'
+
+
+def arbitre(module, tournoi_id, graine, doublons, barriere, issues, fin):
+    rng = random.Random(graine)
+    client = commun.client_admin(module)
+    barriere.wait()
+    while time.perf_counter() < fin:
+        with module.app.app_context():
+            tournoi = module.db.session.get(module.Tournoi, tournoi_id)
+            if tournoi.termine:
+                return
+            ronde, version = tournoi.ronde_actuelle, tournoi.version
+        # Like a page render: the form, its token and the version it was built from
+        donnees = commun.formulaire_resultats(module, tournoi_id, ronde, graine=rng.randrange(1000)) if ronde else {}
+        url = f'/tournoi/{tournoi_id}/resultats' if len(donnees) > 2 else f'/tournoi/{tournoi_id}/generer_ronde'
+        donnees.update(jeton=uuid.uuid4().hex, version=version)
+        for _ in range(2 if rng.random() < doublons else 1):
+            client.post(url, data=donnees)
+            with client.session_transaction() as session:
+                issues[classer_flash(session.pop('_flashes', []))] += 1
+
+
+def verifier(module, tournoi_id):
+    """Returns the list of broken invariants."""
+    erreurs = []
+    db, Match, EloHistory = module.db, module.Match, module.EloHistory
+    with module.app.app_context():
+        tournoi = db.session.get(module.Tournoi, tournoi_id)
+        if not tournoi.termine or tournoi.ronde_actuelle != tournoi.nombre_rondes:
+            erreurs.append(f"tournament not finished: round {tournoi.ronde_actuelle}/{tournoi.nombre_rondes}")
+        matchs = Match.query.filter_by(tournoi_id=tournoi_id).all()
+        nb_joueurs = len(tournoi.joueurs)
+        for ronde in range(1, tournoi.nombre_rondes + 1):
+            places = Counter()
+            for m in matchs:
+                if m.ronde == ronde:
+                    places.update(p for p in (m.joueur1_id, m.joueur2_id) if p)
+            if sorted(places.values()) != [1] * nb_joueurs:
+                erreurs.append(f"round {ronde}: {sum(places.values())} seats for {nb_joueurs} players")
+        if any(m.ronde > tournoi.nombre_rondes for m in matchs):
+            erreurs.append("games beyond the last round")
+
+        avant = {pid: (l.points, l.parties, l.couleurs, l.exempt) for pid, l in module.charger_classement(tournoi).items()}
+        reconstruit = {pid: (l.points, l.parties, l.couleurs, l.exempt)
+                       for pid, l in module.reconstruire_classement(tournoi_id).items()}
+        db.session.rollback()
+        if avant != reconstruit:
+            erreurs.append("standings rows differ from a rebuild")
+
+        for ronde in range(1, tournoi.nombre_rondes + 1):
+            jouees = sum(1 for m in matchs if m.ronde == ronde and m.joueur2_id and m.resultat is not None)
+            lignes = EloHistory.query.filter_by(tournoi_id=tournoi_id, ronde=ronde, note=f"Tournoi {tournoi.nom} R{ronde}").count()
+            if lignes != 2 * jouees:
+                erreurs.append(f"round {ronde}: {lignes} history rows for {jouees} games")
+        rapport = module.recalculer_elo(dry_run=True)
+        if rapport['matchs_modifies'] or rapport['joueurs_modifies']:
+            erreurs.append(f"ELO replay differs: {rapport['matchs_modifies']} game(s), "
+                           f"{len(rapport['joueurs_modifies'])} player(s)")
+    return erreurs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--arbitres', type=int, default=8)
+    parser.add_argument('--joueurs', type=int, default=30)
+    parser.add_argument('--rondes', type=int, default=7)
+    parser.add_argument('--doublons', type=float, default=0.3, help='share of forms submitted twice')
+    parser.add_argument('--limite', type=float, default=120.0, help='seconds')
+    args = parser.parse_args()
+
+    module = commun.charger_app()
+    joueur_ids = commun.peupler(module, args.joueurs)
+    with module.app.app_context(): # Starting ratings, for the ELO replay check
+        module.db.session.execute(module.insert(module.EloHistory), [
+            {'joueur_id': j.id, 'elo': j.elo, 'date': datetime(2000, 1, 1), 'note': module.NOTE_CREATION}
+            for j in module.Joueur.query])
+        module.db.session.commit()
+    tournoi_id = commun.creer_tournoi(module, joueur_ids, args.rondes)
+
+    issues = Counter()
+    barriere = threading.Barrier(args.arbitres)
+    fin = time.perf_counter() + args.limite
+    fils = [threading.Thread(target=arbitre, args=(module, tournoi_id, n, args.doublons, barriere, issues, fin))
+            for n in range(args.arbitres)]
+    debut = time.perf_counter()
+    for f in fils:
+        f.start()
+    for f in fils:
+        f.join()
+    duree = time.perf_counter() - debut
+
+    print(f"{args.arbitres} arbitres, {args.joueurs} joueurs, {args.rondes} rondes en {duree:.1f} s")
+    for issue in ('appliquee', 'doublon', 'conflit', 'refusee'):
+        print(f"  {issue:<10} {issues[issue]:>6}")
+    erreurs = verifier(module, tournoi_id)
+    for erreur in erreurs:
+        print(f"FAIL: {erreur}")
+    if erreurs:
+        sys.exit(1)
+    print("OK: every invariant holds")
+
+
+if __name__ == '__main__':
+    main()
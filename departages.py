@@ -0,0 +1,88 @@
+# Départages (Buchholz, Buchholz-1, Sonneborn-Berger, progressif, confrontation directe)
+"""Tiebreak engine for the tournament standings.
+
+The tournament's results are loaded once into a player x round matrix
+(opponent index and score per cell, flat arrays). Every tiebreak is then a
+pass over each player's row of that matrix, O(players x rounds) in total,
+instead of a scan of the match list per player and per tiebreak.
+
+Conventions: a bye scores its point but has no opponent, so it adds nothing
+to Buchholz or Sonneborn-Berger; unplayed rounds score nothing. Direct
+encounter is the score made against the players on the same number of points.
+"""
+from array import array
+
+NON_JOUE = -1.0  # Score cell of a round without a result
+
+# Applied in this order after the points, then ELO as a last resort
+ORDRE_DEPARTAGES = ('buchholz_cut1', 'buchholz', 'sonneborn_berger', 'progressif', 'confrontation')
+# Round-robins: everyone meets the same opponents, so Buchholz separates nobody
+ORDRE_DEPARTAGES_TOUTES_RONDES = ('confrontation', 'sonneborn_berger', 'progressif')
+
+
+def matrice_resultats(joueur_ids, matchs, nombre_rondes):
+    """Builds (index, adversaires, scores) from (ronde, blanc_id, noir_id, resultat) rows.
+
+    index maps player id -> row. adversaires and scores are flat arrays of
+    len(joueur_ids) * nombre_rondes: cell i * nombre_rondes + ronde - 1 holds
+    the opponent's row (-1 for none) and the player's score (NON_JOUE if none).
+    """
+    index = {pid: i for i, pid in enumerate(joueur_ids)}
+    cellules = len(joueur_ids) * nombre_rondes
+    adversaires = array('i', [-1]) * cellules
+    scores = array('d', [NON_JOUE]) * cellules
+    for ronde, blanc_id, noir_id, resultat in matchs:
+        i = index.get(blanc_id)
+        if i is None or resultat is None or not 1 <= ronde <= nombre_rondes:
+            continue
+        k = i * nombre_rondes + ronde - 1
+        if noir_id is None: # Bye
+            scores[k] = resultat
+            continue
+        j = index.get(noir_id)
+        if j is None: # Opponent deleted
+            continue
+        kj = j * nombre_rondes + ronde - 1
+        adversaires[k], scores[k] = j, resultat
+        adversaires[kj], scores[kj] = i, 1.0 - resultat
+    return index, adversaires, scores
+
+
+def calculer_departages(joueur_ids, matchs, nombre_rondes):
+    """Returns {joueur_id: {'points', 'buchholz', 'buchholz_cut1', 'sonneborn_berger', 'progressif', 'confrontation'}}."""
+    index, adversaires, scores = matrice_resultats(joueur_ids, matchs, nombre_rondes)
+    n, r = len(joueur_ids), nombre_rondes
+    rangees = [range(i * r, (i + 1) * r) for i in range(n)]
+
+    points = [sum(scores[k] for k in cellules if scores[k] != NON_JOUE) for cellules in rangees]
+    departages = {}
+    for pid, i in index.items():
+        cellules = rangees[i]
+        points_adversaires = [points[adversaires[k]] for k in cellules if adversaires[k] >= 0]
+        buchholz = sum(points_adversaires, 0.0)
+        cumul = progressif = 0.0
+        for k in cellules:
+            if scores[k] != NON_JOUE:
+                cumul += scores[k]
+            progressif += cumul
+        departages[pid] = {
+            'points': points[i],
+            'buchholz': buchholz,
+            'buchholz_cut1': buchholz - min(points_adversaires) if points_adversaires else 0.0,
+            'sonneborn_berger': sum((points[adversaires[k]] * scores[k] for k in cellules if adversaires[k] >= 0), 0.0),
+            'progressif': progressif,
+            'confrontation': sum((scores[k] for k in cellules
+                                  if adversaires[k] >= 0 and points[adversaires[k]] == points[i]), 0.0),
+        }
+    return departages
+
+
+def cle_classement(points, departage, elo, ordre=ORDRE_DEPARTAGES):
+    """Sort key (use with reverse=True): points, then the tiebreaks in order, then ELO.
+
+    departage is the player's entry from calculer_departages, or None if they
+    have not played yet.
+    """
+    if departage is None:
+        return (points,) + (0.0,) * len(ordre) + (elo,)
+    return (points,) + tuple(departage[d] for d in ordre) + (elo,)
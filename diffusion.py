@@ -0,0 +1,92 @@
+# Diffusion des mises à jour de tournoi (Server-Sent Events)
+"""In-process fan-out broker for the tournament event streams.
+
+One ``Diffuseur`` per worker process. Each connected client owns a small
+bounded queue; publishing never blocks: when a slow client's queue is full,
+its oldest event is dropped (events only say "this tournament changed, here
+is its new version", so the latest one is all a client needs).
+
+Events are deduplicated on the tournament version, so the same change can be
+published both by the process that committed it and by the poller that
+notices it in the database on behalf of the other workers.
+
+Each stream holds a server thread for as long as it is open, so the broker
+can be capped (``max_abonnes``): past it, clients are refused and fall back
+to polling, which keeps threads free for ordinary requests.
+"""
+import queue
+import threading
+
+
+class Diffuseur:
+    def __init__(self, taille_file=8, max_abonnes=None):
+        self.taille_file = taille_file
+        self.max_abonnes = max_abonnes  # None: no limit
+        self._verrou = threading.Lock()
+        self._abonnes = {}  # tournoi_id -> set of queues
+        self._etats = {}    # tournoi_id -> last published state
+        self._nombre = 0
+
+    def abonner(self, tournoi_id, etat):
+        """Registers a client; returns (queue, current state), or (None, None) when full.
+
+        etat is the state the caller just read from the database; the broker
+        keeps whichever of it and its own known state is the most recent.
+        """
+        file = queue.Queue(self.taille_file)
+        with self._verrou:
+            if self.max_abonnes is not None and self._nombre >= self.max_abonnes:
+                return None, None
+            self._nombre += 1
+            connu = self._etats.get(tournoi_id)
+            if connu is None or etat['version'] > connu['version']:
+                self._etats[tournoi_id] = connu = etat
+            self._abonnes.setdefault(tournoi_id, set()).add(file)
+        return file, connu
+
+    def desabonner(self, tournoi_id, file):
+        with self._verrou:
+            files = self._abonnes.get(tournoi_id)
+            if files is None or file not in files:
+                return
+            files.discard(file)
+            self._nombre -= 1
+            if not files:
+                del self._abonnes[tournoi_id]
+                self._etats.pop(tournoi_id, None)
+
+    def tournois_suivis(self):
+        """Ids of the tournaments that have at least one connected client."""
+        with self._verrou:
+            return list(self._abonnes)
+
+    def nombre_abonnes(self):
+        with self._verrou:
+            return self._nombre
+
+    def publier(self, tournoi_id, etat):
+        """Sends etat to every client of the tournament if it is newer than the last one.
+
+        The event type is 'ronde' when the current round changed, 'classement'
+        otherwise. Returns the number of clients reached.
+        """
+        with self._verrou:
+            files = self._abonnes.get(tournoi_id)
+            connu = self._etats.get(tournoi_id)
+            if not files or (connu is not None and etat['version'] <= connu['version']):
+                return 0
+            self._etats[tournoi_id] = etat
+            files = list(files)
+        nouvelle_ronde = connu is None or etat['ronde_actuelle'] != connu['ronde_actuelle']
+        evenement = dict(etat, type='ronde' if nouvelle_ronde else 'classement')
+        for file in files:
+            while True:
+                try:
+                    file.put_nowait(evenement)
+                    break
+                except queue.Full:
+                    try:
+                        file.get_nowait() # Slow client: drop its oldest event
+                    except queue.Empty:
+                        pass
+        return len(files)
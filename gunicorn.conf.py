@@ -0,0 +1,30 @@
+# Configuration gunicorn (lue automatiquement dans le dossier de lancement)
+"""gunicorn settings for the tournament app: `gunicorn` with no arguments.
+
+Live tournament pages keep a Server-Sent Events stream open, and a stream
+holds a server thread for as long as it lasts. With the default sync
+workers each viewer would take a whole worker, so the workers are gthread
+ones. Each worker caps its streams (SSE_MAX_FLUX) below its thread count;
+past the cap, pages fall back to polling and the remaining threads stay
+free for ordinary requests.
+
+Environment: WEB_CONCURRENCY (workers), GUNICORN_THREADS (threads per
+worker), SSE_MAX_FLUX (streams per worker), PORT.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True # Import once in the master; create_app() drops inherited connections after the fork
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
+# A quarter of the threads always serve ordinary requests (a single thread serves no stream)
+os.environ.setdefault('SSE_MAX_FLUX', str(threads * 3 // 4))
+
+# gthread workers notify the master from their main loop, not from the request
+# threads, so long-lived streams do not trip the worker timeout
+timeout = 30
+keepalive = 5
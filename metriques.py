@@ -0,0 +1,159 @@
+# Métriques des requêtes (format texte Prometheus)
+"""Per-process request metrics, exposed in the Prometheus text format.
+
+The registry keeps, per endpoint, a latency histogram, a histogram of the
+number of SQL statements per request and the time spent in SQL and in
+templates, plus a render time histogram per template. Histograms have fixed
+buckets, so recording is a bisect and a few additions under one lock.
+
+Each worker process has its own registry; counters restart with the process.
+"""
+import threading
+from bisect import bisect_left
+
+SEUILS_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+SEUILS_SQL = (1, 2, 5, 10, 20, 50, 100, 500)  # Statements per request
+PREFIXE = 'tournoi_'
+
+
+class Histogramme:
+    """Fixed-bucket histogram; compteurs[i] counts values <= seuils[i], the last one the rest (+Inf)."""
+    __slots__ = ('seuils', 'compteurs', 'somme', 'total', 'maximum')
+
+    def __init__(self, seuils):
+        self.seuils = seuils
+        self.compteurs = [0] * (len(seuils) + 1)
+        self.somme = 0.0
+        self.total = 0
+        self.maximum = 0.0
+
+    def observer(self, valeur):
+        self.compteurs[bisect_left(self.seuils, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+        if valeur > self.maximum:
+            self.maximum = valeur
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the maximum for the last bucket)."""
+        if not self.total:
+            return 0.0
+        rang, cumul = q * self.total, 0
+        for seuil, compteur in zip(self.seuils, self.compteurs):
+            cumul += compteur
+            if cumul >= rang:
+                return min(seuil, self.maximum)
+        return self.maximum
+
+    def lignes(self, nom, etiquettes):
+        cumul = 0
+        for seuil, compteur in zip(self.seuils, self.compteurs):
+            cumul += compteur
+            yield f'{nom}_bucket{{{etiquettes},le="{seuil}"}} {cumul}'
+        yield f'{nom}_bucket{{{etiquettes},le="+Inf"}} {self.total}'
+        yield f'{nom}_sum{{{etiquettes}}} {self.somme:.6f}'
+        yield f'{nom}_count{{{etiquettes}}} {self.total}'
+
+
+def echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metriques:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._latences = {}   # (endpoint, methode) -> Histogramme
+            self._statuts = {}    # (endpoint, methode, statut) -> count
+            self._sql = {}        # endpoint -> Histogramme of statements per request
+            self._sql_duree = {}  # endpoint -> seconds
+            self._rendus = {}     # endpoint -> seconds spent rendering templates
+            self._templates = {}  # template name -> Histogramme
+            self._profils = 0
+
+    def observer_requete(self, endpoint, methode, statut, duree, requetes_sql, duree_sql, duree_rendu):
+        with self._verrou:
+            cle = (endpoint, methode)
+            histogramme = self._latences.get(cle)
+            if histogramme is None:
+                histogramme = self._latences[cle] = Histogramme(SEUILS_LATENCE)
+            histogramme.observer(duree)
+            cle_statut = (endpoint, methode, statut)
+            self._statuts[cle_statut] = self._statuts.get(cle_statut, 0) + 1
+            histogramme = self._sql.get(endpoint)
+            if histogramme is None:
+                histogramme = self._sql[endpoint] = Histogramme(SEUILS_SQL)
+            histogramme.observer(requetes_sql)
+            self._sql_duree[endpoint] = self._sql_duree.get(endpoint, 0.0) + duree_sql
+            self._rendus[endpoint] = self._rendus.get(endpoint, 0.0) + duree_rendu
+
+    def observer_rendu(self, template, duree):
+        with self._verrou:
+            histogramme = self._templates.get(template)
+            if histogramme is None:
+                histogramme = self._templates[template] = Histogramme(SEUILS_LATENCE)
+            histogramme.observer(duree)
+
+    def compter_profil(self):
+        with self._verrou:
+            self._profils += 1
+
+    def texte(self):
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        p = PREFIXE
+        with self._verrou:
+            lignes = [f'# HELP {p}http_request_duration_seconds Request latency per endpoint.',
+                      f'# TYPE {p}http_request_duration_seconds histogram']
+            for (endpoint, methode), h in sorted(self._latences.items()):
+                lignes += h.lignes(f'{p}http_request_duration_seconds',
+                                   f'endpoint="{echapper(endpoint)}",method="{methode}"')
+            lignes += [f'# HELP {p}http_requests_total Requests per endpoint and status code.',
+                       f'# TYPE {p}http_requests_total counter']
+            lignes += [f'{p}http_requests_total{{endpoint="{echapper(e)}",method="{m}",status="{s}"}} {n}'
+                       for (e, m, s), n in sorted(self._statuts.items())]
+            lignes += [f'# HELP {p}sql_statements_per_request SQL statements sent per request.',
+                       f'# TYPE {p}sql_statements_per_request histogram']
+            for endpoint, h in sorted(self._sql.items()):
+                lignes += h.lignes(f'{p}sql_statements_per_request', f'endpoint="{echapper(endpoint)}"')
+            lignes += [f'# HELP {p}sql_duration_seconds_total Time spent executing SQL per endpoint.',
+                       f'# TYPE {p}sql_duration_seconds_total counter']
+            lignes += [f'{p}sql_duration_seconds_total{{endpoint="{echapper(e)}"}} {s:.6f}'
+                       for e, s in sorted(self._sql_duree.items())]
+            lignes += [f'# HELP {p}template_duration_seconds_total Time spent rendering templates per endpoint.',
+                       f'# TYPE {p}template_duration_seconds_total counter']
+            lignes += [f'{p}template_duration_seconds_total{{endpoint="{echapper(e)}"}} {s:.6f}'
+                       for e, s in sorted(self._rendus.items())]
+            lignes += [f'# HELP {p}template_render_duration_seconds Render time per template.',
+                       f'# TYPE {p}template_render_duration_seconds histogram']
+            for template, h in sorted(self._templates.items()):
+                lignes += h.lignes(f'{p}template_render_duration_seconds', f'template="{echapper(template)}"')
+            lignes += [f'# HELP {p}profiles_captured_total Slow requests saved by the profiler.',
+                       f'# TYPE {p}profiles_captured_total counter',
+                       f'{p}profiles_captured_total {self._profils}']
+        return '\n'.join(lignes) + '\n'
+
+    def resume(self):
+        """Rows for the debug view, the endpoints costing the most total time first (times in ms)."""
+        with self._verrou:
+            lignes = []
+            for (endpoint, methode), h in self._latences.items():
+                sql = self._sql[endpoint]
+                lignes.append({
+                    'endpoint': endpoint, 'methode': methode, 'requetes': h.total,
+                    'total_ms': 1000 * h.somme, 'moyenne_ms': 1000 * h.somme / h.total,
+                    'p50_ms': 1000 * h.quantile(0.5), 'p95_ms': 1000 * h.quantile(0.95),
+                    'max_ms': 1000 * h.maximum,
+                    # SQL and template totals are per endpoint, all methods together
+                    'sql_moyen': sql.somme / sql.total,
+                    'sql_ms_moyen': 1000 * self._sql_duree[endpoint] / sql.total,
+                    'rendu_ms_moyen': 1000 * self._rendus[endpoint] / sql.total,
+                })
+            templates = [{'template': nom, 'rendus': h.total, 'moyenne_ms': 1000 * h.somme / h.total,
+                          'p95_ms': 1000 * h.quantile(0.95), 'max_ms': 1000 * h.maximum}
+                         for nom, h in self._templates.items()]
+        lignes.sort(key=lambda l: l['total_ms'], reverse=True)
+        templates.sort(key=lambda t: t['moyenne_ms'] * t['rendus'], reverse=True)
+        return lignes, templates
@@ -0,0 +1,67 @@
+# Outils pour les courbes d'ELO (périodes, sous-échantillonnage)
+"""Time-series helpers for the ELO history endpoint.
+
+Pure functions, no database access: period bucketing and LTTB
+(Largest-Triangle-Three-Buckets) downsampling.
+"""
+from datetime import date, datetime, timedelta
+
+RESOLUTIONS = ('jour', 'semaine', 'mois')
+
+
+def debut_periode(moment, resolution):
+    """Returns the first day (a date) of the day/week/month containing moment."""
+    jour = moment.date() if isinstance(moment, datetime) else moment
+    if resolution == 'jour':
+        return jour
+    if resolution == 'semaine': # Weeks start on Monday, like strftime('%W')
+        return jour - timedelta(days=jour.weekday())
+    if resolution == 'mois':
+        return jour.replace(day=1)
+    raise ValueError(f"Résolution inconnue : {resolution}")
+
+
+def periode_suivante(debut, resolution):
+    """Returns the first day of the period following the one starting at debut."""
+    if resolution == 'jour':
+        return debut + timedelta(days=1)
+    if resolution == 'semaine':
+        return debut + timedelta(days=7)
+    if resolution == 'mois':
+        return date(debut.year + debut.month // 12, debut.month % 12 + 1, 1)
+    raise ValueError(f"Résolution inconnue : {resolution}")
+
+
+def lttb(points, seuil):
+    """Downsamples [(x, y)] to at most seuil points, keeping the visual shape.
+
+    x must be increasing and numeric (e.g. timestamps). The first and last
+    points are always kept.
+    """
+    n = len(points)
+    if seuil >= n or seuil < 3:
+        return list(points)
+
+    echantillon = [points[0]]
+    taille_seau = (n - 2) / (seuil - 2)
+    a = 0
+    for i in range(seuil - 2):
+        # Average of the next bucket, used as the third triangle vertex
+        debut_suivant = int((i + 1) * taille_seau) + 1
+        fin_suivant = min(int((i + 2) * taille_seau) + 1, n)
+        suivant = points[debut_suivant:fin_suivant] or [points[-1]]
+        moy_x = sum(p[0] for p in suivant) / len(suivant)
+        moy_y = sum(p[1] for p in suivant) / len(suivant)
+
+        debut_seau = int(i * taille_seau) + 1
+        fin_seau = int((i + 1) * taille_seau) + 1
+        ax, ay = points[a]
+        meilleur, meilleure_aire = debut_seau, -1.0
+        for j in range(debut_seau, fin_seau):
+            aire = abs((ax - moy_x) * (points[j][1] - ay) - (ax - points[j][0]) * (moy_y - ay))
+            if aire > meilleure_aire:
+                meilleur, meilleure_aire = j, aire
+        echantillon.append(points[meilleur])
+        a = meilleur
+    echantillon.append(points[-1])
+    return echantillon